@@ -0,0 +1,734 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Pioneer assistant stack.
+
+Every benchmark runs against the offline OpenAI stand-in, so no network
+access or API key is needed. Latency, run duration and failure injection
+are configurable, and results are written as JSON so runs can be compared
+to catch regressions.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.lib.pioneer.assistant_client_crochet import CrochetAssistantClient
+from src.lib.pioneer.gestarum.lib.assistant import Assistant
+from src.lib.pioneer.gestarum.lib.assistant_configuration import AssistantConfiguration
+from src.lib.pioneer.gestarum.lib.assistant_manager import AssistantManager
+from src.lib.pioneer.gestarum.lib.bulk_runner import BulkRunner
+from src.lib.pioneer.gestarum.lib.crochet_thread import CrochetThread
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.instrumentation import (
+    configure_instrumentation,
+    get_instrumentation,
+    span,
+)
+from src.lib.pioneer.gestarum.lib.offline_openai import OfflineBackend, OfflineOpenAI
+from src.lib.pioneer.gestarum.lib.thread import Thread
+from src.lib.pioneer.gestarum.lib.thread_storage import (
+    JSONThreadStorage,
+    SQLiteThreadStorage,
+)
+from src.lib.pioneer.server import ChatServer
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace, str], List[Dict[str, Any]]]] = {}
+
+def benchmark(name: str) -> Callable:
+    """Register a benchmark function under a name."""
+    def register(func: Callable) -> Callable:
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the Pioneer assistant stack")
+    parser.add_argument(
+        "--only",
+        type=str,
+        default=",".join(BENCHMARKS),
+        help="Comma-separated benchmarks to run (default: all)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default="1000,10000,100000",
+        help="Comma-separated CrochetThread node counts (up to 1000000)",
+    )
+    parser.add_argument(
+        "--thread-counts",
+        type=str,
+        default="1000,10000",
+        help="Comma-separated numbers of stored threads for the thread_storage benchmark",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=2_000_000,
+        help="Per-thread byte budget for the crochet_memory benchmark",
+    )
+    parser.add_argument(
+        "--sessions",
+        type=str,
+        default="10,100",
+        help="Comma-separated numbers of concurrent sessions for the server benchmark",
+    )
+    parser.add_argument("--turns", type=int, default=20, help="Turns per chat benchmark")
+    parser.add_argument("--latency", type=float, default=0.005, help="Offline request latency in seconds")
+    parser.add_argument("--run-duration", type=float, default=0.05, help="Offline run duration in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of an injected 500 error")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of an injected 429 error")
+    parser.add_argument("--output", type=str, default=None, help="Write JSON results to this file")
+    return parser.parse_args()
+
+def make_client(args: argparse.Namespace) -> OfflineOpenAI:
+    """Create an offline client configured from the command line."""
+    return OfflineOpenAI(OfflineBackend(
+        latency=args.latency,
+        run_duration=args.run_duration,
+        failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    ))
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize timing samples in milliseconds."""
+    ordered = sorted(samples)
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def timed(func: Callable[[], Any]) -> float:
+    """Return the wall-clock time of one call in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def make_config(workdir: str, name: str = "bench_assistant") -> AssistantConfiguration:
+    """Create an assistant configuration rooted in a scratch directory."""
+    return AssistantConfiguration(
+        name=name,
+        instructions="Benchmark assistant",
+        tools=[{"type": "file_search"}],
+        storage_dir=os.path.join(workdir, "config"),
+        threads_dir=os.path.join(workdir, "threads"),
+        file_dir=os.path.join(workdir, "files"),
+    )
+
+@contextlib.contextmanager
+def scratch_area(workdir: str, name: str):
+    """Run a client from a directory of its own.
+    
+    Clients built from a config directory keep their threads in a relative
+    threads/ directory. Each offline backend numbers its threads from one,
+    so clients sharing that directory would find each other's threads.
+    """
+    path = os.path.join(workdir, name)
+    os.makedirs(path, exist_ok=True)
+    with contextlib.chdir(path):
+        yield path
+
+@benchmark("send_message")
+def bench_send_message(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Turn latency and request count of Assistant.send_message."""
+    results = []
+    for stream_runs in (True, False):
+        client = make_client(args)
+        assistant = Assistant(client, make_config(workdir), stream_runs=stream_runs)
+        thread_id = assistant.create_thread("bench")
+        client.backend.requests.clear()
+        samples, errors = [], 0
+        for turn in range(args.turns):
+            try:
+                samples.append(timed(lambda: assistant.send_message(thread_id, f"Question {turn}")))
+            except Exception:
+                errors += 1
+        results.append({
+            "benchmark": "send_message",
+            "params": {"stream_runs": stream_runs, "turns": args.turns},
+            "metrics": {
+                **summarize(samples or [0.0]),
+                "errors": errors,
+                "requests_per_turn": sum(client.backend.requests.values()) / args.turns,
+            },
+        })
+    return results
+
+@benchmark("crochet_chat")
+def bench_crochet_chat(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Wall-clock time of CrochetAssistantClient.chat fan-out per character count."""
+    results = []
+    for characters in (1, 3, 5):
+        with scratch_area(workdir, f"chat{characters}") as area:
+            client = CrochetAssistantClient(
+                assistant_name="bench_assistant",
+                config_directory=os.path.join(area, "config"),
+                character_ids=[f"character_{i}" for i in range(characters)],
+                client=make_client(args),
+            )
+            samples, failures = [], 0
+            for turn in range(args.turns):
+                start = time.perf_counter()
+                responses = client.chat(f"Question {turn}")
+                if len(responses) < characters:
+                    failures += 1
+                    continue
+                samples.append(time.perf_counter() - start)
+            client.close()
+        results.append({
+            "benchmark": "crochet_chat",
+            "params": {"characters": characters, "turns": args.turns},
+            "metrics": {**summarize(samples or [0.0]), "failed_turns": failures},
+        })
+    return results
+
+@benchmark("chat_stream")
+def bench_chat_stream(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Time to the first text and to the last response of CrochetAssistantClient.chat_stream."""
+    results = []
+    for characters in (1, 3):
+        with scratch_area(workdir, f"stream{characters}") as area:
+            client = CrochetAssistantClient(
+                assistant_name="bench_assistant",
+                config_directory=os.path.join(area, "config"),
+                character_ids=[f"character_{i}" for i in range(characters)],
+                client=make_client(args),
+            )
+            first_delta, complete, failures = [], [], 0
+            for turn in range(args.turns):
+                start = time.perf_counter()
+                first = None
+                done = 0
+                for _, event in client.chat_stream(f"Question {turn}"):
+                    if first is None and event["type"] == "delta":
+                        first = time.perf_counter() - start
+                    if event["type"] == "done":
+                        done += 1
+                if first is None or done < characters:
+                    failures += 1
+                    continue
+                first_delta.append(first)
+                complete.append(time.perf_counter() - start)
+            client.close()
+        results.append({
+            "benchmark": "chat_stream",
+            "params": {"characters": characters, "turns": args.turns},
+            "metrics": {
+                "first_delta": summarize(first_delta or [0.0]),
+                "complete": summarize(complete or [0.0]),
+                "failed_turns": failures,
+            },
+        })
+    return results
+
+@benchmark("pipeline")
+def bench_pipeline(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Turns per second of CrochetAssistantClient, serialized with chat() or pipelined with submit()."""
+    results = []
+    for mode in ("serial", "pipelined"):
+        with scratch_area(workdir, f"pipeline_{mode}") as area:
+            client = CrochetAssistantClient(
+                assistant_name="bench_assistant",
+                config_directory=os.path.join(area, "config"),
+                character_ids=[f"character_{i}" for i in range(3)],
+                client=make_client(args),
+                max_workers=16,
+            )
+            responses: Dict[str, int] = {}
+            start = time.perf_counter()
+            if mode == "serial":
+                for turn in range(args.turns):
+                    responses[str(turn)] = len(client.chat(f"Question {turn}"))
+            else:
+                for turn in range(args.turns):
+                    responses[client.submit(f"Question {turn}")] = 0
+                for correlation_id, _, _ in client.results():
+                    responses[correlation_id] += 1
+            elapsed = time.perf_counter() - start
+            client.close()
+        completed = sum(1 for count in responses.values() if count == 3)
+        results.append({
+            "benchmark": "pipeline",
+            "params": {"mode": mode, "characters": 3, "turns": args.turns, "workers": 16},
+            "metrics": {
+                "turns_per_second": completed / elapsed,
+                "total_s": elapsed,
+                "failed_turns": args.turns - completed,
+            },
+        })
+    return results
+
+@benchmark("bulk")
+def bench_bulk(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Throughput of BulkRunner by concurrency limit."""
+    results = []
+    prompts = [{"id": str(i), "prompt": f"Question {i}"} for i in range(args.turns * 4)]
+    for concurrency in (1, 4, 16):
+        client = make_client(args)
+        assistant = Assistant(client, make_config(workdir, name=f"bulk{concurrency}"))
+        runner = BulkRunner(
+            assistant, pool_size=concurrency, thread_prefix=f"Bulk {concurrency}"
+        )
+        output = os.path.join(workdir, f"bulk{concurrency}.jsonl")
+        summary = runner.run(prompts, output, resume=False)
+        results.append({
+            "benchmark": "bulk",
+            "params": {"concurrency": concurrency, "prompts": len(prompts)},
+            "metrics": {
+                "prompts_per_second": summary["prompts_per_second"],
+                "errors": summary["error"],
+            },
+        })
+    return results
+
+def build_thread(
+    storage_dir: str,
+    nodes: int,
+    journal: bool = False,
+    compact_edges: bool = False,
+    links: int = 1,
+) -> CrochetThread:
+    """Build a Crochet thread of alternating user and character messages.
+    
+    Each reply also links to the previous `links` replies, so the first and
+    last nodes are connected by a path through the whole thread.
+    """
+    thread = CrochetThread(
+        "bench", "bench", storage_dir=storage_dir, journal=journal, compact_edges=compact_edges
+    )
+    previous: List[str] = []
+    for turn in range(nodes // 2):
+        user_id = thread.add_message("user", f"Question {turn}")
+        reply_id = thread.add_character_response(
+            f"character_{turn % 3}", f"Answer {turn}", context_node_ids=[user_id] + previous
+        )
+        previous = ([reply_id] + previous)[:links]
+    return thread
+
+@benchmark("crochet_thread")
+def bench_crochet_thread(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Save, load and graph query times of CrochetThread by size."""
+    results = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        storage_dir = os.path.join(workdir, f"thread{size}")
+        thread = build_thread(storage_dir, size)
+        first = next(iter(thread.nodes))
+        last = next(reversed(thread.nodes))
+
+        snapshot_s = timed(thread.save)
+        thread.journal = True
+        thread.add_message("user", "One more question")
+        journal_s = timed(thread.save)
+        load_s = timed(lambda: CrochetThread("bench", "", storage_dir=storage_dir).load())
+        path_s = timed(lambda: thread.get_conversation_path(first, last))
+        ancestors_s = timed(lambda: thread.get_ancestors(last))
+        window_s = timed(lambda: thread.get_linear_conversation(limit=20))
+        results.append({
+            "benchmark": "crochet_thread",
+            "params": {"nodes": size},
+            "metrics": {
+                "snapshot_save_ms": snapshot_s * 1000,
+                "journal_save_ms": journal_s * 1000,
+                "load_ms": load_s * 1000,
+                "path_query_ms": path_s * 1000,
+                "ancestors_query_ms": ancestors_s * 1000,
+                "last_20_messages_ms": window_s * 1000,
+            },
+        })
+        shutil.rmtree(storage_dir, ignore_errors=True)
+    return results
+
+@benchmark("crochet_memory")
+def bench_crochet_memory(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Resident memory of a growing CrochetThread with and without a budget."""
+    results = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        for budget in (None, args.memory_budget):
+            storage_dir = os.path.join(workdir, f"memory{size}")
+            tracemalloc.start()
+            start = time.perf_counter()
+            thread = CrochetThread(
+                "bench", "bench", storage_dir=storage_dir, journal=True,
+                memory_budget=budget,
+            )
+            for turn in range(size // 2):
+                user_id = thread.add_message("user", f"Question {turn} " + "x" * 200)
+                thread.add_character_response(
+                    f"character_{turn % 3}", f"Answer {turn} " + "y" * 400, [user_id]
+                )
+                thread.save()
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append({
+                "benchmark": "crochet_memory",
+                "params": {"nodes": size, "memory_budget": budget},
+                "metrics": {
+                    "resident_nodes": len(thread.nodes),
+                    "estimated_resident_bytes": thread.resident_bytes,
+                    "traced_mb": current / 1e6,
+                    "traced_peak_mb": peak / 1e6,
+                    "per_turn_ms": elapsed / max(size // 2, 1) * 1000,
+                },
+            })
+            del thread
+            shutil.rmtree(storage_dir, ignore_errors=True)
+    return results
+
+@benchmark("crochet_edges")
+def bench_crochet_edges(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Memory and graph query times of CrochetThread edges as objects and as columns.
+    
+    The columns keep an index of node IDs besides the edges, so they only
+    take less memory once nodes have a few edges each.
+    """
+    results = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        for links in (1, 4):
+            for compact_edges in (False, True):
+                storage_dir = os.path.join(workdir, f"edges{size}")
+                tracemalloc.start()
+                thread = build_thread(storage_dir, size, compact_edges=compact_edges, links=links)
+                last = next(reversed(thread.nodes))
+                ancestors_s = timed(lambda: thread.get_ancestors(last))
+                edges = len(thread.edges)
+                # The edge store's share is what dropping it frees
+                with_edges, _ = tracemalloc.get_traced_memory()
+                thread.edges = thread._new_edge_store()
+                without_edges, _ = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results.append({
+                    "benchmark": "crochet_edges",
+                    "params": {"nodes": size, "links": links, "compact_edges": compact_edges},
+                    "metrics": {
+                        "edges": edges,
+                        "traced_mb": with_edges / 1e6,
+                        "edge_store_mb": (with_edges - without_edges) / 1e6,
+                        "ancestors_query_ms": ancestors_s * 1000,
+                    },
+                })
+                del thread
+                shutil.rmtree(storage_dir, ignore_errors=True)
+    return results
+
+@benchmark("thread_storage")
+def bench_thread_storage(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Lookup, append and load times with many stored threads, per backend."""
+    results = []
+    for count in (int(value) for value in args.thread_counts.split(",")):
+        backends = {
+            "json": lambda: JSONThreadStorage(os.path.join(workdir, f"json{count}")),
+            "sqlite": lambda: SQLiteThreadStorage(os.path.join(workdir, f"sqlite{count}.db")),
+        }
+        for backend, open_storage in backends.items():
+            storage = open_storage()
+            fill_s = timed(lambda: [
+                Thread(f"thread_{i}", f"Thread {i}", storage=storage).save()
+                for i in range(count)
+            ])
+            storage.close()
+
+            target = f"Thread {count - 1}"
+            storage = open_storage()  # Fresh, as after a restart
+            find_s = timed(lambda: storage.find_thread(target))
+            thread = Thread(storage.find_thread(target), target, storage=storage).load()
+            append_samples = []
+            for turn in range(args.turns):
+                thread.add_message("user", f"Question {turn}")
+                append_samples.append(timed(thread.save))
+            load_s = timed(lambda: Thread(thread.thread_id, "", storage=storage).load())
+            storage.close()
+            results.append({
+                "benchmark": "thread_storage",
+                "params": {"backend": backend, "threads": count},
+                "metrics": {
+                    "create_all_s": fill_s,
+                    "first_find_by_name_ms": find_s * 1000,
+                    "append_save": summarize(append_samples),
+                    "load_ms": load_s * 1000,
+                },
+            })
+    return results
+
+@benchmark("manager_cold_start")
+def bench_manager_cold_start(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Time to construct an AssistantManager and reach one assistant."""
+    results = []
+    for assistants in (1, 10, 100):
+        client = make_client(args)
+        config_dir = os.path.join(workdir, f"manager{assistants}")
+        for i in range(assistants):
+            config = make_config(workdir, name=f"assistant_{i}")
+            config.storage_dir = config_dir
+            os.makedirs(config_dir, exist_ok=True)
+            config.assistant_id = client.beta.assistants.create(name=config.name).id
+            config.save()
+        client.backend.requests.clear()
+        construct_s = timed(lambda: AssistantManager(client, config_directory=config_dir))
+        manager = AssistantManager(client, config_directory=config_dir)
+        first_s = timed(lambda: manager.assistant_index.get("assistant_0"))
+        results.append({
+            "benchmark": "manager_cold_start",
+            "params": {"assistants": assistants},
+            "metrics": {
+                "construct_ms": construct_s * 1000,
+                "first_assistant_ms": first_s * 1000,
+                "requests": sum(client.backend.requests.values()),
+            },
+        })
+    return results
+
+@benchmark("sync_docs")
+def bench_sync_docs(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Upload throughput and re-sync planning time of sync_docs_to_vector.py."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sync_docs_to_vector.py")
+    spec = importlib.util.spec_from_file_location("sync_docs_to_vector", script)
+    sync = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sync)
+
+    docs_dir = os.path.join(workdir, "docs")
+    os.makedirs(docs_dir, exist_ok=True)
+    for i in range(200):
+        with open(os.path.join(docs_dir, f"note_{i}.md"), "w") as f:
+            f.write(f"# Note {i}\n\n" + "Entropy measures uncertainty. " * 50)
+    markdown_files = sync.find_markdown_files(docs_dir)
+
+    results = []
+    for workers in (1, 8):
+        client = make_client(args)
+        upload_s = timed(lambda: sync.upload_files_to_openai(client, markdown_files, max_workers=workers))
+        results.append({
+            "benchmark": "sync_docs",
+            "params": {"files": len(markdown_files), "workers": workers},
+            "metrics": {
+                "upload_ms": upload_s * 1000,
+                "files_per_second": len(markdown_files) / upload_s,
+            },
+        })
+
+    manifest = {
+        os.path.relpath(path, docs_dir): {"sha256": sync.content_sha256(path), "file_id": f"file_{i}"}
+        for i, path in enumerate(markdown_files)
+    }
+    plan_s = timed(lambda: sync.plan_sync(docs_dir, markdown_files, manifest))
+    results.append({
+        "benchmark": "sync_docs",
+        "params": {"files": len(markdown_files), "unchanged": True},
+        "metrics": {"plan_ms": plan_s * 1000},
+    })
+    return results
+
+@benchmark("retrieval")
+def bench_retrieval(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Build, incremental rebuild and query times of the local notes index."""
+    docs_dir = os.path.join(workdir, "vault")
+    os.makedirs(docs_dir, exist_ok=True)
+    for i in range(500):
+        with open(os.path.join(docs_dir, f"note_{i}.md"), "w") as f:
+            f.write(f"# Note {i}\n\n" + f"Entropy {i} measures uncertainty in channel {i % 7}. " * 40)
+    index_dir = os.path.join(workdir, "doc_index")
+
+    build_s = timed(lambda: DocIndex.build(docs_dir, index_dir))
+    noop_s = timed(lambda: DocIndex.build(docs_dir, index_dir))
+    with open(os.path.join(docs_dir, "note_0.md"), "a") as f:
+        f.write("\n\nRedundancy determines resilience.")
+    incremental_s = timed(lambda: DocIndex.build(docs_dir, index_dir))
+    open_s = timed(lambda: DocIndex(index_dir))
+
+    index = DocIndex(index_dir)
+    samples = [
+        timed(lambda: index.search(f"uncertainty in channel {turn % 7}", 5))
+        for turn in range(args.turns * 10)
+    ]
+    return [{
+        "benchmark": "retrieval",
+        "params": {"notes": 500, "passages": index.num_passages},
+        "metrics": {
+            "build_ms": build_s * 1000,
+            "unchanged_rebuild_ms": noop_s * 1000,
+            "one_note_rebuild_ms": incremental_s * 1000,
+            "open_ms": open_s * 1000,
+            "query": summarize(samples),
+        },
+    }]
+
+async def asgi_request(app: Any, method: str, path: str, body: Any = None) -> Tuple[int, bytes]:
+    """Send one request to an ASGI app in-process and collect the response."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    received = False
+    status = 0
+    chunks = []
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": payload}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        else:
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+@benchmark("stages")
+def bench_stages(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Per-stage latency of Crochet chat turns, and the cost of a span."""
+    instrumentation = get_instrumentation()
+    was_enabled = instrumentation.enabled
+    span_ns = {}
+    try:
+        for enabled in (False, True):
+            configure_instrumentation(enabled)
+            iterations = 100000
+            start = time.perf_counter()
+            for _ in range(iterations):
+                with span("bench.span"):
+                    pass
+            span_ns["enabled" if enabled else "disabled"] = (
+                (time.perf_counter() - start) / iterations * 1e9
+            )
+        results = []
+        with scratch_area(workdir, "stages") as area:
+            client = CrochetAssistantClient(
+                assistant_name="bench_assistant",
+                config_directory=os.path.join(area, "config"),
+                character_ids=["character_0", "character_1", "character_2"],
+                client=make_client(args),
+            )
+            for stream_runs in (True, False):
+                instrumentation.reset()
+                client.assistant.stream_runs = stream_runs
+                failures = 0
+                for turn in range(args.turns):
+                    if len(client.chat(f"Question {turn}")) < 3:
+                        failures += 1
+                results.append({
+                    "benchmark": "stages",
+                    "params": {"stream_runs": stream_runs, "characters": 3, "turns": args.turns},
+                    "metrics": {
+                        "stages": instrumentation.to_json(),
+                        "span_ns": span_ns,
+                        "failed_turns": failures,
+                    },
+                })
+            client.close()
+    finally:
+        instrumentation.reset()
+        configure_instrumentation(was_enabled)
+    return results
+
+@benchmark("server")
+def bench_server(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Throughput and turn latency of the HTTP server with many concurrent sessions."""
+    results = []
+    for sessions in (int(value) for value in args.sessions.split(",")):
+        with scratch_area(workdir, f"server{sessions}") as area:
+            app = ChatServer(
+                "bench_assistant",
+                config_directory=os.path.join(area, "config"),
+                client=make_client(args),
+                max_workers=8,
+                max_queue=sessions,
+            )
+            turns = max(args.turns // 10, 1)
+            samples: List[float] = []
+            statuses: Dict[int, int] = {}
+
+            async def conversation(session: int) -> None:
+                for turn in range(turns):
+                    start = time.perf_counter()
+                    status, _ = await asgi_request(
+                        app, "POST", f"/sessions/s{session}/messages", {"message": f"Question {turn}"}
+                    )
+                    samples.append(time.perf_counter() - start)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+            async def load() -> float:
+                await app.startup()
+                start = time.perf_counter()
+                await asyncio.gather(*(conversation(session) for session in range(sessions)))
+                elapsed = time.perf_counter() - start
+                await app.shutdown()
+                return elapsed
+
+            elapsed = asyncio.run(load())
+        results.append({
+            "benchmark": "server",
+            "params": {"sessions": sessions, "turns_per_session": turns, "workers": 8},
+            "metrics": {
+                **summarize(samples),
+                "turns_per_s": len(samples) / elapsed,
+                "statuses": statuses,
+            },
+        })
+    return results
+
+def main():
+    """Run the selected benchmarks and report the results as JSON."""
+    args = parse_args()
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        print(f"Error: unknown benchmarks {unknown}; choose from {list(BENCHMARKS)}")
+        sys.exit(1)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": [],
+    }
+
+    workdir = tempfile.mkdtemp(prefix="shannon-bench-")
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)  # Components that default to relative paths stay in the scratch area
+        # Keep component progress output out of the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            for name in selected:
+                print(f"Running {name}...")
+                report["results"].extend(BENCHMARKS[name](args, workdir))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Wrote results to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
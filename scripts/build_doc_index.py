@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Script to build the local search index of the Obsidian documentation.
+
+The index is a BM25 index over passages of the notes. Rebuilding only
+re-reads notes whose content changed. Assistants given the index retrieve
+the top passages for each message locally and send them with the run.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex, format_passages
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Build the local search index of the Obsidian documentation"
+    )
+    parser.add_argument(
+        "--docs-dir",
+        type=str,
+        default="docs/obsidian",
+        help="Path to the Obsidian documentation directory",
+    )
+    parser.add_argument(
+        "--index-dir",
+        type=str,
+        default="cache/doc_index",
+        help="Directory to write the index to",
+    )
+    parser.add_argument(
+        "--max-words",
+        type=int,
+        default=120,
+        help="Target maximum passage length in words",
+    )
+    parser.add_argument(
+        "--query",
+        type=str,
+        default=None,
+        help="Print the top passages for this query after building",
+    )
+    parser.add_argument("--top-k", type=int, default=3, help="Passages to print")
+    return parser.parse_args()
+
+def main() -> None:
+    """Build the index and optionally run a query against it."""
+    args = parse_args()
+
+    if not os.path.exists(args.docs_dir):
+        print(f"Error: Documentation directory {args.docs_dir} not found")
+        sys.exit(1)
+
+    index = DocIndex.build(args.docs_dir, args.index_dir, max_words=args.max_words)
+    print(
+        f"Index in {args.index_dir}: {index.num_passages} passages, "
+        f"{len(index.terms)} terms"
+    )
+
+    if args.query:
+        print()
+        print(format_passages(index.search(args.query, args.top_k)) or "No matches")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Script to answer a JSONL file of prompts with an assistant in bulk.
+
+Prompts are spread over a pool of threads with a bounded number of runs in
+flight. Results are streamed to a JSONL file that also serves as the
+checkpoint, so an interrupted job picks up where it stopped when rerun.
+
+Input lines look like {"id": "q1", "prompt": "What is entropy?"}; the
+"id" is optional and defaults to the line number.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.lib.pioneer.assistant_client import AssistantClient
+from src.lib.pioneer.gestarum.lib.bulk_runner import BulkRunner, read_prompts
+from src.lib.pioneer.gestarum.lib.environment import load_env
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of prompts in bulk")
+    parser.add_argument("input", type=str, help="JSONL file of prompts")
+    parser.add_argument("output", type=str, help="JSONL file to stream results to")
+    parser.add_argument(
+        "--assistant-name",
+        type=str,
+        default="shannon_assistant",
+        help="Name of the assistant configuration to use",
+    )
+    parser.add_argument(
+        "--config-directory",
+        type=str,
+        default="src/lib/pioneer/config",
+        help="Directory containing assistant configurations",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Number of pool threads, and thus of runs in flight",
+    )
+    parser.add_argument(
+        "--thread-prefix",
+        type=str,
+        default="Bulk Thread",
+        help="Name prefix of the pool threads",
+    )
+    parser.add_argument(
+        "--shared-history",
+        action="store_true",
+        help="Let prompts on the same pool thread see each other's history",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore existing results and overwrite the output file",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use the offline OpenAI stand-in (no network or API key needed)",
+    )
+    return parser.parse_args()
+
+def main():
+    """Answer the prompts and report a summary."""
+    args = parse_args()
+    load_env()
+
+    if not os.path.exists(args.input):
+        print(f"Error: Prompt file {args.input} not found")
+        sys.exit(1)
+
+    client = None
+    if args.offline:
+        from src.lib.pioneer.gestarum.lib.offline_openai import OfflineOpenAI
+        client = OfflineOpenAI()
+    elif not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        print("Please set it in the .env file or export it in your shell")
+        sys.exit(1)
+
+    assistant = AssistantClient(
+        assistant_name=args.assistant_name,
+        config_directory=args.config_directory,
+        client=client,
+    ).assistant
+
+    runner = BulkRunner(
+        assistant,
+        pool_size=args.concurrency,
+        thread_prefix=args.thread_prefix,
+        isolated=not args.shared_history,
+    )
+    summary = runner.run(
+        read_prompts(args.input),
+        args.output,
+        resume=not args.restart,
+    )
+    print(json.dumps(summary, indent=2))
+    if summary["error"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
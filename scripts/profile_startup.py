@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Script to report where the start-up time of the clients goes.
+
+The import profile runs `python -X importtime` on each client module in a
+fresh interpreter and lists the modules with the largest own import time.
+The start-up profile times, in fresh processes against the offline OpenAI
+stand-in, importing AssistantClient, constructing it and sending the first
+message. It does so twice on the same directories: a cold start, and a warm
+start that can use the manager snapshot the first one wrote.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CLIENT_MODULES = [
+    "src.lib.pioneer.assistant_client",
+    "src.lib.pioneer.assistant_client_crochet",
+    "src.lib.pioneer.async_assistant_client",
+    "src.lib.pioneer.async_assistant_client_crochet",
+]
+
+# Modules that should only be imported once a network client is needed
+DEFERRED_MODULES = ["openai", "dotenv", "httpx"]
+
+def parse_args():
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Profile client import and start-up time")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per module")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this file")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def profile_imports(module: str, top: int) -> Dict[str, Any]:
+    """Profile the import of a module in a fresh interpreter.
+    
+    Args:
+        module: Dotted module name
+        top: Number of slowest modules to list
+    
+    Returns:
+        Total import time, the slowest modules by own time, and which
+        deferred modules were imported anyway
+    """
+    code = (
+        f"import json, sys, {module}; "
+        f"print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        entries.append((name, int(own), int(cumulative)))
+    total_us = sum(own for _, own, _ in entries)
+    slowest = sorted(entries, key=lambda entry: -entry[1])[:top]
+    return {
+        "total_ms": total_us / 1000,
+        "slowest": [{"module": name, "self_ms": own / 1000} for name, own, _ in slowest],
+        "deferred_imported": json.loads(result.stdout),
+    }
+
+def startup_child(workdir: str) -> Dict[str, Any]:
+    """Time the start-up stages of AssistantClient in this process.
+    
+    The offline backend keeps no state between processes, so the assistant
+    and threads created by an earlier run are registered with it first, as
+    they would still exist remotely.
+    """
+    start = time.perf_counter()
+    from src.lib.pioneer.assistant_client import AssistantClient
+    import_s = time.perf_counter() - start
+
+    from types import SimpleNamespace
+
+    from src.lib.pioneer.gestarum.lib.offline_openai import OfflineOpenAI
+    client = OfflineOpenAI(run_duration=0.0)
+    remote_path = os.path.join(workdir, "remote.json")
+    if os.path.exists(remote_path):
+        with open(remote_path, "r") as f:
+            remote = json.load(f)
+        for assistant_id in remote["assistants"]:
+            client.backend.assistants[assistant_id] = SimpleNamespace(id=assistant_id)
+        for thread_id in remote["threads"]:
+            client.backend.threads[thread_id] = []
+
+    os.chdir(workdir)  # Thread and file stores default to relative paths
+    start = time.perf_counter()
+    assistant_client = AssistantClient(
+        "profile_assistant", config_directory="config", client=client
+    )
+    construct_s = time.perf_counter() - start
+    construct_requests = sum(client.backend.requests.values())
+
+    start = time.perf_counter()
+    assistant_client.chat("What is entropy?")
+    first_message_s = time.perf_counter() - start
+
+    with open(remote_path, "w") as f:
+        json.dump({
+            "assistants": list(client.backend.assistants),
+            "threads": list(client.backend.threads),
+        }, f)
+    return {
+        "import_client_ms": import_s * 1000,
+        "construct_client_ms": construct_s * 1000,
+        "construct_requests": construct_requests,
+        "first_message_ms": first_message_s * 1000,
+        "to_first_message_ms": (import_s + construct_s + first_message_s) * 1000,
+        "deferred_imported": sorted(name for name in DEFERRED_MODULES if name in sys.modules),
+    }
+
+def profile_startup(workdir: str) -> Dict[str, Any]:
+    """Run a cold and a warm start in fresh processes."""
+    runs = {}
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", workdir],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+        process_s = time.perf_counter() - start
+        runs[label] = json.loads(result.stdout)
+        runs[label]["process_ms"] = process_s * 1000
+    return runs
+
+def main():
+    """Print or write the import and start-up report."""
+    args = parse_args()
+    if args.child:
+        sys.path.insert(0, REPO_ROOT)
+        with contextlib.redirect_stdout(sys.stderr):  # Client progress output
+            report = startup_child(args.child)
+        print(json.dumps(report))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="shannon-startup-") as workdir:
+        report = {
+            "python": sys.version.split()[0],
+            "imports": {module: profile_imports(module, args.top) for module in CLIENT_MODULES},
+            "startup": profile_startup(workdir),
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Wrote report to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Script to serve Crochet conversations over HTTP.
+
+Runs the ASGI app of src/lib/pioneer/server.py under uvicorn, which must be
+installed (pip install uvicorn). With --offline the OpenAI API is replaced by
+the local stand-in, so the server can be load-tested without an API key.
+
+Example:
+    curl -X POST localhost:8000/sessions/alice/messages -d '{"message": "What is entropy?"}'
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.lib.pioneer.gestarum.lib.crochet_thread import MemoryBudget
+from src.lib.pioneer.gestarum.lib.environment import load_env
+from src.lib.pioneer.gestarum.lib.instrumentation import configure_instrumentation
+from src.lib.pioneer.server import ChatServer
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Serve Crochet conversations over HTTP")
+    parser.add_argument(
+        "--assistant-name",
+        type=str,
+        default="shannon_assistant",
+        help="Name of the assistant configuration to serve",
+    )
+    parser.add_argument(
+        "--config-directory",
+        type=str,
+        default="src/lib/pioneer/config",
+        help="Directory containing assistant configurations",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument(
+        "--characters",
+        type=str,
+        default="shannon_default",
+        help="Comma-separated character IDs answering each message",
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads running chats")
+    parser.add_argument("--max-queue", type=int, default=64, help="Requests that may wait for a worker")
+    parser.add_argument("--max-sessions", type=int, default=1000, help="Sessions kept in memory")
+    parser.add_argument("--run-workers", type=int, default=16, help="Character runs in flight")
+    parser.add_argument(
+        "--sqlite",
+        type=str,
+        default=None,
+        help="Store threads in this SQLite database instead of JSON files",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="Record per-stage latencies, served at /metrics and /metrics/prometheus",
+    )
+    parser.add_argument("--memory-budget", type=int, default=None, help="Byte budget per conversation")
+    parser.add_argument("--process-budget", type=int, default=None, help="Byte budget of all conversations")
+    parser.add_argument(
+        "--compact-edges",
+        action="store_true",
+        help="Store each conversation's graph edges in compact columns",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use the offline OpenAI stand-in (no network or API key needed)",
+    )
+    parser.add_argument("--latency", type=float, default=0.005, help="Offline request latency in seconds")
+    parser.add_argument("--run-duration", type=float, default=0.05, help="Offline run duration in seconds")
+    return parser.parse_args()
+
+def main():
+    """Build the server and run it until interrupted."""
+    args = parse_args()
+    load_env()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: uvicorn is not installed (pip install uvicorn)")
+        sys.exit(1)
+
+    if args.instrument:
+        configure_instrumentation()
+
+    client = None
+    if args.offline:
+        from src.lib.pioneer.gestarum.lib.offline_openai import OfflineOpenAI
+        client = OfflineOpenAI(latency=args.latency, run_duration=args.run_duration)
+    elif not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY environment variable not set")
+        print("Please set it in the .env file or export it in your shell")
+        sys.exit(1)
+
+    thread_storage = None
+    if args.sqlite:
+        from src.lib.pioneer.gestarum.lib.thread_storage import SQLiteThreadStorage
+        thread_storage = SQLiteThreadStorage(args.sqlite)
+
+    app = ChatServer(
+        args.assistant_name,
+        config_directory=args.config_directory,
+        client=client,
+        thread_storage=thread_storage,
+        character_ids=args.characters.split(","),
+        max_workers=args.workers,
+        max_queue=args.max_queue,
+        max_sessions=args.max_sessions,
+        run_workers=args.run_workers,
+        memory_budget=args.memory_budget,
+        process_budget=MemoryBudget(args.process_budget) if args.process_budget else None,
+        compact_edges=args.compact_edges,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, lifespan="on")
+
+if __name__ == "__main__":
+    main()
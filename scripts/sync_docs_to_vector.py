@@ -4,18 +4,37 @@ Script to sync Obsidian documentation to OpenAI's vector store.
 
 This script scans the Obsidian vault, extracts markdown files,
 and uploads them to OpenAI for use with the file_search tool.
+
+A manifest of uploaded notes, keyed by path and content hash, makes
+re-syncs incremental: unchanged notes are skipped, changed notes are
+replaced and notes deleted from the vault are removed remotely.
 """
 
+import argparse
+import json
 import os
 import sys
-import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
 from dotenv import load_dotenv
 from openai import OpenAI
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.lib.pioneer.gestarum.lib.atomic_file import (
+    atomic_write,
+    file_lock,
+    write_json,
+)
+from src.lib.pioneer.gestarum.lib.file_management import content_sha256
+from src.lib.pioneer.gestarum.lib.rate_limit import call_with_retry
+
 load_dotenv()
 
+MANIFEST_NAME = ".sync_manifest.json"
+
 def parse_args():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -33,6 +52,18 @@ def parse_args():
         default="src/lib/pioneer/config/shannon_assistant.json",
         help="Path to the assistant configuration file",
     )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help=f"Path to the sync manifest (default: <docs-dir>/{MANIFEST_NAME})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent uploads and deletions",
+    )
     parser.add_argument(
         "--force",
         action="store_true",
@@ -58,49 +89,148 @@ def find_markdown_files(directory: str) -> List[str]:
                 markdown_files.append(os.path.join(root, file))
     return markdown_files
 
-def upload_files_to_openai(api_key: str, file_paths: List[str]) -> List[str]:
+def load_manifest(manifest_file: str) -> Dict[str, Dict[str, str]]:
+    """Load the sync manifest.
+    
+    Args:
+        manifest_file: Path to the manifest file
+        
+    Returns:
+        Mapping of note path (relative to the docs directory) to its
+        content hash and uploaded file ID
+    """
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, "r") as f:
+        manifest: Dict[str, Dict[str, str]] = json.load(f)
+    return manifest
+
+def save_manifest(manifest_file: str, manifest: Dict[str, Dict[str, str]]) -> None:
+    """Save the sync manifest, replacing the previous one atomically.
+    
+    Args:
+        manifest_file: Path to the manifest file
+        manifest: Mapping of note path to content hash and file ID
+    """
+    with atomic_write(manifest_file) as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def plan_sync(
+    docs_dir: str,
+    markdown_files: List[str],
+    manifest: Dict[str, Dict[str, str]],
+    force: bool = False,
+) -> Tuple[Dict[str, str], Dict[str, Dict[str, str]], List[str]]:
+    """Work out which notes need uploading and which remote files are stale.
+    
+    Args:
+        docs_dir: Path to the documentation directory
+        markdown_files: Paths to the markdown files currently in the vault
+        manifest: Manifest from the previous sync
+        force: Upload every note even if its content is unchanged
+        
+    Returns:
+        Content hashes of the notes to upload keyed by relative path, the
+        manifest entries that can be kept as they are, and the file IDs
+        of remote copies that are replaced or no longer in the vault
+    """
+    to_upload: Dict[str, str] = {}
+    unchanged: Dict[str, Dict[str, str]] = {}
+    stale: List[str] = []
+    
+    for file_path in markdown_files:
+        rel_path = os.path.relpath(file_path, docs_dir)
+        content_hash = content_sha256(file_path)
+        entry = manifest.get(rel_path)
+        if entry and entry["sha256"] == content_hash and not force:
+            unchanged[rel_path] = entry
+            continue
+        to_upload[rel_path] = content_hash
+        if entry:
+            stale.append(entry["file_id"])
+            
+    for rel_path, entry in manifest.items():
+        if rel_path not in unchanged and rel_path not in to_upload:
+            stale.append(entry["file_id"])
+            
+    return to_upload, unchanged, stale
+
+def upload_files_to_openai(
+    client: OpenAI, file_paths: List[str], max_workers: int = 8
+) -> Dict[str, str]:
     """Upload files to OpenAI for use with the file_search tool.
     
     Args:
-        api_key: OpenAI API key
+        client: OpenAI client instance
         file_paths: List of paths to files to upload
+        max_workers: Maximum number of concurrent uploads
         
     Returns:
-        List of uploaded file IDs
+        Mapping of file path to uploaded file ID, for the files that uploaded
+        (transient failures are retried before a file is given up on)
     """
-    client = OpenAI(api_key=api_key)
-    file_ids = []
-    
-    for file_path in file_paths:
+    def upload(file_path: str) -> Optional[str]:
         try:
             with open(file_path, "rb") as file:
-                response = client.files.create(
-                    file=file,
-                    purpose="assistants"
-                )
-                file_ids.append(response.id)
-                print(f"Uploaded {file_path} with ID {response.id}")
+                content = (os.path.basename(file_path), file.read())
+            response = call_with_retry(
+                client.files.create,
+                file=content,
+                purpose="assistants"
+            )
+            print(f"Uploaded {file_path} with ID {response.id}")
+            return response.id
         except Exception as e:
             print(f"Error uploading {file_path}: {e}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        file_ids = list(pool.map(upload, file_paths))
+    
+    return {
+        file_path: file_id
+        for file_path, file_id in zip(file_paths, file_ids)
+        if file_id
+    }
+
+def delete_files_from_openai(
+    client: OpenAI, file_ids: List[str], max_workers: int = 8
+) -> None:
+    """Delete previously uploaded files that are no longer referenced.
+    
+    Args:
+        client: OpenAI client instance
+        file_ids: IDs of the files to delete
+        max_workers: Maximum number of concurrent deletions
+    """
+    def delete(file_id: str) -> None:
+        try:
+            call_with_retry(client.files.delete, file_id, idempotent=True)
+            print(f"Deleted stale file {file_id}")
+        except Exception as e:
+            print(f"Error deleting {file_id}: {e}")
     
-    return file_ids
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(delete, file_ids))
 
 def update_assistant_config(config_file: str, file_ids: List[str]) -> None:
     """Update the assistant configuration with the uploaded file IDs.
     
+    The file is read and atomically replaced under the lock that
+    AssistantConfiguration saves take, and its version is incremented, so
+    a configuration read before the update raises VersionConflict on save
+    instead of overwriting it.
+    
     Args:
         config_file: Path to the assistant configuration file
         file_ids: List of uploaded file IDs
     """
-    import json
-    
-    with open(config_file, "r") as f:
-        config = json.load(f)
-    
-    config["files"] = file_ids
-    
-    with open(config_file, "w") as f:
-        json.dump(config, f, indent=2)
+    with file_lock(config_file):
+        with open(config_file, "r") as f:
+            config = json.load(f)
+        config["files"] = file_ids
+        config["version"] = config.get("version", 0) + 1
+        write_json(config_file, config, indent=2)
     
     print(f"Updated assistant configuration with {len(file_ids)} files")
 
@@ -119,13 +249,46 @@ def main():
         print(f"Error: Documentation directory {docs_dir} not found")
         sys.exit(1)
     
+    manifest_file = args.manifest or os.path.join(docs_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_file)
+    
     markdown_files = find_markdown_files(docs_dir)
     print(f"Found {len(markdown_files)} markdown files in {docs_dir}")
     
-    file_ids = upload_files_to_openai(api_key, markdown_files)
-    print(f"Uploaded {len(file_ids)} files to OpenAI")
+    to_upload, unchanged, stale = plan_sync(
+        docs_dir, markdown_files, manifest, force=args.force
+    )
+    print(
+        f"{len(unchanged)} unchanged, {len(to_upload)} to upload, "
+        f"{len(stale)} stale remote files"
+    )
+    
+    client = OpenAI(api_key=api_key, max_retries=0)  # call_with_retry() retries
+    uploaded = upload_files_to_openai(
+        client,
+        [os.path.join(docs_dir, rel_path) for rel_path in to_upload],
+        max_workers=args.workers,
+    )
+    print(f"Uploaded {len(uploaded)} files to OpenAI")
+    
+    new_manifest = dict(unchanged)
+    for rel_path, content_hash in to_upload.items():
+        file_id = uploaded.get(os.path.join(docs_dir, rel_path))
+        if file_id:
+            new_manifest[rel_path] = {"sha256": content_hash, "file_id": file_id}
+        elif rel_path in manifest:
+            # Keep the previous upload until a retry succeeds.
+            new_manifest[rel_path] = manifest[rel_path]
+            stale.remove(manifest[rel_path]["file_id"])
+    
+    update_assistant_config(
+        args.config_file,
+        [new_manifest[rel_path]["file_id"] for rel_path in sorted(new_manifest)],
+    )
+    save_manifest(manifest_file, new_manifest)
     
-    update_assistant_config(args.config_file, file_ids)
+    if stale:
+        delete_files_from_openai(client, stale, max_workers=args.workers)
 
 if __name__ == "__main__":
     main()
@@ -5,16 +5,15 @@ Test script for the Shannon assistant with Crochet thread model.
 
 import os
 import sys
-from dotenv import load_dotenv
-from openai import OpenAI
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.lib.pioneer.assistant_client_crochet import CrochetAssistantClient
+from src.lib.pioneer.gestarum.lib.environment import load_env
 
 def main():
     """Test the Shannon assistant with Crochet thread model."""
-    load_dotenv()
+    load_env()
     
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY environment variable not set")
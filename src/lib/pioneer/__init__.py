@@ -1,3 +1,18 @@
-"""Pioneer module for TheBookofShannon assistant implementation."""
+"""Pioneer module for TheBookofShannon assistant implementation.
 
-from src.lib.pioneer.assistant_client import AssistantClient
+The clients are imported on first access, so importing one client module
+does not also import the other (and asyncio with it).
+"""
+
+from typing import Any
+
+__all__ = ["AssistantClient", "AsyncAssistantClient"]
+
+def __getattr__(name: str) -> Any:
+    if name == "AssistantClient":
+        from src.lib.pioneer.assistant_client import AssistantClient
+        return AssistantClient
+    if name == "AsyncAssistantClient":
+        from src.lib.pioneer.async_assistant_client import AsyncAssistantClient
+        return AsyncAssistantClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
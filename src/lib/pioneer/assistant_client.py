@@ -4,14 +4,17 @@ and configuration loading.
 """
 
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Iterator, Optional
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
 
 from src.lib.pioneer.gestarum.lib.assistant_manager import AssistantManager
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.environment import default_client, load_env
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread_storage import ThreadStorage
 
-load_dotenv()
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 class AssistantClient:
     """
@@ -24,25 +27,48 @@ class AssistantClient:
     - Sending messages and receiving responses
     """
 
-    def __init__(self, assistant_name: str, config_directory: str = "src/lib/pioneer/config"):
+    def __init__(
+        self,
+        assistant_name: str,
+        config_directory: str = "src/lib/pioneer/config",
+        client: Optional["OpenAI"] = None,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        thread_storage: Optional[ThreadStorage] = None,
+    ):
         """Initialize the assistant client.
         
         Args:
             assistant_name: Name of the assistant configuration to load
             config_directory: Path to the directory containing assistant configurations
+            client: Optional preconfigured OpenAI client (for example a shared
+                client or an offline stand-in); built from OPENAI_API_KEY if omitted
+            response_cache: Optional on-disk cache answering repeated
+                questions without a run
+            doc_index: Optional local index of the notes whose top passages
+                are sent with each run
+            thread_storage: Optional thread store, such as an
+                SQLiteThreadStorage; JSON files in the threads directory
+                are used otherwise
         
         Raises:
-            ValueError: If OPENAI_API_KEY is not set or the assistant is not found
+            ValueError: If no client is given and OPENAI_API_KEY is not set
         """
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
+        load_env()
+        if client is None:
+            client = default_client()
             
-        self.client = OpenAI(api_key=api_key)
+        self.client = client
         
         os.makedirs(config_directory, exist_ok=True)
         
-        self.manager = AssistantManager(self.client, config_directory=config_directory)
+        self.manager = AssistantManager(
+            self.client,
+            config_directory=config_directory,
+            response_cache=response_cache,
+            doc_index=doc_index,
+            thread_storage=thread_storage,
+        )
         self.assistant = self.manager.assistant_index.get(assistant_name)
         
         if not self.assistant:
@@ -60,11 +86,9 @@ class AssistantClient:
         self.thread_name = "Default Thread"
         self.thread_id = None
         
-        for thread_id, thread in self.assistant.threads.items():
-            if thread.name == self.thread_name:
-                self.thread_id = thread_id
-                print(f"Thread '{self.thread_name}' found with ID: {thread_id}")
-                break
+        self.thread_id = self.assistant.threads.find(self.thread_name)
+        if self.thread_id:
+            print(f"Thread '{self.thread_name}' found with ID: {self.thread_id}")
         
         if not self.thread_id:
             self.thread_id = self.assistant.create_thread(name=self.thread_name)
@@ -81,3 +105,15 @@ class AssistantClient:
             The assistant's response
         """
         return self.assistant.send_message(self.thread_id, message)
+    
+    def chat_stream(self, message: str) -> Iterator[str]:
+        """
+        Sends a message to the assistant and yields the response as it is generated.
+        
+        Args:
+            message: The message to send to the assistant
+            
+        Yields:
+            Text deltas of the response; joined, they are what chat() returns
+        """
+        return self.assistant.stream_message(self.thread_id, message)
@@ -4,25 +4,43 @@ providing nonlinear thread management and configuration loading.
 """
 
 import os
-from typing import Dict, List, Optional, Any
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Any, Set, Tuple
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
 
 from src.lib.pioneer.gestarum.lib.assistant_manager import AssistantManager
-from src.lib.pioneer.gestarum.lib.crochet_thread import CrochetThread
+from src.lib.pioneer.gestarum.lib.crochet_thread import (
+    PIPELINED_CONTEXT_TOKENS,
+    CrochetThread,
+    MemoryBudget,
+)
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.environment import default_client, load_env
+from src.lib.pioneer.gestarum.lib.instrumentation import observe
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread_storage import GraphStorage, ThreadStorage
 
-load_dotenv()
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 class CrochetAssistantClient:
     """
     A ChatGPT client that loads an assistant by name and maintains a nonlinear thread.
-
+    
     This client handles:
     - Loading OpenAI API credentials from environment variables
     - Managing assistant configurations from a specified directory
     - Creating and maintaining nonlinear Crochet threads
     - Sending messages and receiving responses from multiple character perspectives
+    
+    Each character runs on its own OpenAI thread (the first character uses the
+    default thread), so the runs for one message can proceed concurrently.
+    Messages can also be pipelined with submit() and their responses taken
+    with results(), keeping the runs of many messages in flight at once.
     """
 
     def __init__(
@@ -30,6 +48,21 @@ class CrochetAssistantClient:
         assistant_name: str, 
         config_directory: str = "src/lib/pioneer/config",
         character_ids: Optional[List[str]] = None,
+        client: Optional["OpenAI"] = None,
+        journal: bool = True,
+        character_instructions: Optional[Dict[str, str]] = None,
+        max_workers: int = 4,
+        context_token_budget: Optional[int] = None,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        thread_storage: Optional[ThreadStorage] = None,
+        memory_budget: Optional[int] = None,
+        process_budget: Optional[MemoryBudget] = None,
+        budget_lock: Optional[threading.Lock] = None,
+        compact_edges: bool = False,
+        manager: Optional[AssistantManager] = None,
+        thread_name: str = "Default Thread",
+        executor: Optional[ThreadPoolExecutor] = None,
     ):
         """Initialize the assistant client.
         
@@ -37,19 +70,61 @@ class CrochetAssistantClient:
             assistant_name: Name of the assistant configuration to load
             config_directory: Path to the directory containing assistant configurations
             character_ids: Optional list of character IDs to use for responses
+            client: Optional preconfigured OpenAI client (for example a shared
+                client or an offline stand-in); built from OPENAI_API_KEY if omitted
+            journal: Persist the Crochet thread as an append-only journal so
+                each turn only writes the records it added
+            character_instructions: Optional per-character instructions sent
+                as additional_instructions with that character's run
+            max_workers: Maximum number of character runs in flight at once
+            context_token_budget: If set, each run is sent a compact context
+                assembled from the Crochet thread within this many tokens
+                instead of the full remote thread history
+            response_cache: Optional on-disk cache answering repeated
+                questions without a run
+            doc_index: Optional local index of the notes whose top passages
+                are sent with each run
+            thread_storage: Optional thread store, such as an
+                SQLiteThreadStorage; JSON files in the threads directory
+                are used otherwise
+            memory_budget: Optional maximum estimated resident bytes of the
+                Crochet thread; older nodes are collapsed into summaries and
+                their content is spilled to disk beyond it
+            process_budget: Optional budget shared by the Crochet threads
+                of several clients in one process
+            budget_lock: Lock the caller holds while using the client, if
+                clients sharing process_budget are used from several OS
+                threads at once; the budget does not shrink this client's
+                Crochet threads while it is held
+            compact_edges: Store the Crochet thread's edges in array-backed
+                columns, which take less memory for long conversations
+            manager: Optional manager shared with other clients; its client,
+                store, cache and index are used, and config_directory,
+                client, thread_storage, response_cache and doc_index are
+                ignored
+            thread_name: Name of the conversation's default thread
+            executor: Optional pool shared with other clients for the
+                character runs; max_workers is ignored if given
         
         Raises:
-            ValueError: If OPENAI_API_KEY is not set or the assistant is not found
+            ValueError: If no client or manager is given and OPENAI_API_KEY
+                is not set
         """
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
+        if manager is None:
+            load_env()
+            if client is None:
+                client = default_client()
+            os.makedirs(config_directory, exist_ok=True)
+            manager = AssistantManager(
+                client,
+                config_directory=config_directory,
+                response_cache=response_cache,
+                doc_index=doc_index,
+                thread_storage=thread_storage,
+            )
             
-        self.client = OpenAI(api_key=api_key)
-        
-        os.makedirs(config_directory, exist_ok=True)
-        
-        self.manager = AssistantManager(self.client, config_directory=config_directory)
+        self.client = manager.client
+        self.manager = manager
         self.assistant = self.manager.assistant_index.get(assistant_name)
         
         if not self.assistant:
@@ -65,46 +140,159 @@ class CrochetAssistantClient:
             self.assistant = self.manager.get_assistant(assistant_id)
 
         self.character_ids = character_ids or ["shannon_default"]
+        self.character_instructions = character_instructions or {}
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.context_token_budget = context_token_budget
+        self.journal = journal
+        self.memory_budget = memory_budget
+        self.process_budget = process_budget
+        self.budget_lock = budget_lock
+        self.compact_edges = compact_edges
         
-        self.thread_name = "Default Thread"
+        self.thread_name = thread_name
         self.thread_id = None
         self.crochet_threads: Dict[str, CrochetThread] = {}
+        # Finished pipelined runs as (correlation ID, character ID, response
+        # or None if the run failed, submission time), and the runs not yet
+        # taken from it
+        self._pipelined: "queue.Queue[Tuple[str, str, Optional[str], float]]" = queue.Queue()
+        self._in_flight = 0
         
-        for thread_id, thread in self.assistant.threads.items():
-            if thread.name == self.thread_name:
-                self.thread_id = thread_id
-                print(f"Thread '{self.thread_name}' found with ID: {thread_id}")
-                
-                crochet_thread = CrochetThread(
-                    thread_id=thread_id,
-                    name=self.thread_name,
-                    storage_dir=self.assistant.config.threads_dir,
-                )
-                
-                for message in thread.messages:
-                    character_id = None
-                    if message["role"] == "assistant":
-                        character_id = self.character_ids[0]  # Default to first character
-                    
-                    crochet_thread.add_message(
-                        role=message["role"],
-                        content=message["content"],
-                        character_id=character_id,
-                    )
-                
-                self.crochet_threads[thread_id] = crochet_thread
-                break
+        self.thread_id = self.assistant.threads.find(self.thread_name)
+        if self.thread_id:
+            print(f"Thread '{self.thread_name}' found with ID: {self.thread_id}")
+            
+            crochet_thread = self._new_crochet_thread(self.thread_id).load()
+            self._sync_crochet_thread(crochet_thread)
+            self.crochet_threads[self.thread_id] = crochet_thread
         
         if not self.thread_id:
             self.thread_id = self.assistant.create_thread(name=self.thread_name)
             print(f"Created new thread with ID: {self.thread_id}")
             
-            crochet_thread = CrochetThread(
-                thread_id=self.thread_id,
-                name=self.thread_name,
-                storage_dir=self.assistant.config.threads_dir,
-            )
+            crochet_thread = self._new_crochet_thread(self.thread_id)
             self.crochet_threads[self.thread_id] = crochet_thread
+            
+        self.character_threads: Dict[str, str] = {self.character_ids[0]: self.thread_id}
+        for char_id in self.character_ids[1:]:
+            self.character_threads[char_id] = self._get_or_create_thread(
+                f"{self.thread_name} [{char_id}]"
+            )
+            
+    def _get_or_create_thread(self, name: str) -> str:
+        """Finds an assistant thread by name, creating it if needed.
+        
+        Args:
+            name: Human-readable name for the thread
+            
+        Returns:
+            Thread ID
+        """
+        thread_id = self.assistant.threads.find(name)
+        if thread_id is not None:
+            return thread_id
+        return self.assistant.create_thread(name=name)
+        
+    def _new_crochet_thread(self, thread_id: str) -> CrochetThread:
+        """Creates the Crochet thread mirroring an assistant thread.
+        
+        It is kept in the assistant's thread store when that store holds
+        graphs, and in files next to the thread's otherwise.
+        """
+        storage = self.assistant.thread_storage
+        crochet_thread = CrochetThread(
+            thread_id=thread_id,
+            name=self.thread_name,
+            storage_dir=self.assistant.config.threads_dir,
+            journal=self.journal,
+            storage=storage if isinstance(storage, GraphStorage) else None,
+            memory_budget=self.memory_budget,
+            process_budget=self.process_budget,
+            compact_edges=self.compact_edges,
+        )
+        if self.process_budget is not None and self.budget_lock is not None:
+            self.process_budget.register(crochet_thread, self.budget_lock)
+        return crochet_thread
+        
+    def _sync_crochet_thread(self, crochet_thread: CrochetThread) -> None:
+        """Adds the default thread's messages that the loaded graph lacks.
+        
+        Only the messages past the graph's synced_messages mark are read
+        from the thread store, so an unchanged thread is not replayed. A
+        graph saved before the mark was recorded already mirrors the
+        thread, so it is only given the current message count.
+        
+        Args:
+            crochet_thread: Loaded Crochet thread of the default thread
+        """
+        mark = crochet_thread.synced_messages
+        loaded = self.assistant.thread_storage.load_messages(
+            self.thread_id, start=mark or 0
+        )
+        if loaded is None:
+            return
+        _, messages = loaded
+        if mark is None:
+            crochet_thread.mark_synced(len(messages))
+        else:
+            for message in messages:
+                character_id = None
+                if message["role"] == "assistant":
+                    character_id = self.character_ids[0]  # Default to first character
+                
+                crochet_thread.add_message(
+                    role=message["role"],
+                    content=message["content"],
+                    character_id=character_id,
+                )
+            crochet_thread.mark_synced(mark + len(messages))
+        crochet_thread.save()
+        
+    def _instructions_for(self, character_id: str) -> Optional[str]:
+        """Returns the per-run instructions for a character, if any."""
+        if character_id in self.character_instructions:
+            return self.character_instructions[character_id]
+        if len(self.character_ids) > 1:
+            persona = character_id.replace("_", " ")
+            return f"Respond from the perspective of the {persona} persona."
+        return None
+        
+    def _context_for(
+        self,
+        crochet_thread: CrochetThread,
+        user_node_id: str,
+        character_id: str,
+        token_budget: Optional[int] = None,
+    ) -> Optional[List[Dict[str, str]]]:
+        """Assembles the budgeted context a character's run is sent, if enabled.
+        
+        Args:
+            crochet_thread: Thread holding the conversation
+            user_node_id: Node of the message being answered
+            character_id: Character the run is for
+            token_budget: Budget to use instead of context_token_budget
+            
+        Returns:
+            Context messages, or None to use the remote thread history
+        """
+        if token_budget is None:
+            token_budget = self.context_token_budget
+        if token_budget is None:
+            return None
+        user_node = crochet_thread.nodes[user_node_id]
+        budget = token_budget - user_node.token_count(
+            crochet_thread.token_counter
+        )
+        return [
+            {"role": entry["role"], "content": entry["content"]}
+            for entry in crochet_thread.build_context(
+                user_node_id,
+                max(budget, 0),
+                character_id=character_id,
+                include_target=False,
+            )
+        ]
     
     def chat(self, message: str, character_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -117,39 +305,286 @@ class CrochetAssistantClient:
         Returns:
             Dictionary with character IDs as keys and responses as values
         """
-        self.crochet_threads[self.thread_id].add_message(
+        responses = dict(self.chat_iter(message, character_id))
+        return {
+            char_id: responses[char_id]
+            for char_id in self.character_ids
+            if char_id in responses
+        }
+    
+    def chat_iter(
+        self, message: str, character_id: Optional[str] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Sends a message and yields each character's response as it completes.
+        
+        The thread is saved once every response arrived, or when the
+        iteration is abandoned. The time to each response is recorded as
+        the stage crochet.character, and the whole turn as crochet.chat.
+        
+        Args:
+            message: The message to send to the assistant
+            character_id: Optional character ID to filter responses
+            
+        Yields:
+            (character ID, {"content", "node_id"}) in order of completion
+        """
+        start = time.perf_counter()
+        crochet_thread = self.crochet_threads[self.thread_id]
+        user_node_id = crochet_thread.add_message(
             role="user",
             content=message,
         )
         
-        response = self.assistant.send_message(self.thread_id, message)
-        
-        responses = {}
+        selected = [
+            char_id for char_id in self.character_ids
+            if not character_id or char_id == character_id
+        ]
+        futures = {
+            self.executor.submit(
+                self.assistant.send_message,
+                self.character_threads[char_id],
+                message,
+                self._instructions_for(char_id),
+                self._context_for(crochet_thread, user_node_id, char_id),
+            ): char_id
+            for char_id in selected
+        }
         
-        for char_id in self.character_ids:
-            if character_id and char_id != character_id:
-                continue
+        try:
+            for future in as_completed(futures):
+                char_id = futures[future]
+                try:
+                    response = future.result()
+                except Exception as e:
+                    print(f"Error getting response for character {char_id}: {e}")
+                    continue
+                    
+                node_id = crochet_thread.add_character_response(
+                    character_id=char_id,
+                    content=response,
+                    context_node_ids=[user_node_id],
+                )
+                observe("crochet.character", time.perf_counter() - start)
                 
-            node_id = self.crochet_threads[self.thread_id].add_character_response(
-                character_id=char_id,
-                content=response,
+                yield char_id, {
+                    "content": response,
+                    "node_id": node_id,
+                }
+        finally:
+            # The default thread gained this turn's messages, which the graph holds
+            crochet_thread.mark_synced(len(self.assistant.threads[self.thread_id].messages))
+            crochet_thread.save()
+            observe("crochet.chat", time.perf_counter() - start)
+    
+    def chat_stream(
+        self, message: str, character_id: Optional[str] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Sends a message and yields each character's response as it is generated.
+        
+        A character's response is added to the graph as a provisional node
+        when its first text arrives. The node's content grows with each
+        delta and is finalized in place once the response is complete. A
+        response cut short by an error, or by abandoning the iteration, is
+        finalized with the text received so far and marked
+        {"incomplete": True}. The thread is saved at the end, as by
+        chat_iter(). The time to each character's first text is recorded
+        as the stage crochet.first_delta.
+        
+        Args:
+            message: The message to send to the assistant
+            character_id: Optional character ID to filter responses
+            
+        Yields:
+            (character ID, event) pairs, where event is
+            {"type": "delta", "delta", "node_id"} for each piece of text and
+            {"type": "done", "content", "node_id"} once a response is complete
+        """
+        start = time.perf_counter()
+        crochet_thread = self.crochet_threads[self.thread_id]
+        user_node_id = crochet_thread.add_message(
+            role="user",
+            content=message,
+        )
+        
+        selected = [
+            char_id for char_id in self.character_ids
+            if not character_id or char_id == character_id
+        ]
+        # (character ID, delta, None) per piece of text, then (character ID,
+        # None, outcome) with the reply in outcome unless the run failed
+        events: "queue.Queue[Tuple[str, Optional[str], Optional[Dict[str, Any]]]]" = queue.Queue()
+        
+        def stream(char_id: str, instructions: Optional[str], context: Any) -> None:
+            outcome: Dict[str, Any] = {}
+            try:
+                for delta in self.assistant.stream_message(
+                    self.character_threads[char_id], message, instructions, context, outcome
+                ):
+                    events.put((char_id, delta, None))
+            except Exception as e:
+                print(f"Error getting response for character {char_id}: {e}")
+                outcome = {}
+            events.put((char_id, None, outcome))
+        
+        for char_id in selected:
+            self.executor.submit(
+                stream,
+                char_id,
+                self._instructions_for(char_id),
+                self._context_for(crochet_thread, user_node_id, char_id),
             )
+        
+        node_ids: Dict[str, str] = {}
+        parts: Dict[str, List[str]] = {}
+        finished: Set[str] = set()
+        try:
+            while len(finished) < len(selected):
+                char_id, delta, outcome = events.get()
+                if delta is not None:
+                    if char_id not in node_ids:
+                        node_ids[char_id] = crochet_thread.add_character_response(
+                            character_id=char_id,
+                            content="",
+                            context_node_ids=[user_node_id],
+                            provisional=True,
+                        )
+                        parts[char_id] = []
+                        observe("crochet.first_delta", time.perf_counter() - start)
+                    parts[char_id].append(delta)
+                    crochet_thread.update_node_content(
+                        node_ids[char_id], "".join(parts[char_id]), final=False
+                    )
+                    yield char_id, {"type": "delta", "delta": delta, "node_id": node_ids[char_id]}
+                    continue
+                    
+                finished.add(char_id)
+                response = outcome.get("reply")
+                if response is None:
+                    continue  # A provisional node is finalized as incomplete below
+                node_id = node_ids.get(char_id)
+                if node_id is None:
+                    node_id = crochet_thread.add_character_response(
+                        character_id=char_id,
+                        content=response,
+                        context_node_ids=[user_node_id],
+                    )
+                else:
+                    crochet_thread.update_node_content(node_id, response)
+                    del parts[char_id]
+                observe("crochet.character", time.perf_counter() - start)
+                
+                yield char_id, {"type": "done", "content": response, "node_id": node_id}
+        finally:
+            for char_id, partial in parts.items():
+                crochet_thread.update_node_content(
+                    node_ids[char_id], "".join(partial), metadata={"incomplete": True}
+                )
+            # The default thread gained this turn's messages, which the graph holds
+            crochet_thread.mark_synced(len(self.assistant.threads[self.thread_id].messages))
+            crochet_thread.save()
+            observe("crochet.chat", time.perf_counter() - start)
+    
+    def submit(self, message: str, character_id: Optional[str] = None) -> str:
+        """
+        Sends a message without waiting for its responses.
+        
+        The message is added to the graph as a pipelined prompt and the
+        selected characters' runs are started at once; take their responses
+        with results(). Pipelined runs are always sent a context assembled
+        from the graph, within context_token_budget or else
+        PIPELINED_CONTEXT_TOKENS, so runs for several messages do not
+        contend for a character's remote thread. The context of a message
+        includes earlier messages still awaiting their responses.
+        
+        Args:
+            message: The message to send to the assistant
+            character_id: Optional character ID to filter responses
             
-            responses[char_id] = {
-                "content": response,
-                "node_id": node_id,
-            }
+        Returns:
+            Correlation ID of the message, which results() reports with
+            each of its responses
+        """
+        start = time.perf_counter()
+        crochet_thread = self.crochet_threads[self.thread_id]
+        selected = [
+            char_id for char_id in self.character_ids
+            if not character_id or char_id == character_id
+        ]
+        correlation_id = str(uuid.uuid4())
+        user_node_id = crochet_thread.submit_prompt(
+            correlation_id, message, expected_responses=len(selected)
+        )
         
-        self.crochet_threads[self.thread_id].save()
+        def run(char_id: str, instructions: Optional[str], context: Any) -> None:
+            try:
+                response = self.assistant.send_message(
+                    self.character_threads[char_id], message, instructions, context
+                )
+            except Exception as e:
+                print(f"Error getting response for character {char_id}: {e}")
+                response = None
+            self._pipelined.put((correlation_id, char_id, response, start))
+        
+        token_budget = self.context_token_budget or PIPELINED_CONTEXT_TOKENS
+        for char_id in selected:
+            self.executor.submit(
+                run,
+                char_id,
+                self._instructions_for(char_id),
+                self._context_for(crochet_thread, user_node_id, char_id, token_budget),
+            )
+            self._in_flight += 1
+        return correlation_id
+    
+    def results(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Yields the responses to submitted messages in order of completion.
+        
+        Each response is bound to its message's node by correlation ID. The
+        iteration ends once no run is in flight, including the runs of
+        messages submitted while iterating. The thread is saved then, or
+        when the iteration is abandoned, which leaves the remaining runs in
+        flight for a later call. The time from submitting a message
+        to each of its responses is recorded as the stage crochet.character.
         
-        return responses
+        Yields:
+            (correlation ID, character ID, {"content", "node_id"})
+        """
+        crochet_thread = self.crochet_threads[self.thread_id]
+        try:
+            while self._in_flight:
+                correlation_id, char_id, response, start = self._pipelined.get()
+                self._in_flight -= 1
+                if response is None:
+                    crochet_thread.cancel_response(correlation_id)
+                    continue
+                node_id = crochet_thread.bind_response(correlation_id, char_id, response)
+                observe("crochet.character", time.perf_counter() - start)
+                
+                yield correlation_id, char_id, {
+                    "content": response,
+                    "node_id": node_id,
+                }
+        finally:
+            # The default thread gained the finished runs' messages, which the graph holds
+            crochet_thread.mark_synced(len(self.assistant.threads[self.thread_id].messages))
+            crochet_thread.save()
     
-    def get_conversation_history(self, character_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_conversation_history(
+        self,
+        character_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Gets the conversation history, optionally filtered by character.
         
         Args:
             character_id: Optional character ID to filter responses
+            limit: Optional number of most recent messages to return
+            since: Optional timestamp; only messages from then on are returned
             
         Returns:
             List of messages in chronological order
@@ -157,12 +592,23 @@ class CrochetAssistantClient:
         if self.thread_id not in self.crochet_threads:
             return []
             
-        messages = self.crochet_threads[self.thread_id].get_linear_conversation()
+        return self.crochet_threads[self.thread_id].get_linear_conversation(
+            limit=limit,
+            since=since,
+            character_id=character_id,
+        )
         
-        if character_id:
-            messages = [
-                msg for msg in messages
-                if msg["role"] != "assistant" or msg.get("character_id") == character_id
-            ]
-            
-        return messages
+    def close(self) -> None:
+        """Releases the conversation's threads from memory.
+        
+        Every turn is saved as it completes, so nothing is written here; the
+        client must not be used afterwards. The graphs' spill files are
+        removed.
+        """
+        for thread_id in [self.thread_id, *self.character_threads.values()]:
+            self.assistant.threads.forget(thread_id)
+        for crochet_thread in self.crochet_threads.values():
+            crochet_thread.close()
+        self.crochet_threads.clear()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,132 @@
+"""
+An asyncio client for interacting with OpenAI's Assistant API, providing persistent
+thread management and configuration loading on a single event loop.
+"""
+
+import os
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from src.lib.pioneer.gestarum.lib.async_assistant import AsyncAssistant
+from src.lib.pioneer.gestarum.lib.async_assistant_manager import AsyncAssistantManager
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.environment import default_client, load_env
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread_storage import ThreadStorage
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+class AsyncAssistantClient:
+    """
+    Asyncio counterpart of AssistantClient.
+
+    Many clients can share one event loop, so a single process can keep
+    hundreds of conversations in flight. Network setup happens in start():
+
+        client = await AsyncAssistantClient("shannon_assistant").start()
+        reply = await client.chat("What is entropy?")
+    """
+
+    def __init__(
+        self,
+        assistant_name: str,
+        config_directory: str = "src/lib/pioneer/config",
+        client: Optional["AsyncOpenAI"] = None,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        thread_storage: Optional[ThreadStorage] = None,
+    ):
+        """Initialize the assistant client.
+        
+        Args:
+            assistant_name: Name of the assistant configuration to load
+            config_directory: Path to the directory containing assistant configurations
+            client: Optional preconfigured AsyncOpenAI client (for example a shared
+                client or an offline stand-in); built from OPENAI_API_KEY if omitted
+            response_cache: Optional on-disk cache answering repeated
+                questions without a run
+            doc_index: Optional local index of the notes whose top passages
+                are sent with each run
+            thread_storage: Optional thread store, such as an
+                SQLiteThreadStorage; JSON files in the threads directory
+                are used otherwise
+        
+        Raises:
+            ValueError: If no client is given and OPENAI_API_KEY is not set
+        """
+        load_env()
+        if client is None:
+            client = default_client(use_async=True)
+            
+        self.client = client
+        
+        os.makedirs(config_directory, exist_ok=True)
+        
+        self.assistant_name = assistant_name
+        self.manager = AsyncAssistantManager(
+            self.client,
+            config_directory=config_directory,
+            response_cache=response_cache,
+            doc_index=doc_index,
+            thread_storage=thread_storage,
+        )
+        self.assistant: Optional[AsyncAssistant] = None
+        self.thread_name = "Default Thread"
+        self.thread_id: Optional[str] = None
+
+    async def start(self) -> "AsyncAssistantClient":
+        """Loads or creates the assistant and its default thread.
+        
+        Returns:
+            The client itself, ready to chat
+        """
+        await self.manager.load_assistants()
+        self.assistant = await self.manager.get_assistant_by_name(self.assistant_name)
+        
+        if not self.assistant:
+            print(f"Assistant '{self.assistant_name}' not found, creating it")
+            config_data = {
+                "name": self.assistant_name,
+                "instructions": "You are an assistant specializing in Claude Shannon's information theory. Help users understand Shannon's concepts and theories.",
+                "model": "gpt-4o",
+                "tools": [{"type": "file_search"}],
+                "files": [],
+            }
+            assistant_id = await self.manager.create_assistant(config_data)
+            self.assistant = await self.manager.get_assistant(assistant_id)
+
+        self.thread_id = self.assistant.threads.find(self.thread_name)
+        if self.thread_id:
+            print(f"Thread '{self.thread_name}' found with ID: {self.thread_id}")
+        
+        if not self.thread_id:
+            self.thread_id = await self.assistant.create_thread(name=self.thread_name)
+            print(f"Created new thread with ID: {self.thread_id}")
+        return self
+    
+    async def chat(self, message: str) -> str:
+        """
+        Sends a message to the assistant and returns the response.
+        
+        Args:
+            message: The message to send to the assistant
+            
+        Returns:
+            The assistant's response
+        """
+        return await self.assistant.send_message(self.thread_id, message)
+    
+    def chat_stream(self, message: str) -> AsyncIterator[str]:
+        """
+        Sends a message to the assistant and yields the response as it is generated.
+        
+            async for delta in client.chat_stream("What is entropy?"):
+                print(delta, end="", flush=True)
+        
+        Args:
+            message: The message to send to the assistant
+            
+        Yields:
+            Text deltas of the response; joined, they are what chat() returns
+        """
+        return self.assistant.stream_message(self.thread_id, message)
@@ -0,0 +1,586 @@
+"""
+An asyncio client for interacting with OpenAI's Assistant API with McTavish's Crochet
+thread model, providing nonlinear thread management on a single event loop.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Any, Set, Tuple
+
+from src.lib.pioneer.gestarum.lib.async_assistant import AsyncAssistant
+from src.lib.pioneer.gestarum.lib.async_assistant_manager import AsyncAssistantManager
+from src.lib.pioneer.gestarum.lib.crochet_thread import (
+    PIPELINED_CONTEXT_TOKENS,
+    CrochetThread,
+    MemoryBudget,
+)
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.environment import default_client, load_env
+from src.lib.pioneer.gestarum.lib.instrumentation import observe
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread_storage import GraphStorage, ThreadStorage
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+class AsyncCrochetAssistantClient:
+    """
+    Asyncio counterpart of CrochetAssistantClient.
+    
+    Each character runs on its own OpenAI thread (the first character uses the
+    default thread), and the runs for one message are gathered concurrently.
+    Messages can also be pipelined with submit() and their responses taken
+    with results(), keeping the runs of many messages in flight at once.
+    
+    Network setup happens in start():
+    
+        client = await AsyncCrochetAssistantClient("shannon_assistant").start()
+        responses = await client.chat("What is entropy?")
+    """
+
+    def __init__(
+        self, 
+        assistant_name: str, 
+        config_directory: str = "src/lib/pioneer/config",
+        character_ids: Optional[List[str]] = None,
+        client: Optional["AsyncOpenAI"] = None,
+        journal: bool = True,
+        character_instructions: Optional[Dict[str, str]] = None,
+        max_concurrency: int = 4,
+        context_token_budget: Optional[int] = None,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        thread_storage: Optional[ThreadStorage] = None,
+        memory_budget: Optional[int] = None,
+        process_budget: Optional[MemoryBudget] = None,
+        compact_edges: bool = False,
+    ):
+        """Initialize the assistant client.
+        
+        Args:
+            assistant_name: Name of the assistant configuration to load
+            config_directory: Path to the directory containing assistant configurations
+            character_ids: Optional list of character IDs to use for responses
+            client: Optional preconfigured AsyncOpenAI client (for example a shared
+                client or an offline stand-in); built from OPENAI_API_KEY if omitted
+            journal: Persist the Crochet thread as an append-only journal so
+                each turn only writes the records it added
+            character_instructions: Optional per-character instructions sent
+                as additional_instructions with that character's run
+            max_concurrency: Maximum number of character runs in flight at once
+            context_token_budget: If set, each run is sent a compact context
+                assembled from the Crochet thread within this many tokens
+                instead of the full remote thread history
+            response_cache: Optional on-disk cache answering repeated
+                questions without a run
+            doc_index: Optional local index of the notes whose top passages
+                are sent with each run
+            thread_storage: Optional thread store, such as an
+                SQLiteThreadStorage; JSON files in the threads directory
+                are used otherwise
+            memory_budget: Optional maximum estimated resident bytes of the
+                Crochet thread; older nodes are collapsed into summaries and
+                their content is spilled to disk beyond it
+            process_budget: Optional budget shared by the Crochet threads
+                of several clients in one process
+            compact_edges: Store the Crochet thread's edges in array-backed
+                columns, which take less memory for long conversations
+        
+        Raises:
+            ValueError: If no client is given and OPENAI_API_KEY is not set
+        """
+        load_env()
+        if client is None:
+            client = default_client(use_async=True)
+            
+        self.client = client
+        
+        os.makedirs(config_directory, exist_ok=True)
+        
+        self.assistant_name = assistant_name
+        self.manager = AsyncAssistantManager(
+            self.client,
+            config_directory=config_directory,
+            response_cache=response_cache,
+            doc_index=doc_index,
+            thread_storage=thread_storage,
+        )
+        self.assistant: Optional[AsyncAssistant] = None
+        self.character_ids = character_ids or ["shannon_default"]
+        self.character_instructions = character_instructions or {}
+        self.run_slots = asyncio.Semaphore(max_concurrency)
+        self.context_token_budget = context_token_budget
+        self.character_threads: Dict[str, str] = {}
+        self.journal = journal
+        self.memory_budget = memory_budget
+        self.process_budget = process_budget
+        self.compact_edges = compact_edges
+        
+        self.thread_name = "Default Thread"
+        self.thread_id: Optional[str] = None
+        self.crochet_threads: Dict[str, CrochetThread] = {}
+        # Finished pipelined runs as (correlation ID, character ID, response
+        # or None if the run failed, submission time), and the runs not yet
+        # taken from it
+        self._pipelined: "asyncio.Queue[Tuple[str, str, Optional[str], float]]" = (
+            asyncio.Queue()
+        )
+        self._pipelined_tasks: Set["asyncio.Task[None]"] = set()
+        self._in_flight = 0
+
+    async def start(self) -> "AsyncCrochetAssistantClient":
+        """Loads or creates the assistant and its default Crochet thread.
+        
+        Returns:
+            The client itself, ready to chat
+        """
+        await self.manager.load_assistants()
+        self.assistant = await self.manager.get_assistant_by_name(self.assistant_name)
+        
+        if not self.assistant:
+            print(f"Assistant '{self.assistant_name}' not found, creating it")
+            config_data = {
+                "name": self.assistant_name,
+                "instructions": "You are an assistant specializing in Claude Shannon's information theory. Help users understand Shannon's concepts and theories.",
+                "model": "gpt-4o",
+                "tools": [{"type": "file_search"}],
+                "files": [],
+            }
+            assistant_id = await self.manager.create_assistant(config_data)
+            self.assistant = await self.manager.get_assistant(assistant_id)
+
+        self.thread_id = self.assistant.threads.find(self.thread_name)
+        if self.thread_id:
+            print(f"Thread '{self.thread_name}' found with ID: {self.thread_id}")
+            
+            crochet_thread = self._new_crochet_thread(self.thread_id).load()
+            self._sync_crochet_thread(crochet_thread)
+            self.crochet_threads[self.thread_id] = crochet_thread
+        
+        if not self.thread_id:
+            self.thread_id = await self.assistant.create_thread(name=self.thread_name)
+            print(f"Created new thread with ID: {self.thread_id}")
+            
+            crochet_thread = self._new_crochet_thread(self.thread_id)
+            self.crochet_threads[self.thread_id] = crochet_thread
+            
+        self.character_threads = {self.character_ids[0]: self.thread_id}
+        for char_id in self.character_ids[1:]:
+            self.character_threads[char_id] = await self._get_or_create_thread(
+                f"{self.thread_name} [{char_id}]"
+            )
+        return self
+        
+    async def _get_or_create_thread(self, name: str) -> str:
+        """Finds an assistant thread by name, creating it if needed.
+        
+        Args:
+            name: Human-readable name for the thread
+            
+        Returns:
+            Thread ID
+        """
+        thread_id = self.assistant.threads.find(name)
+        if thread_id is not None:
+            return thread_id
+        return await self.assistant.create_thread(name=name)
+        
+    def _new_crochet_thread(self, thread_id: str) -> CrochetThread:
+        """Creates the Crochet thread mirroring an assistant thread.
+        
+        It is kept in the assistant's thread store when that store holds
+        graphs, and in files next to the thread's otherwise.
+        """
+        storage = self.assistant.thread_storage
+        return CrochetThread(
+            thread_id=thread_id,
+            name=self.thread_name,
+            storage_dir=self.assistant.config.threads_dir,
+            journal=self.journal,
+            storage=storage if isinstance(storage, GraphStorage) else None,
+            memory_budget=self.memory_budget,
+            process_budget=self.process_budget,
+            compact_edges=self.compact_edges,
+        )
+        
+    def _sync_crochet_thread(self, crochet_thread: CrochetThread) -> None:
+        """Adds the default thread's messages that the loaded graph lacks.
+        
+        Only the messages past the graph's synced_messages mark are read
+        from the thread store, so an unchanged thread is not replayed. A
+        graph saved before the mark was recorded already mirrors the
+        thread, so it is only given the current message count.
+        
+        Args:
+            crochet_thread: Loaded Crochet thread of the default thread
+        """
+        mark = crochet_thread.synced_messages
+        loaded = self.assistant.thread_storage.load_messages(
+            self.thread_id, start=mark or 0
+        )
+        if loaded is None:
+            return
+        _, messages = loaded
+        if mark is None:
+            crochet_thread.mark_synced(len(messages))
+        else:
+            for message in messages:
+                character_id = None
+                if message["role"] == "assistant":
+                    character_id = self.character_ids[0]  # Default to first character
+                
+                crochet_thread.add_message(
+                    role=message["role"],
+                    content=message["content"],
+                    character_id=character_id,
+                )
+            crochet_thread.mark_synced(mark + len(messages))
+        crochet_thread.save()
+        
+    def _instructions_for(self, character_id: str) -> Optional[str]:
+        """Returns the per-run instructions for a character, if any."""
+        if character_id in self.character_instructions:
+            return self.character_instructions[character_id]
+        if len(self.character_ids) > 1:
+            persona = character_id.replace("_", " ")
+            return f"Respond from the perspective of the {persona} persona."
+        return None
+        
+    def _context_for(
+        self,
+        crochet_thread: CrochetThread,
+        user_node_id: str,
+        character_id: str,
+        token_budget: Optional[int] = None,
+    ) -> Optional[List[Dict[str, str]]]:
+        """Assembles the budgeted context a character's run is sent, if enabled.
+        
+        Args:
+            crochet_thread: Thread holding the conversation
+            user_node_id: Node of the message being answered
+            character_id: Character the run is for
+            token_budget: Budget to use instead of context_token_budget
+            
+        Returns:
+            Context messages, or None to use the remote thread history
+        """
+        if token_budget is None:
+            token_budget = self.context_token_budget
+        if token_budget is None:
+            return None
+        user_node = crochet_thread.nodes[user_node_id]
+        budget = token_budget - user_node.token_count(
+            crochet_thread.token_counter
+        )
+        return [
+            {"role": entry["role"], "content": entry["content"]}
+            for entry in crochet_thread.build_context(
+                user_node_id,
+                max(budget, 0),
+                character_id=character_id,
+                include_target=False,
+            )
+        ]
+        
+    async def _character_run(
+        self,
+        character_id: str,
+        message: str,
+        context: Optional[List[Dict[str, str]]] = None,
+    ) -> Tuple[str, str]:
+        """Runs one character's reply within the concurrency limit."""
+        async with self.run_slots:
+            response = await self.assistant.send_message(
+                self.character_threads[character_id],
+                message,
+                self._instructions_for(character_id),
+                context,
+            )
+        return character_id, response
+    
+    async def chat(self, message: str, character_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Sends a message to the assistant and returns responses from all characters.
+        
+        The time to each response is recorded as the stage crochet.character,
+        and the whole turn as crochet.chat.
+        
+        Args:
+            message: The message to send to the assistant
+            character_id: Optional character ID to filter responses
+            
+        Returns:
+            Dictionary with character IDs as keys and responses as values
+        """
+        start = time.perf_counter()
+        crochet_thread = self.crochet_threads[self.thread_id]
+        user_node_id = crochet_thread.add_message(
+            role="user",
+            content=message,
+        )
+        
+        selected = [
+            char_id for char_id in self.character_ids
+            if not character_id or char_id == character_id
+        ]
+        
+        responses = {}
+        
+        for next_done in asyncio.as_completed(
+            [
+                self._character_run(
+                    char_id,
+                    message,
+                    self._context_for(crochet_thread, user_node_id, char_id),
+                )
+                for char_id in selected
+            ]
+        ):
+            try:
+                char_id, response = await next_done
+            except Exception as e:
+                print(f"Error getting character response: {e}")
+                continue
+                
+            node_id = crochet_thread.add_character_response(
+                character_id=char_id,
+                content=response,
+                context_node_ids=[user_node_id],
+            )
+            observe("crochet.character", time.perf_counter() - start)
+            
+            responses[char_id] = {
+                "content": response,
+                "node_id": node_id,
+            }
+        
+        # The default thread gained this turn's messages, which the graph holds
+        crochet_thread.mark_synced(len(self.assistant.threads[self.thread_id].messages))
+        crochet_thread.save()
+        observe("crochet.chat", time.perf_counter() - start)
+        
+        return {
+            char_id: responses[char_id]
+            for char_id in selected
+            if char_id in responses
+        }
+    
+    async def chat_stream(
+        self, message: str, character_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Sends a message and yields each character's response as it is generated.
+        
+        Responses are added to the graph as provisional nodes and finalized
+        in place, as by CrochetAssistantClient.chat_stream(). Abandoning the
+        iteration cancels the runs still streaming.
+        
+        Args:
+            message: The message to send to the assistant
+            character_id: Optional character ID to filter responses
+            
+        Yields:
+            (character ID, event) pairs, where event is
+            {"type": "delta", "delta", "node_id"} for each piece of text and
+            {"type": "done", "content", "node_id"} once a response is complete
+        """
+        start = time.perf_counter()
+        crochet_thread = self.crochet_threads[self.thread_id]
+        user_node_id = crochet_thread.add_message(
+            role="user",
+            content=message,
+        )
+        
+        selected = [
+            char_id for char_id in self.character_ids
+            if not character_id or char_id == character_id
+        ]
+        # (character ID, delta, None) per piece of text, then (character ID,
+        # None, outcome) with the reply in outcome unless the run failed
+        events: "asyncio.Queue[Tuple[str, Optional[str], Optional[Dict[str, Any]]]]" = (
+            asyncio.Queue()
+        )
+        
+        async def stream(char_id: str, context: Any) -> None:
+            outcome: Dict[str, Any] = {}
+            try:
+                async with self.run_slots:
+                    async for delta in self.assistant.stream_message(
+                        self.character_threads[char_id],
+                        message,
+                        self._instructions_for(char_id),
+                        context,
+                        outcome,
+                    ):
+                        events.put_nowait((char_id, delta, None))
+            except Exception as e:
+                print(f"Error getting response for character {char_id}: {e}")
+                outcome = {}
+            events.put_nowait((char_id, None, outcome))
+        
+        tasks = [
+            asyncio.create_task(
+                stream(char_id, self._context_for(crochet_thread, user_node_id, char_id))
+            )
+            for char_id in selected
+        ]
+        
+        node_ids: Dict[str, str] = {}
+        parts: Dict[str, List[str]] = {}
+        finished: Set[str] = set()
+        try:
+            while len(finished) < len(selected):
+                char_id, delta, outcome = await events.get()
+                if delta is not None:
+                    if char_id not in node_ids:
+                        node_ids[char_id] = crochet_thread.add_character_response(
+                            character_id=char_id,
+                            content="",
+                            context_node_ids=[user_node_id],
+                            provisional=True,
+                        )
+                        parts[char_id] = []
+                        observe("crochet.first_delta", time.perf_counter() - start)
+                    parts[char_id].append(delta)
+                    crochet_thread.update_node_content(
+                        node_ids[char_id], "".join(parts[char_id]), final=False
+                    )
+                    yield char_id, {"type": "delta", "delta": delta, "node_id": node_ids[char_id]}
+                    continue
+                    
+                finished.add(char_id)
+                response = outcome.get("reply")
+                if response is None:
+                    continue  # A provisional node is finalized as incomplete below
+                node_id = node_ids.get(char_id)
+                if node_id is None:
+                    node_id = crochet_thread.add_character_response(
+                        character_id=char_id,
+                        content=response,
+                        context_node_ids=[user_node_id],
+                    )
+                else:
+                    crochet_thread.update_node_content(node_id, response)
+                    del parts[char_id]
+                observe("crochet.character", time.perf_counter() - start)
+                
+                yield char_id, {"type": "done", "content": response, "node_id": node_id}
+        finally:
+            for task in tasks:
+                task.cancel()
+            for char_id, partial in parts.items():
+                crochet_thread.update_node_content(
+                    node_ids[char_id], "".join(partial), metadata={"incomplete": True}
+                )
+            # The default thread gained this turn's messages, which the graph holds
+            crochet_thread.mark_synced(len(self.assistant.threads[self.thread_id].messages))
+            crochet_thread.save()
+            observe("crochet.chat", time.perf_counter() - start)
+    
+    def submit(self, message: str, character_id: Optional[str] = None) -> str:
+        """
+        Sends a message without waiting for its responses.
+        
+        The runs are started as tasks on the running event loop and share
+        the concurrency limit with chat(); take their responses with
+        results(). The message is added to the graph and its runs are sent
+        a context as by CrochetAssistantClient.submit().
+        
+        Args:
+            message: The message to send to the assistant
+            character_id: Optional character ID to filter responses
+            
+        Returns:
+            Correlation ID of the message, which results() reports with
+            each of its responses
+        """
+        start = time.perf_counter()
+        crochet_thread = self.crochet_threads[self.thread_id]
+        selected = [
+            char_id for char_id in self.character_ids
+            if not character_id or char_id == character_id
+        ]
+        correlation_id = str(uuid.uuid4())
+        user_node_id = crochet_thread.submit_prompt(
+            correlation_id, message, expected_responses=len(selected)
+        )
+        
+        async def run(char_id: str, context: Any) -> None:
+            try:
+                _, response = await self._character_run(char_id, message, context)
+            except Exception as e:
+                print(f"Error getting response for character {char_id}: {e}")
+                response = None
+            self._pipelined.put_nowait((correlation_id, char_id, response, start))
+        
+        token_budget = self.context_token_budget or PIPELINED_CONTEXT_TOKENS
+        for char_id in selected:
+            task = asyncio.create_task(
+                run(
+                    char_id,
+                    self._context_for(crochet_thread, user_node_id, char_id, token_budget),
+                )
+            )
+            self._pipelined_tasks.add(task)
+            task.add_done_callback(self._pipelined_tasks.discard)
+            self._in_flight += 1
+        return correlation_id
+    
+    async def results(self) -> AsyncIterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Yields the responses to submitted messages in order of completion.
+        
+        Responses are bound and the thread saved as by
+        CrochetAssistantClient.results(), and abandoning the iteration
+        likewise leaves the remaining runs in flight for a later call.
+        
+        Yields:
+            (correlation ID, character ID, {"content", "node_id"})
+        """
+        crochet_thread = self.crochet_threads[self.thread_id]
+        try:
+            while self._in_flight:
+                correlation_id, char_id, response, start = await self._pipelined.get()
+                self._in_flight -= 1
+                if response is None:
+                    crochet_thread.cancel_response(correlation_id)
+                    continue
+                node_id = crochet_thread.bind_response(correlation_id, char_id, response)
+                observe("crochet.character", time.perf_counter() - start)
+                
+                yield correlation_id, char_id, {
+                    "content": response,
+                    "node_id": node_id,
+                }
+        finally:
+            # The default thread gained the finished runs' messages, which the graph holds
+            crochet_thread.mark_synced(len(self.assistant.threads[self.thread_id].messages))
+            crochet_thread.save()
+    
+    def get_conversation_history(
+        self,
+        character_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Gets the conversation history, optionally filtered by character.
+        
+        Args:
+            character_id: Optional character ID to filter responses
+            limit: Optional number of most recent messages to return
+            since: Optional timestamp; only messages from then on are returned
+            
+        Returns:
+            List of messages in chronological order
+        """
+        if self.thread_id not in self.crochet_threads:
+            return []
+            
+        return self.crochet_threads[self.thread_id].get_linear_conversation(
+            limit=limit,
+            since=since,
+            character_id=character_id,
+        )
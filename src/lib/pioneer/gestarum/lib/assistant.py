@@ -1,29 +1,236 @@
 import json
-import os
+import threading
 import time
-from typing import Dict, List, Optional, Any
-
-from openai import OpenAI
-from openai.types.beta.threads import ThreadMessage
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Mapping, Optional, Any
 
 from src.lib.pioneer.gestarum.lib.assistant_configuration import AssistantConfiguration
+from src.lib.pioneer.gestarum.lib.crochet_thread import estimate_tokens
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex, with_passages
 from src.lib.pioneer.gestarum.lib.file_management import FileManagement
+from src.lib.pioneer.gestarum.lib.instrumentation import instrumented, observe, span
+from src.lib.pioneer.gestarum.lib.rate_limit import (
+    call_with_retry,
+    get_rate_limiter,
+    note_failure,
+)
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
 from src.lib.pioneer.gestarum.lib.thread import Thread
+from src.lib.pioneer.gestarum.lib.thread_storage import JSONThreadStorage, ThreadStorage
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Assistant ID -> time of the last successful remote verification
+_verified_at: Dict[str, float] = {}
+
+def is_recently_verified(assistant_id: str, ttl: float) -> bool:
+    """Checks whether an assistant was verified remotely within the TTL.
+    
+    Args:
+        assistant_id: Assistant ID
+        ttl: Maximum age of the verification in seconds
+        
+    Returns:
+        True if the assistant need not be verified again yet
+    """
+    verified_at = _verified_at.get(assistant_id)
+    return verified_at is not None and time.time() - verified_at < ttl
+
+def mark_verified(assistant_id: str) -> None:
+    """Records that an assistant was just verified remotely."""
+    _verified_at[assistant_id] = time.time()
+
+def verification_times() -> Dict[str, float]:
+    """Returns the time of the last remote verification of each assistant."""
+    return dict(_verified_at)
+
+def restore_verifications(times: Dict[str, float]) -> None:
+    """Adopts verification times recorded by an earlier process.
+    
+    Args:
+        times: Verification times keyed by assistant ID; a time older than
+            the one already known for an assistant is ignored
+    """
+    for assistant_id, verified_at in times.items():
+        if verified_at > _verified_at.get(assistant_id, 0.0):
+            _verified_at[assistant_id] = verified_at
+
+class ThreadIndex(Mapping):
+    """Mapping of thread ID to Thread, backed by a thread store.
+    
+    Looking up an ID loads that thread on first use; membership tests and
+    find() ask the store, so no thread is read just to be listed.
+    """
+    
+    def __init__(self, storage: ThreadStorage):
+        self.storage = storage
+        self._loaded: Dict[str, Thread] = {}
+        
+    def __getitem__(self, thread_id: str) -> Thread:
+        thread = self._loaded.get(thread_id)
+        if thread is None:
+            name = self.storage.thread_name(thread_id)
+            if name is None:
+                raise KeyError(thread_id)
+            thread = Thread(thread_id, name, storage=self.storage).load()
+            self._loaded[thread_id] = thread
+        return thread
+        
+    def __contains__(self, thread_id: object) -> bool:
+        return thread_id in self._loaded or (
+            isinstance(thread_id, str) and self.storage.thread_name(thread_id) is not None
+        )
+        
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+        
+    def __len__(self) -> int:
+        return len(self.names())
+        
+    def names(self) -> Dict[str, str]:
+        """Returns thread names keyed by thread ID, including unsaved threads."""
+        names = self.storage.list_threads()
+        for thread_id, thread in list(self._loaded.items()):
+            names.setdefault(thread_id, thread.name)
+        return names
+        
+    def add(self, thread: Thread) -> None:
+        """Tracks a thread created in this process."""
+        self._loaded[thread.thread_id] = thread
+        
+    def forget(self, thread_id: str) -> None:
+        """Drops a loaded thread from memory; it is loaded again on next use."""
+        self._loaded.pop(thread_id, None)
+        
+    def find(self, name: str) -> Optional[str]:
+        """Returns the ID of a thread with the given name, if any.
+        
+        Args:
+            name: Human-readable thread name
+        """
+        for thread_id, thread in list(self._loaded.items()):
+            if thread.name == name:
+                return thread_id
+        return self.storage.find_thread(name)
+
+def poll_delays(
+    initial: float = 0.1, maximum: float = 1.0, factor: float = 1.5
+) -> Iterator[float]:
+    """Yields growing sleep intervals for polling a run's status.
+    
+    Args:
+        initial: First interval in seconds
+        maximum: Cap on any single interval in seconds
+        factor: Growth factor applied after each interval
+        
+    Yields:
+        Interval in seconds to wait before the next poll
+    """
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+def context_run_options(
+    config: AssistantConfiguration,
+    message: str,
+    context: List[Dict[str, str]],
+    additional_instructions: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Builds create_and_run arguments for a run seeded with explicit context.
+    
+    Args:
+        config: Assistant configuration
+        message: New user message
+        context: Prior messages as {"role", "content"} dicts; entries with
+            roles other than user and assistant are dropped
+        additional_instructions: Optional per-run instructions
+        
+    Returns:
+        Keyword arguments for threads.create_and_run(_stream)
+    """
+    messages = [
+        {"role": entry["role"], "content": entry["content"]}
+        for entry in context
+        if entry.get("role") in ("user", "assistant")
+    ]
+    messages.append({"role": "user", "content": message})
+    options: Dict[str, Any] = {
+        "assistant_id": config.assistant_id,
+        "thread": {"messages": messages},
+        "tools": [{"type": "file_search"}],
+    }
+    if additional_instructions:
+        # create_and_run has no additional_instructions; extend the base ones
+        options["instructions"] = f"{config.instructions}\n\n{additional_instructions}"
+    return options
+
+def text_deltas(event: Any) -> List[str]:
+    """Returns the pieces of text of a thread.message.delta stream event.
+    
+    Args:
+        event: Stream event whose data is a message delta
+        
+    Returns:
+        The text values of the delta's text content blocks, in order
+    """
+    return [
+        block.text.value
+        for block in event.data.delta.content or []
+        if getattr(block, "text", None) is not None and block.text.value
+    ]
+
 
 class Assistant:
     """Implements Assistant behavior with persistent state management."""
 
-    def __init__(self, client: OpenAI, config: AssistantConfiguration):
+    def __init__(
+        self,
+        client: "OpenAI",
+        config: AssistantConfiguration,
+        stream_runs: bool = True,
+        verify_ttl: float = 300.0,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        retrieval_k: int = 3,
+        thread_storage: Optional[ThreadStorage] = None,
+    ):
         """Initialize assistant.
         
         Args:
             client: OpenAI client instance
             config: Assistant configuration
+            stream_runs: Create runs with the streaming API so the message,
+                run and reply travel over one connection; polling is used as
+                a fallback
+            verify_ttl: Seconds for which a successful remote verification
+                of the assistant is trusted before retrieving it again
+            response_cache: Optional cache answering repeated questions
+                without a run; it is invalidated when the configuration
+                is saved with different instructions, model or files. A
+                hit on a thread is posted to the remote thread with the
+                next run on it, so the remote thread lacks it until then.
+            doc_index: Optional local index of the notes; the top passages
+                for each message are retrieved from it and sent with the run
+            retrieval_k: Number of passages retrieved per message
+            thread_storage: Store for the assistant's threads; defaults to
+                JSON files in the configuration's threads_dir
         """
         self.client = client
         self.config = config
-        self.threads: Dict[str, Thread] = {}  # Tracks thread instances
+        self.stream_runs = stream_runs
+        self.verify_ttl = verify_ttl
+        self.response_cache = response_cache
+        self.doc_index = doc_index
+        self.retrieval_k = retrieval_k
+        if response_cache is not None:
+            response_cache.watch(config)
+        self.thread_storage = thread_storage or JSONThreadStorage(config.threads_dir)
+        self.threads = ThreadIndex(self.thread_storage)  # Loaded on first use
         self.file_manager = FileManagement(client, storage_dir=self.config.file_dir)
+        # Cache hits not yet posted to their remote thread, by thread ID
+        self._held_back: Dict[str, List[Dict[str, str]]] = {}
+        self._held_back_lock = threading.Lock()
 
         if self.config.assistant_id is None:
             self.create_assistant()
@@ -32,9 +239,12 @@ class Assistant:
 
     def create_assistant(self) -> None:
         """Creates a new assistant and uploads files."""
-        uploaded_files = self.file_manager.upload_files(self.config.files)
+        uploaded_files = self.file_manager.upload_files(
+            self.config.files, owner=self.config.name
+        )
 
-        assistant = self.client.beta.assistants.create(
+        assistant = call_with_retry(
+            self.client.beta.assistants.create,
             name=self.config.name,
             instructions=self.config.instructions,
             model=self.config.model,
@@ -46,6 +256,7 @@ class Assistant:
 
         self.config.assistant_id = assistant.id
         self.config.save()
+        mark_verified(assistant.id)
         print(f"Created new assistant with ID {assistant.id}")
 
     def create_thread(self, name: str) -> str:
@@ -57,64 +268,406 @@ class Assistant:
         Returns:
             Thread ID
         """
-        thread = self.client.beta.threads.create()
-        thread_obj = Thread(
-            thread_id=thread.id, name=name, storage_dir=self.config.threads_dir
-        )
-        self.threads[thread.id] = thread_obj
+        thread = call_with_retry(self.client.beta.threads.create)
+        thread_obj = Thread(thread_id=thread.id, name=name, storage=self.thread_storage)
+        self.threads.add(thread_obj)
         thread_obj.save()
         return thread.id
 
-    def send_message(self, thread_id: str, message: str) -> str:
+    @instrumented("assistant.send_message")
+    def send_message(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str] = None,
+        context: Optional[List[Dict[str, str]]] = None,
+    ) -> str:
         """Sends a message to a thread and retrieves the assistant's response.
         
+        A response cache hit is keyed on the context, or else on the
+        thread's history, and recorded in the local thread. Without a
+        context it is also posted to the remote thread with the next run
+        there, so that run sees the same history without the hit waiting on
+        requests of its own.
+        
         Args:
             thread_id: Thread ID
             message: Message content
+            additional_instructions: Optional instructions appended to the
+                assistant's own for this run only
+            context: Optional prior messages ({"role", "content"} dicts) to
+                send instead of the remote thread's history. The run then
+                happens on a fresh remote thread holding only this context
+                and the message, which keeps prompts small for long threads.
             
         Returns:
             Assistant's response
         """
+        outcome: Dict[str, Any] = {}
+        for _ in self._turn(thread_id, message, additional_instructions, context, outcome):
+            pass
+        return outcome["reply"]
+
+    def stream_message(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str] = None,
+        context: Optional[List[Dict[str, str]]] = None,
+        outcome: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        """Sends a message to a thread and yields the response as it is generated.
+        
+        The response is recorded and the thread saved once it is complete,
+        as by send_message(). Without streaming, or if the stream fails
+        before any text arrived, the whole response is yielded at once when
+        the run is done. The time to the first text is recorded as the stage
+        assistant.first_delta and the whole turn as assistant.stream_message.
+        
+        Args:
+            thread_id: Thread ID
+            message: Message content
+            additional_instructions: Optional per-run instructions
+            context: Optional prior messages, as for send_message()
+            outcome: Optional dictionary that receives the complete response
+                (or the error text send_message() would return) under
+                "reply" once the iteration is done
+            
+        Yields:
+            Text deltas of the response
+        """
+        start = time.perf_counter()
+        first = True
+        for delta in self._turn(
+            thread_id, message, additional_instructions, context,
+            outcome if outcome is not None else {},
+        ):
+            if first:
+                observe("assistant.first_delta", time.perf_counter() - start)
+                first = False
+            yield delta
+        observe("assistant.stream_message", time.perf_counter() - start)
+
+    def _turn(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str],
+        context: Optional[List[Dict[str, str]]],
+        outcome: Dict[str, Any],
+    ) -> Iterator[str]:
+        """Runs one turn of a thread, yielding the response as it arrives.
+        
+        Args:
+            thread_id: Thread ID
+            message: Message content
+            additional_instructions: Optional per-run instructions
+            context: Optional prior messages, as for send_message()
+            outcome: Receives the response or error text under "reply"
+            
+        Yields:
+            Text deltas of the response; whatever was not streamed is
+            yielded once the run is done
+        """
         if thread_id not in self.threads:
             raise ValueError(f"Thread ID {thread_id} not found.")
 
+        history_length = len(self.threads[thread_id].messages)
         self.threads[thread_id].add_message("user", message)
         
-        self.client.beta.threads.messages.create(
-            thread_id=thread_id, role="user", content=message
-        )
+        if self.doc_index is not None:
+            with span("retrieval"):
+                additional_instructions = with_passages(
+                    self.doc_index, message, self.retrieval_k, additional_instructions
+                )
         
-        run = self.client.beta.threads.runs.create(
-            thread_id=thread_id,
-            assistant_id=self.config.assistant_id,
-            tools=[{"type": "file_search"}],
-        )
+        cache_key = None
+        if self.response_cache is not None:
+            # A run without a context answers from the thread's history
+            seen = context
+            if seen is None:
+                seen = self.threads[thread_id].messages[:history_length]
+            cache_key = self.response_cache.key(
+                self.config, message, seen, additional_instructions
+            )
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                if context is None:
+                    self._hold_back(thread_id, message, cached)
+                self.threads[thread_id].add_message("assistant", cached)
+                self.threads[thread_id].save()
+                outcome["reply"] = cached
+                yield cached
+                return
         
-        while run.status in ["queued", "in_progress"]:
-            run = self.client.beta.threads.runs.retrieve(
-                thread_id=thread_id, 
-                run_id=run.id
+        tokens = estimate_tokens(message) + sum(
+            estimate_tokens(entry["content"]) for entry in context or []
+        )
+        if additional_instructions:
+            tokens += estimate_tokens(additional_instructions)
+        started: Dict[str, Any] = {}
+        streamed: List[str] = []
+        if context is not None:
+            deltas = self._run_with_context(
+                message, context, additional_instructions, tokens, started
+            )
+        else:
+            deltas = self._run_on_thread(
+                thread_id, message, additional_instructions, tokens, started
             )
-            time.sleep(1)
+        for delta in deltas:
+            streamed.append(delta)
+            yield delta
+        run, content = started["run"], started["content"]
+        
+        run = self._wait_for_run(run.thread_id, run)
             
         print(f"Run completed with status: {run.status}")
         
+        reply = f"Error: Run completed with status {run.status}"
         if run.status == "completed":
-            messages = self.client.beta.threads.messages.list(
+            if content is None:
+                content = self._latest_reply(run.thread_id)
+            if content is not None:
+                self.threads[thread_id].add_message("assistant", content)
+                self.threads[thread_id].save()
+                if cache_key is not None:
+                    self.response_cache.put(cache_key, content)
+                reply = content
+                
+        outcome["reply"] = reply
+        sent = "".join(streamed)
+        if len(reply) > len(sent) and reply.startswith(sent):
+            yield reply[len(sent):]
+
+    def _hold_back(self, thread_id: str, message: str, reply: str) -> None:
+        """Holds a message and its cached reply for the thread's next run.
+        
+        Runs on the remote thread must see the exchange, but a hit should
+        not wait on requests for it, so it is posted with the next run. If
+        the process exits first, only the local thread records it.
+        
+        Args:
+            thread_id: Thread ID
+            message: User message
+            reply: Cached response served for it
+        """
+        with self._held_back_lock:
+            self._held_back.setdefault(thread_id, []).extend([
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": reply},
+            ])
+
+    def _take_held_back(self, thread_id: str) -> List[Dict[str, str]]:
+        """Returns and forgets the cache hits held back for a thread."""
+        with self._held_back_lock:
+            return self._held_back.pop(thread_id, [])
+
+    def _run_on_thread(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str],
+        tokens: int,
+        started: Dict[str, Any],
+    ) -> Iterator[str]:
+        """Posts a message to a remote thread and starts a run on it.
+        
+        The cache hits held back for the thread are posted before it.
+        
+        Args:
+            started: Receives the run under "run" and, if streaming already
+                delivered it, the reply text under "content" (else None)
+        
+        Yields:
+            Text deltas of the reply, if the run is streamed
+        """
+        messages = self._take_held_back(thread_id)
+        messages.append({"role": "user", "content": message})
+        started["run"], started["content"] = None, None
+        if self.stream_runs:
+            yield from self._stream_run(
+                thread_id, messages, additional_instructions, tokens, started
+            )
+            
+        if started["run"] is None:
+            for posted in messages:
+                with span("messages.create"):
+                    call_with_retry(
+                        self.client.beta.threads.messages.create,
+                        thread_id=thread_id, **posted,
+                    )
+            
+            with span("runs.create"):
+                started["run"] = call_with_retry(
+                    self.client.beta.threads.runs.create,
+                    thread_id=thread_id,
+                    tokens=tokens,
+                    **self._run_options(additional_instructions),
+                )
+
+    def _run_with_context(
+        self,
+        message: str,
+        context: List[Dict[str, str]],
+        additional_instructions: Optional[str],
+        tokens: int,
+        started: Dict[str, Any],
+    ) -> Iterator[str]:
+        """Runs the assistant on a new remote thread seeded with a context.
+        
+        Args:
+            started: Receives the run and the streamed reply, as for
+                _run_on_thread()
+        
+        Yields:
+            Text deltas of the reply, if the run is streamed
+        """
+        options = context_run_options(
+            self.config, message, context, additional_instructions
+        )
+            
+        started["run"], started["content"] = None, None
+        if self.stream_runs:
+            yield from self._stream(
+                lambda: self.client.beta.threads.create_and_run_stream(**options),
+                tokens,
+                started,
+            )
+            
+        if started["run"] is None:
+            with span("create_and_run"):
+                started["run"] = call_with_retry(
+                    self.client.beta.threads.create_and_run, tokens=tokens, **options
+                )
+
+    def _run_options(self, additional_instructions: Optional[str]) -> Dict[str, Any]:
+        """Builds the keyword arguments shared by every run request."""
+        options: Dict[str, Any] = {
+            "assistant_id": self.config.assistant_id,
+            "tools": [{"type": "file_search"}],
+        }
+        if additional_instructions:
+            options["additional_instructions"] = additional_instructions
+        return options
+
+    def _stream_run(
+        self,
+        thread_id: str,
+        messages: List[Dict[str, str]],
+        additional_instructions: Optional[str],
+        tokens: int,
+        started: Dict[str, Any],
+    ) -> Iterator[str]:
+        """Posts messages and runs the assistant over one streaming request.
+        
+        Args:
+            thread_id: Thread ID
+            messages: Messages to add to the thread before the run, as
+                role and content
+            additional_instructions: Optional per-run instructions
+            tokens: Estimated tokens of the request, for rate limiting
+            started: Receives the run and the reply, as from _stream()
+            
+        Yields:
+            Text deltas of the reply
+        """
+        return self._stream(
+            lambda: self.client.beta.threads.runs.stream(
+                thread_id=thread_id,
+                additional_messages=messages,
+                **self._run_options(additional_instructions),
+            ),
+            tokens,
+            started,
+        )
+
+    def _stream(
+        self, open_stream: Callable[[], Any], tokens: int, started: Dict[str, Any]
+    ) -> Iterator[str]:
+        """Consumes a run stream, yielding the reply's text as it arrives.
+        
+        Streams are not retried: on failure the caller falls back to
+        polling, whose requests are.
+        
+        Args:
+            open_stream: Callable returning the stream context manager
+            tokens: Estimated tokens of the request, for rate limiting
+            started: Receives the run under "run" and the reply text under
+                "content". The run is None if streaming failed before it
+                was created, and the reply is None if the stream failed or
+                ended without one.
+            
+        Yields:
+            Text deltas of the reply
+        """
+        started["run"], started["content"] = None, None
+        get_rate_limiter().acquire(tokens)
+        try:
+            with span("runs.stream"), open_stream() as stream:
+                for event in stream:
+                    if event.event == "thread.run.created":
+                        started["run"] = event.data
+                    elif event.event == "thread.message.delta":
+                        yield from text_deltas(event)
+                started["run"] = stream.get_final_run()
+                messages = stream.get_final_messages()
+        except Exception as e:
+            note_failure(e)
+            print(f"Run streaming failed, falling back to polling: {e}")
+            return
+            
+        for reply in reversed(messages):
+            if reply.role == "assistant" and reply.content:
+                started["content"] = reply.content[0].text.value
+                return
+
+    def _wait_for_run(self, thread_id: str, run: Any) -> Any:
+        """Polls a run with exponential backoff until it leaves the queue.
+        
+        The time the run is seen in each status is recorded as the stage
+        run.<status>, e.g. run.queued.
+        
+        Args:
+            thread_id: Thread ID
+            run: Run to wait for
+            
+        Returns:
+            The run in its final state
+        """
+        delays = poll_delays()
+        status, since = run.status, time.perf_counter()
+        while run.status in ["queued", "in_progress"]:
+            time.sleep(next(delays))
+            with span("runs.retrieve"):
+                run = call_with_retry(
+                    self.client.beta.threads.runs.retrieve,
+                    thread_id=thread_id, 
+                    run_id=run.id,
+                    idempotent=True,
+                )
+            if run.status != status:
+                now = time.perf_counter()
+                observe(f"run.{status}", now - since)
+                status, since = run.status, now
+        return run
+
+    def _latest_reply(self, thread_id: str) -> Optional[str]:
+        """Fetches the newest assistant message of a thread, if any."""
+        with span("messages.list"):
+            messages = call_with_retry(
+                self.client.beta.threads.messages.list,
                 thread_id=thread_id,
                 order="desc",
                 limit=1,
+                idempotent=True,
             )
-            
-            if len(messages.data) > 0 and messages.data[0].role == "assistant":
-                message = messages.data[0]
-                if message.content and len(message.content) > 0:
-                    content = message.content[0].text.value
-                    self.threads[thread_id].add_message("assistant", content)
-                    self.threads[thread_id].save()
-                    return content
-                
-        return f"Error: Run completed with status {run.status}"
+        
+        if len(messages.data) > 0 and messages.data[0].role == "assistant":
+            message = messages.data[0]
+            if message.content and len(message.content) > 0:
+                return message.content[0].text.value
+        return None
 
     def get_state(self) -> Dict[str, Any]:
         """Retrieves assistant state, including stored threads and metadata."""
@@ -125,30 +678,27 @@ class Assistant:
             "model": self.config.model,
             "tools": self.config.tools,
             "files": self.file_manager.list_uploaded_files(),
-            "threads": {
-                thread_id: thread.name for thread_id, thread in self.threads.items()
-            },
+            "threads": self.threads.names(),
         }
 
     def load_assistant(self) -> None:
-        """Loads an assistant's state from JSON, including threads."""
+        """Verifies that the stored assistant still exists remotely.
+        
+        Threads are loaded lazily, each on first access through threads.
+        """
+        if is_recently_verified(self.config.assistant_id, self.verify_ttl):
+            return
+            
         try:
-            self.client.beta.assistants.retrieve(self.config.assistant_id)
+            call_with_retry(
+                self.client.beta.assistants.retrieve, self.config.assistant_id,
+                idempotent=True,
+            )
         except Exception as e:
             print(f"Error retrieving assistant: {e}")
             print("Creating a new assistant instead")
             self.config.assistant_id = None
             self.create_assistant()
             return
-            
-        threads_path = os.path.join(self.config.threads_dir)
-        if os.path.exists(threads_path):
-            for filename in os.listdir(threads_path):
-                if filename.endswith(".json"):
-                    thread_id = filename.split(".")[0]
-                    thread = Thread(
-                        thread_id=thread_id,
-                        name="",  # Will be loaded from file
-                        storage_dir=self.config.threads_dir,
-                    ).load()
-                    self.threads[thread_id] = thread
+        mark_verified(self.config.assistant_id)
+        self.file_manager.touch(self.config.files, owner=self.config.name)
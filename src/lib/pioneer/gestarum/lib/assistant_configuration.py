@@ -1,7 +1,16 @@
+import hashlib
 import json
 import os
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
+
+from src.lib.pioneer.gestarum.lib.atomic_file import (
+    VersionConflict,
+    file_lock,
+    stored_version,
+    write_json,
+)
+from src.lib.pioneer.gestarum.lib.instrumentation import instrumented
 
 class AssistantConfiguration:
     """Stores and persists assistant configuration data."""
@@ -17,6 +26,7 @@ class AssistantConfiguration:
         storage_dir: str = "assistants",
         threads_dir: str = "threads",
         file_dir: str = "files",
+        version: Optional[int] = None,
     ):
         """Initialize assistant configuration.
         
@@ -30,6 +40,8 @@ class AssistantConfiguration:
             storage_dir: Directory to store assistant configurations
             threads_dir: Directory to store thread data
             file_dir: Directory to store file metadata
+            version: Version of the configuration file it was read from,
+                or None if it was not read from one
         """
         self.name = name
         self.instructions = instructions
@@ -40,20 +52,72 @@ class AssistantConfiguration:
         self.storage_dir = storage_dir
         self.threads_dir = threads_dir
         self.file_dir = file_dir
+        self.version = version
         
         os.makedirs(self.storage_dir, exist_ok=True)
         os.makedirs(self.threads_dir, exist_ok=True)
         os.makedirs(self.file_dir, exist_ok=True)
+        
+        # Called with (config, previous fingerprint) when a save changes it
+        self._save_listeners: List[Callable[['AssistantConfiguration', str], None]] = []
+        self._saved_fingerprint = self.fingerprint()
+
+    def fingerprint(self) -> str:
+        """Returns a hash of the settings that determine the assistant's answers.
+        
+        It covers the model, the instructions and the set of files, so two
+        configurations with the same fingerprint answer alike.
+        """
+        payload = json.dumps(
+            {
+                "model": self.model,
+                "instructions": self.instructions,
+                "files": sorted(self.files),
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def add_save_listener(
+        self, listener: Callable[['AssistantConfiguration', str], None]
+    ) -> None:
+        """Registers a callback for saves that change the fingerprint.
+        
+        Args:
+            listener: Called with the configuration and its previous fingerprint
+        """
+        if listener not in self._save_listeners:
+            self._save_listeners.append(listener)
 
     def get_assistant_id(self) -> Optional[str]:
         """Returns the assistant ID if it exists."""
         return self.assistant_id
 
+    @instrumented("config.save")
     def save(self) -> None:
-        """Saves the assistant configuration to a JSON file."""
+        """Saves the assistant configuration to a JSON file.
+        
+        The file is replaced atomically under a lock shared with other
+        processes, and its version is incremented.
+        
+        Raises:
+            VersionConflict: If another process saved the file since this
+                configuration was read or saved
+        """
         path = os.path.join(self.storage_dir, f"{self.assistant_id or self.name}.json")
-        with open(path, "w") as f:
-            json.dump(self.to_json(), f, indent=4)
+        with file_lock(path):
+            found = stored_version(path)
+            if self.version is not None and found is not None and found != self.version:
+                raise VersionConflict(path, self.version, found)
+            version = (found or 0) + 1
+            write_json(path, dict(self.to_json(), version=version))
+            self.version = version
+            
+        fingerprint = self.fingerprint()
+        if fingerprint != self._saved_fingerprint:
+            previous, self._saved_fingerprint = self._saved_fingerprint, fingerprint
+            for listener in list(self._save_listeners):
+                listener(self, previous)
 
     def load(self, assistant_id: str) -> None:
         """Loads the assistant configuration from a JSON file."""
@@ -67,6 +131,29 @@ class AssistantConfiguration:
                 self.tools = data["tools"]
                 self.files = data["files"]
                 self.assistant_id = assistant_id
+                self.version = data.get("version", 0)
+                self._saved_fingerprint = self.fingerprint()
+
+    @classmethod
+    def from_json(
+        cls, data: Dict[str, Any], storage_dir: str = "assistants"
+    ) -> 'AssistantConfiguration':
+        """Creates a configuration from its JSON representation.
+        
+        Args:
+            data: Configuration data as produced by to_json()
+            storage_dir: Directory to store assistant configurations
+        """
+        return cls(
+            name=data["name"],
+            instructions=data["instructions"],
+            model=data["model"],
+            tools=data["tools"],
+            files=data["files"],
+            assistant_id=data["assistant_id"],
+            storage_dir=storage_dir,
+            version=data.get("version", 0),
+        )
 
     def to_json(self) -> Dict[str, Any]:
         """Returns a JSON-serializable representation of the assistant configuration."""
@@ -77,4 +164,5 @@ class AssistantConfiguration:
             "tools": self.tools,
             "files": self.files,
             "assistant_id": self.assistant_id,
+            "version": self.version,
         }
@@ -1,71 +1,251 @@
 import os
 import json
-from typing import Dict, List, Optional, Tuple, Any
-
-from openai import OpenAI
+from typing import TYPE_CHECKING, Dict, Iterator, List, Mapping, Optional, Tuple, Any
 
 from src.lib.pioneer.gestarum.lib.assistant_configuration import AssistantConfiguration
-from src.lib.pioneer.gestarum.lib.assistant import Assistant
+from src.lib.pioneer.gestarum.lib.atomic_file import atomic_write
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread_storage import ThreadStorage
+from src.lib.pioneer.gestarum.lib.assistant import (
+    Assistant,
+    restore_verifications,
+    verification_times,
+)
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Warm-start snapshot of a configuration directory; dotfiles are not configurations
+SNAPSHOT_FILE = ".manager_snapshot.json"
+SNAPSHOT_VERSION = 1
+
+def read_configurations(config_directory: str) -> Dict[str, AssistantConfiguration]:
+    """Reads every assistant configuration in a directory, indexed by name.
+    
+    When several files share a name, a configuration that already has an
+    assistant ID wins over a template without one.
+    
+    Args:
+        config_directory: Directory containing assistant configurations
+        
+    Returns:
+        Configurations keyed by assistant name
+    """
+    configs: Dict[str, AssistantConfiguration] = {}
+    for filename in sorted(os.listdir(config_directory)):
+        if filename.endswith(".json") and not filename.startswith("."):
+            path = os.path.join(config_directory, filename)
+            try:
+                with open(path, "r") as f:
+                    config = AssistantConfiguration.from_json(
+                        json.load(f), storage_dir=config_directory
+                    )
+            except Exception as e:
+                print(f"Error loading assistant config {path}: {e}")
+                continue
+            existing = configs.get(config.name)
+            if existing is None or existing.assistant_id is None:
+                configs[config.name] = config
+    return configs
+
+
+def config_stamps(config_directory: str) -> Dict[str, List[int]]:
+    """Returns the modification time and size of each configuration file.
+    
+    Args:
+        config_directory: Directory containing assistant configurations
+        
+    Returns:
+        [mtime in nanoseconds, size] keyed by file name
+    """
+    stamps = {}
+    with os.scandir(config_directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and not entry.name.startswith("."):
+                stat = entry.stat()
+                stamps[entry.name] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+def _read_snapshot(config_directory: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(config_directory, SNAPSHOT_FILE)
+    try:
+        with open(path, "r") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return snapshot if snapshot.get("version") == SNAPSHOT_VERSION else None
+
+def _write_snapshot(config_directory: str, snapshot: Dict[str, Any]) -> None:
+    path = os.path.join(config_directory, SNAPSHOT_FILE)
+    try:
+        with atomic_write(path) as f:
+            json.dump(snapshot, f)
+    except OSError as e:
+        print(f"Warning: could not write manager snapshot {path}: {e}")
+
+def load_configurations(config_directory: str) -> Dict[str, AssistantConfiguration]:
+    """Reads the configurations, from the warm-start snapshot when it is current.
+    
+    The snapshot holds the parsed configurations together with the
+    modification time and size of every configuration file, and is only
+    used if none of them changed. Remote verification times recorded in it
+    are adopted either way, so a new process skips verifying assistants that
+    another one verified within the TTL. A stale or missing snapshot is
+    rewritten.
+    
+    Args:
+        config_directory: Directory containing assistant configurations
+        
+    Returns:
+        Configurations keyed by assistant name
+    """
+    stamps = config_stamps(config_directory)
+    snapshot = _read_snapshot(config_directory)
+    if snapshot is not None:
+        restore_verifications(snapshot["verified"])
+        if snapshot["stamps"] == stamps:
+            return {
+                name: AssistantConfiguration.from_json(data, storage_dir=config_directory)
+                for name, data in snapshot["configs"].items()
+            }
+
+    configs = read_configurations(config_directory)
+    _write_snapshot(config_directory, {
+        "version": SNAPSHOT_VERSION,
+        "stamps": stamps,
+        "configs": {name: config.to_json() for name, config in configs.items()},
+        "verified": snapshot["verified"] if snapshot is not None else {},
+    })
+    return configs
+
+def record_verifications(
+    config_directory: str, configs: Mapping[str, AssistantConfiguration]
+) -> None:
+    """Stores the current verification times of some assistants in the snapshot.
+    
+    Args:
+        config_directory: Directory containing assistant configurations
+        configs: Configurations whose verification times are stored
+    """
+    snapshot = _read_snapshot(config_directory)
+    if snapshot is None:
+        return  # load_configurations() writes one on the next start
+    times = verification_times()
+    verified = {
+        config.assistant_id: times[config.assistant_id]
+        for config in configs.values()
+        if config.assistant_id in times
+    }
+    if any(snapshot["verified"].get(key) != value for key, value in verified.items()):
+        snapshot["verified"].update(verified)
+        _write_snapshot(config_directory, snapshot)
+
+
+class AssistantIndex(Mapping):
+    """Read-only mapping of assistant name to Assistant.
+
+    Looking up a name materializes that assistant on first use; iterating
+    only lists names.
+    """
+
+    def __init__(self, manager: "AssistantManager"):
+        self._manager = manager
+
+    def __getitem__(self, name: str) -> Assistant:
+        assistant = self._manager.get_assistant_by_name(name)
+        if assistant is None:
+            raise KeyError(name)
+        return assistant
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._manager.configs))
+
+    def __len__(self) -> int:
+        return len(self._manager.configs)
+
 
 class AssistantManager:
-    """Manages multiple assistants from stored configurations."""
+    """Manages multiple assistants from stored configurations.
+
+    Configurations are read at construction, but an Assistant (and its remote
+    verification) is only created when it is first requested. Both the
+    configurations and the verifications are kept in a warm-start snapshot
+    in the configuration directory (see load_configurations()).
+    """
 
-    def __init__(self, client: OpenAI, config_directory: str = "assistants"):
+    def __init__(
+        self,
+        client: "OpenAI",
+        config_directory: str = "assistants",
+        verify_ttl: float = 300.0,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        thread_storage: Optional[ThreadStorage] = None,
+    ):
         """Initialize assistant manager.
         
         Args:
             client: OpenAI client instance
             config_directory: Directory containing assistant configurations
+            verify_ttl: Seconds for which a remote verification of an
+                assistant is trusted
+            response_cache: Optional response cache shared by the assistants
+            doc_index: Optional local notes index shared by the assistants
+            thread_storage: Optional thread store shared by the assistants;
+                each assistant uses JSON files in its threads_dir otherwise
         """
         self.client = client
         self.config_directory = config_directory
+        self.verify_ttl = verify_ttl
+        self.response_cache = response_cache
+        self.doc_index = doc_index
+        self.thread_storage = thread_storage
         os.makedirs(self.config_directory, exist_ok=True)
-        self.assistants: Dict[str, Assistant] = {}
+        self.assistants: Dict[str, Assistant] = {}  # Materialized, by ID
+        self.configs: Dict[str, AssistantConfiguration] = {}  # By name
+        self._index = AssistantIndex(self)
 
         self.load_assistants()
 
-    def list_assistants(self) -> List[Tuple[str, str]]:
-        """Returns a list of assistant names and IDs."""
+    def list_assistants(self) -> List[Tuple[str, Optional[str]]]:
+        """Returns a list of assistant names and IDs.
+        
+        The ID is None for configurations whose assistant was never created.
+        """
         return [
-            (assistant.config.name, assistant_id)
-            for assistant_id, assistant in self.assistants.items()
+            (name, config.assistant_id) for name, config in self.configs.items()
         ]
 
     @property
-    def assistant_index(self) -> Dict[str, Assistant]:
-        """Returns a dictionary of assistants indexed by name."""
-        return {
-            assistant_name: self.get_assistant(assistant_id)
-            for assistant_name, assistant_id in self.list_assistants()
-        }
+    def assistant_index(self) -> Mapping[str, Assistant]:
+        """Returns a mapping of assistants indexed by name."""
+        return self._index
 
     def load_assistants(self) -> None:
         """Loads all assistant configurations from the config directory."""
-        for filename in os.listdir(self.config_directory):
-            if filename.endswith(".json"):
-                path = os.path.join(self.config_directory, filename)
-                try:
-                    with open(path, "r") as f:
-                        config_data = json.load(f)
-                        assistant_config = AssistantConfiguration(
-                            name=config_data["name"],
-                            instructions=config_data["instructions"],
-                            model=config_data["model"],
-                            tools=config_data["tools"],
-                            files=config_data["files"],
-                            assistant_id=config_data["assistant_id"],
-                            storage_dir=self.config_directory,
-                        )
-                        assistant = Assistant(self.client, assistant_config)
-                        self.assistants[assistant.config.assistant_id] = assistant
-                except Exception as e:
-                    print(f"Error loading assistant config {path}: {e}")
+        self.configs = load_configurations(self.config_directory)
 
     def save_assistants(self) -> None:
         """Saves the state of all managed assistants."""
         for assistant in self.assistants.values():
             assistant.config.save()
 
+    def _materialize(self, config: AssistantConfiguration) -> Assistant:
+        """Builds the Assistant for a configuration and registers it."""
+        assistant = Assistant(
+            self.client,
+            config,
+            verify_ttl=self.verify_ttl,
+            response_cache=self.response_cache,
+            doc_index=self.doc_index,
+            thread_storage=self.thread_storage,
+        )
+        self.assistants[assistant.config.assistant_id] = assistant
+        self.configs[assistant.config.name] = assistant.config
+        record_verifications(self.config_directory, {assistant.config.name: assistant.config})
+        return assistant
+
     def create_assistant(self, config_data: Dict[str, Any]) -> str:
         """Creates a new assistant from a configuration dictionary.
         
@@ -83,8 +263,7 @@ class AssistantManager:
             files=config_data.get("files", []),
             storage_dir=self.config_directory,
         )
-        assistant = Assistant(self.client, assistant_config)
-        self.assistants[assistant.config.assistant_id] = assistant
+        assistant = self._materialize(assistant_config)
         assistant.config.save()
         return assistant.config.assistant_id
 
@@ -97,4 +276,26 @@ class AssistantManager:
         Returns:
             Assistant object or None if not found
         """
-        return self.assistants.get(assistant_id)
+        assistant = self.assistants.get(assistant_id)
+        if assistant is None:
+            for config in self.configs.values():
+                if config.assistant_id == assistant_id:
+                    return self._materialize(config)
+        return assistant
+
+    def get_assistant_by_name(self, name: str) -> Optional[Assistant]:
+        """Retrieves an assistant by its name.
+        
+        Args:
+            name: Assistant name
+            
+        Returns:
+            Assistant object or None if no configuration has that name
+        """
+        config = self.configs.get(name)
+        if config is None:
+            return None
+        assistant = self.assistants.get(config.assistant_id)
+        if assistant is None:
+            assistant = self._materialize(config)
+        return assistant
@@ -0,0 +1,559 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional
+
+from src.lib.pioneer.gestarum.lib.assistant import (
+    ThreadIndex,
+    context_run_options,
+    is_recently_verified,
+    mark_verified,
+    poll_delays,
+    text_deltas,
+)
+from src.lib.pioneer.gestarum.lib.assistant_configuration import AssistantConfiguration
+from src.lib.pioneer.gestarum.lib.crochet_thread import estimate_tokens
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex, with_passages
+from src.lib.pioneer.gestarum.lib.file_management import FileManagement
+from src.lib.pioneer.gestarum.lib.instrumentation import instrumented, observe, span
+from src.lib.pioneer.gestarum.lib.rate_limit import (
+    acall_with_retry,
+    get_rate_limiter,
+    note_failure,
+)
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread import Thread
+from src.lib.pioneer.gestarum.lib.thread_storage import JSONThreadStorage, ThreadStorage
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+class AsyncAssistant:
+    """Asyncio counterpart of Assistant built on AsyncOpenAI.
+    
+    Construction does no network I/O; call initialize() to create or verify
+    the remote assistant before sending messages.
+    """
+
+    def __init__(
+        self,
+        client: "AsyncOpenAI",
+        config: AssistantConfiguration,
+        file_client: Optional["OpenAI"] = None,
+        stream_runs: bool = True,
+        verify_ttl: float = 300.0,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        retrieval_k: int = 3,
+        thread_storage: Optional[ThreadStorage] = None,
+    ):
+        """Initialize assistant.
+        
+        Args:
+            client: AsyncOpenAI client instance
+            config: Assistant configuration
+            file_client: Synchronous client used for file uploads, which only
+                happen when an assistant is created (derived from client if
+                not given)
+            stream_runs: Create runs with the streaming API so the message,
+                run and reply travel over one connection; polling is used as
+                a fallback
+            verify_ttl: Seconds for which a successful remote verification
+                of the assistant is trusted before retrieving it again
+            response_cache: Optional cache answering repeated questions
+                without a run; it is invalidated when the configuration
+                is saved with different instructions, model or files. A
+                hit on a thread is posted to the remote thread with the
+                next run on it, so the remote thread lacks it until then.
+            doc_index: Optional local index of the notes; the top passages
+                for each message are retrieved from it and sent with the run
+            retrieval_k: Number of passages retrieved per message
+            thread_storage: Store for the assistant's threads; defaults to
+                JSON files in the configuration's threads_dir
+        """
+        self.client = client
+        self.config = config
+        self.stream_runs = stream_runs
+        self.verify_ttl = verify_ttl
+        self.response_cache = response_cache
+        self.doc_index = doc_index
+        self.retrieval_k = retrieval_k
+        if response_cache is not None:
+            response_cache.watch(config)
+        self.thread_storage = thread_storage or JSONThreadStorage(config.threads_dir)
+        self.threads = ThreadIndex(self.thread_storage)  # Loaded on first use
+        if file_client is None:
+            from openai import OpenAI  # Deferred: costly to import
+            file_client = OpenAI(
+                api_key=client.api_key, base_url=client.base_url, max_retries=0
+            )
+        self.file_manager = FileManagement(file_client, storage_dir=self.config.file_dir)
+        # Cache hits not yet posted to their remote thread, by thread ID
+        self._held_back: Dict[str, List[Dict[str, str]]] = {}
+
+    async def initialize(self) -> "AsyncAssistant":
+        """Creates the remote assistant or verifies and loads an existing one."""
+        if self.config.assistant_id is None:
+            await self.create_assistant()
+        else:
+            await self.load_assistant()
+        return self
+
+    async def create_assistant(self) -> None:
+        """Creates a new assistant and uploads files."""
+        uploaded_files = await asyncio.to_thread(
+            self.file_manager.upload_files, self.config.files, self.config.name
+        )
+
+        assistant = await acall_with_retry(
+            self.client.beta.assistants.create,
+            name=self.config.name,
+            instructions=self.config.instructions,
+            model=self.config.model,
+            tools=self.config.tools,
+            tool_resources=(
+                {"file_search": {"file_ids": uploaded_files}} if uploaded_files else {}
+            ),
+        )
+
+        self.config.assistant_id = assistant.id
+        await asyncio.to_thread(self.config.save)
+        mark_verified(assistant.id)
+        print(f"Created new assistant with ID {assistant.id}")
+
+    async def create_thread(self, name: str) -> str:
+        """Creates a new thread, tracks it, and saves it persistently.
+        
+        Args:
+            name: Human-readable name for the thread
+            
+        Returns:
+            Thread ID
+        """
+        thread = await acall_with_retry(self.client.beta.threads.create)
+        thread_obj = Thread(thread_id=thread.id, name=name, storage=self.thread_storage)
+        self.threads.add(thread_obj)
+        await asyncio.to_thread(thread_obj.save)
+        return thread.id
+
+    @instrumented("assistant.send_message")
+    async def send_message(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str] = None,
+        context: Optional[List[Dict[str, str]]] = None,
+    ) -> str:
+        """Sends a message to a thread and retrieves the assistant's response.
+        
+        A response cache hit is keyed on the context, or else on the
+        thread's history, and recorded in the local thread. Without a
+        context it is also posted to the remote thread with the next run
+        there, so that run sees the same history without the hit waiting on
+        requests of its own.
+        
+        Args:
+            thread_id: Thread ID
+            message: Message content
+            additional_instructions: Optional instructions appended to the
+                assistant's own for this run only
+            context: Optional prior messages ({"role", "content"} dicts) to
+                send instead of the remote thread's history; the run then
+                happens on a fresh remote thread
+            
+        Returns:
+            Assistant's response
+        """
+        outcome: Dict[str, Any] = {}
+        async for _ in self._turn(thread_id, message, additional_instructions, context, outcome):
+            pass
+        return outcome["reply"]
+
+    async def stream_message(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str] = None,
+        context: Optional[List[Dict[str, str]]] = None,
+        outcome: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        """Sends a message to a thread and yields the response as it is generated.
+        
+        See Assistant.stream_message().
+        
+        Args:
+            thread_id: Thread ID
+            message: Message content
+            additional_instructions: Optional per-run instructions
+            context: Optional prior messages, as for send_message()
+            outcome: Optional dictionary that receives the complete response
+                under "reply" once the iteration is done
+            
+        Yields:
+            Text deltas of the response
+        """
+        start = time.perf_counter()
+        first = True
+        async for delta in self._turn(
+            thread_id, message, additional_instructions, context,
+            outcome if outcome is not None else {},
+        ):
+            if first:
+                observe("assistant.first_delta", time.perf_counter() - start)
+                first = False
+            yield delta
+        observe("assistant.stream_message", time.perf_counter() - start)
+
+    async def _turn(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str],
+        context: Optional[List[Dict[str, str]]],
+        outcome: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Runs one turn of a thread, yielding the response as it arrives.
+        
+        Args:
+            thread_id: Thread ID
+            message: Message content
+            additional_instructions: Optional per-run instructions
+            context: Optional prior messages, as for send_message()
+            outcome: Receives the response or error text under "reply"
+            
+        Yields:
+            Text deltas of the response; whatever was not streamed is
+            yielded once the run is done
+        """
+        if thread_id not in self.threads:
+            raise ValueError(f"Thread ID {thread_id} not found.")
+
+        history_length = len(self.threads[thread_id].messages)
+        self.threads[thread_id].add_message("user", message)
+        
+        if self.doc_index is not None:
+            with span("retrieval"):
+                additional_instructions = with_passages(
+                    self.doc_index, message, self.retrieval_k, additional_instructions
+                )
+        
+        cache_key = None
+        if self.response_cache is not None:
+            # A run without a context answers from the thread's history
+            seen = context
+            if seen is None:
+                seen = self.threads[thread_id].messages[:history_length]
+            cache_key = self.response_cache.key(
+                self.config, message, seen, additional_instructions
+            )
+            cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+            if cached is not None:
+                if context is None:
+                    self._hold_back(thread_id, message, cached)
+                self.threads[thread_id].add_message("assistant", cached)
+                await asyncio.to_thread(self.threads[thread_id].save)
+                outcome["reply"] = cached
+                yield cached
+                return
+        
+        tokens = estimate_tokens(message) + sum(
+            estimate_tokens(entry["content"]) for entry in context or []
+        )
+        if additional_instructions:
+            tokens += estimate_tokens(additional_instructions)
+        started: Dict[str, Any] = {}
+        streamed: List[str] = []
+        if context is not None:
+            deltas = self._run_with_context(
+                message, context, additional_instructions, tokens, started
+            )
+        else:
+            deltas = self._run_on_thread(
+                thread_id, message, additional_instructions, tokens, started
+            )
+        async for delta in deltas:
+            streamed.append(delta)
+            yield delta
+        run, content = started["run"], started["content"]
+        
+        run = await self._wait_for_run(run.thread_id, run)
+            
+        print(f"Run completed with status: {run.status}")
+        
+        reply = f"Error: Run completed with status {run.status}"
+        if run.status == "completed":
+            if content is None:
+                content = await self._latest_reply(run.thread_id)
+            if content is not None:
+                self.threads[thread_id].add_message("assistant", content)
+                await asyncio.to_thread(self.threads[thread_id].save)
+                if cache_key is not None:
+                    await asyncio.to_thread(self.response_cache.put, cache_key, content)
+                reply = content
+                
+        outcome["reply"] = reply
+        sent = "".join(streamed)
+        if len(reply) > len(sent) and reply.startswith(sent):
+            yield reply[len(sent):]
+
+    def _hold_back(self, thread_id: str, message: str, reply: str) -> None:
+        """Holds a message and its cached reply for the thread's next run.
+        
+        Runs on the remote thread must see the exchange, but a hit should
+        not wait on requests for it, so it is posted with the next run. If
+        the process exits first, only the local thread records it.
+        
+        Args:
+            thread_id: Thread ID
+            message: User message
+            reply: Cached response served for it
+        """
+        self._held_back.setdefault(thread_id, []).extend([
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": reply},
+        ])
+
+    async def _run_on_thread(
+        self,
+        thread_id: str,
+        message: str,
+        additional_instructions: Optional[str],
+        tokens: int,
+        started: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Posts a message to a remote thread and starts a run on it.
+        
+        The cache hits held back for the thread are posted before it.
+        
+        Args:
+            started: Receives the run under "run" and, if streaming already
+                delivered it, the reply text under "content" (else None)
+        
+        Yields:
+            Text deltas of the reply, if the run is streamed
+        """
+        messages = self._held_back.pop(thread_id, [])
+        messages.append({"role": "user", "content": message})
+        started["run"], started["content"] = None, None
+        if self.stream_runs:
+            async for delta in self._stream_run(
+                thread_id, messages, additional_instructions, tokens, started
+            ):
+                yield delta
+            
+        if started["run"] is None:
+            for posted in messages:
+                with span("messages.create"):
+                    await acall_with_retry(
+                        self.client.beta.threads.messages.create,
+                        thread_id=thread_id, **posted,
+                    )
+            
+            with span("runs.create"):
+                started["run"] = await acall_with_retry(
+                    self.client.beta.threads.runs.create,
+                    thread_id=thread_id,
+                    tokens=tokens,
+                    **self._run_options(additional_instructions),
+                )
+
+    async def _run_with_context(
+        self,
+        message: str,
+        context: List[Dict[str, str]],
+        additional_instructions: Optional[str],
+        tokens: int,
+        started: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Runs the assistant on a new remote thread seeded with a context.
+        
+        Args:
+            started: Receives the run and the streamed reply, as for
+                _run_on_thread()
+        
+        Yields:
+            Text deltas of the reply, if the run is streamed
+        """
+        options = context_run_options(
+            self.config, message, context, additional_instructions
+        )
+        
+        started["run"], started["content"] = None, None
+        if self.stream_runs:
+            async for delta in self._stream(
+                lambda: self.client.beta.threads.create_and_run_stream(**options),
+                tokens,
+                started,
+            ):
+                yield delta
+            
+        if started["run"] is None:
+            with span("create_and_run"):
+                started["run"] = await acall_with_retry(
+                    self.client.beta.threads.create_and_run, tokens=tokens, **options
+                )
+
+    def _run_options(self, additional_instructions: Optional[str]) -> Dict[str, Any]:
+        """Builds the keyword arguments shared by every run request."""
+        options: Dict[str, Any] = {
+            "assistant_id": self.config.assistant_id,
+            "tools": [{"type": "file_search"}],
+        }
+        if additional_instructions:
+            options["additional_instructions"] = additional_instructions
+        return options
+
+    def _stream_run(
+        self,
+        thread_id: str,
+        messages: List[Dict[str, str]],
+        additional_instructions: Optional[str],
+        tokens: int,
+        started: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Posts messages and runs the assistant over one streaming request.
+        
+        Args:
+            thread_id: Thread ID
+            messages: Messages to add to the thread before the run, as
+                role and content
+            additional_instructions: Optional per-run instructions
+            tokens: Estimated tokens of the request, for rate limiting
+            started: Receives the run and the reply, as from _stream()
+            
+        Yields:
+            Text deltas of the reply
+        """
+        return self._stream(
+            lambda: self.client.beta.threads.runs.stream(
+                thread_id=thread_id,
+                additional_messages=messages,
+                **self._run_options(additional_instructions),
+            ),
+            tokens,
+            started,
+        )
+
+    async def _stream(
+        self, open_stream: Callable[[], Any], tokens: int, started: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """Consumes a run stream, yielding the reply's text as it arrives.
+        
+        Streams are not retried: on failure the caller falls back to
+        polling, whose requests are.
+        
+        Args:
+            open_stream: Callable returning the async stream context manager
+            tokens: Estimated tokens of the request, for rate limiting
+            started: Receives the run under "run" and the reply text under
+                "content". The run is None if streaming failed before it
+                was created, and the reply is None if the stream failed or
+                ended without one.
+            
+        Yields:
+            Text deltas of the reply
+        """
+        started["run"], started["content"] = None, None
+        await get_rate_limiter().acquire_async(tokens)
+        try:
+            with span("runs.stream"):
+                async with open_stream() as stream:
+                    async for event in stream:
+                        if event.event == "thread.run.created":
+                            started["run"] = event.data
+                        elif event.event == "thread.message.delta":
+                            for delta in text_deltas(event):
+                                yield delta
+                    started["run"] = await stream.get_final_run()
+                    messages = await stream.get_final_messages()
+        except Exception as e:
+            note_failure(e)
+            print(f"Run streaming failed, falling back to polling: {e}")
+            return
+            
+        for reply in reversed(messages):
+            if reply.role == "assistant" and reply.content:
+                started["content"] = reply.content[0].text.value
+                return
+
+    async def _wait_for_run(self, thread_id: str, run: Any) -> Any:
+        """Polls a run with exponential backoff until it leaves the queue.
+        
+        The time the run is seen in each status is recorded as the stage
+        run.<status>, e.g. run.queued.
+        
+        Args:
+            thread_id: Thread ID
+            run: Run to wait for
+            
+        Returns:
+            The run in its final state
+        """
+        delays = poll_delays()
+        status, since = run.status, time.perf_counter()
+        while run.status in ["queued", "in_progress"]:
+            await asyncio.sleep(next(delays))
+            with span("runs.retrieve"):
+                run = await acall_with_retry(
+                    self.client.beta.threads.runs.retrieve,
+                    thread_id=thread_id, 
+                    run_id=run.id,
+                    idempotent=True,
+                )
+            if run.status != status:
+                now = time.perf_counter()
+                observe(f"run.{status}", now - since)
+                status, since = run.status, now
+        return run
+
+    async def _latest_reply(self, thread_id: str) -> Optional[str]:
+        """Fetches the newest assistant message of a thread, if any."""
+        with span("messages.list"):
+            messages = await acall_with_retry(
+                self.client.beta.threads.messages.list,
+                thread_id=thread_id,
+                order="desc",
+                limit=1,
+                idempotent=True,
+            )
+        
+        if len(messages.data) > 0 and messages.data[0].role == "assistant":
+            message = messages.data[0]
+            if message.content and len(message.content) > 0:
+                return message.content[0].text.value
+        return None
+
+    def get_state(self) -> Dict[str, Any]:
+        """Retrieves assistant state, including stored threads and metadata."""
+        return {
+            "id": self.config.assistant_id,
+            "name": self.config.name,
+            "instructions": self.config.instructions,
+            "model": self.config.model,
+            "tools": self.config.tools,
+            "files": self.file_manager.list_uploaded_files(),
+            "threads": self.threads.names(),
+        }
+
+    async def load_assistant(self) -> None:
+        """Verifies that the stored assistant still exists remotely.
+        
+        Threads are loaded lazily, each on first access through threads.
+        """
+        if is_recently_verified(self.config.assistant_id, self.verify_ttl):
+            return
+            
+        try:
+            await acall_with_retry(
+                self.client.beta.assistants.retrieve, self.config.assistant_id,
+                idempotent=True,
+            )
+        except Exception as e:
+            print(f"Error retrieving assistant: {e}")
+            print("Creating a new assistant instead")
+            self.config.assistant_id = None
+            await self.create_assistant()
+            return
+        mark_verified(self.config.assistant_id)
+        await asyncio.to_thread(
+            self.file_manager.touch, self.config.files, self.config.name
+        )
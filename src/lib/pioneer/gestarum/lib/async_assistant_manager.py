@@ -0,0 +1,147 @@
+import asyncio
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any
+
+from src.lib.pioneer.gestarum.lib.assistant_configuration import AssistantConfiguration
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread_storage import ThreadStorage
+from src.lib.pioneer.gestarum.lib.assistant_manager import (
+    load_configurations,
+    record_verifications,
+)
+from src.lib.pioneer.gestarum.lib.async_assistant import AsyncAssistant
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+class AsyncAssistantManager:
+    """Asyncio counterpart of AssistantManager.
+
+    Call load_assistants() after construction to read the configurations;
+    an assistant is only initialized when it is first requested.
+    """
+
+    def __init__(
+        self,
+        client: "AsyncOpenAI",
+        config_directory: str = "assistants",
+        verify_ttl: float = 300.0,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        thread_storage: Optional[ThreadStorage] = None,
+    ):
+        """Initialize assistant manager.
+        
+        Args:
+            client: AsyncOpenAI client instance
+            config_directory: Directory containing assistant configurations
+            verify_ttl: Seconds for which a remote verification of an
+                assistant is trusted
+            response_cache: Optional response cache shared by the assistants
+            doc_index: Optional local notes index shared by the assistants
+            thread_storage: Optional thread store shared by the assistants;
+                each assistant uses JSON files in its threads_dir otherwise
+        """
+        self.client = client
+        self.config_directory = config_directory
+        self.verify_ttl = verify_ttl
+        self.response_cache = response_cache
+        self.doc_index = doc_index
+        self.thread_storage = thread_storage
+        os.makedirs(self.config_directory, exist_ok=True)
+        self.assistants: Dict[str, AsyncAssistant] = {}  # Initialized, by ID
+        self.configs: Dict[str, AssistantConfiguration] = {}  # By name
+
+    def list_assistants(self) -> List[Tuple[str, Optional[str]]]:
+        """Returns a list of assistant names and IDs.
+        
+        The ID is None for configurations whose assistant was never created.
+        """
+        return [
+            (name, config.assistant_id) for name, config in self.configs.items()
+        ]
+
+    @property
+    def assistant_index(self) -> Dict[str, AsyncAssistant]:
+        """Returns a dictionary of the initialized assistants indexed by name."""
+        return {
+            assistant.config.name: assistant
+            for assistant in self.assistants.values()
+        }
+
+    async def load_assistants(self) -> None:
+        """Loads all assistant configurations from the config directory."""
+        self.configs = load_configurations(self.config_directory)
+
+    def save_assistants(self) -> None:
+        """Saves the state of all managed assistants."""
+        for assistant in self.assistants.values():
+            assistant.config.save()
+
+    async def _materialize(self, config: AssistantConfiguration) -> AsyncAssistant:
+        """Initializes the AsyncAssistant for a configuration and registers it."""
+        assistant = await AsyncAssistant(
+            self.client, config, verify_ttl=self.verify_ttl,
+            response_cache=self.response_cache,
+            doc_index=self.doc_index,
+            thread_storage=self.thread_storage,
+        ).initialize()
+        self.assistants[assistant.config.assistant_id] = assistant
+        self.configs[assistant.config.name] = assistant.config
+        record_verifications(self.config_directory, {assistant.config.name: assistant.config})
+        return assistant
+
+    async def create_assistant(self, config_data: Dict[str, Any]) -> str:
+        """Creates a new assistant from a configuration dictionary.
+        
+        Args:
+            config_data: Assistant configuration data
+            
+        Returns:
+            Assistant ID
+        """
+        assistant_config = AssistantConfiguration(
+            name=config_data["name"],
+            instructions=config_data["instructions"],
+            model=config_data.get("model", "gpt-4o"),
+            tools=config_data.get("tools", []),
+            files=config_data.get("files", []),
+            storage_dir=self.config_directory,
+        )
+        assistant = await self._materialize(assistant_config)
+        await asyncio.to_thread(assistant.config.save)
+        return assistant.config.assistant_id
+
+    async def get_assistant(self, assistant_id: str) -> Optional[AsyncAssistant]:
+        """Retrieves an assistant by its ID.
+        
+        Args:
+            assistant_id: Assistant ID
+            
+        Returns:
+            Assistant object or None if not found
+        """
+        assistant = self.assistants.get(assistant_id)
+        if assistant is None:
+            for config in self.configs.values():
+                if config.assistant_id == assistant_id:
+                    return await self._materialize(config)
+        return assistant
+
+    async def get_assistant_by_name(self, name: str) -> Optional[AsyncAssistant]:
+        """Retrieves an assistant by its name.
+        
+        Args:
+            name: Assistant name
+            
+        Returns:
+            Assistant object or None if no configuration has that name
+        """
+        config = self.configs.get(name)
+        if config is None:
+            return None
+        assistant = self.assistants.get(config.assistant_id)
+        if assistant is None:
+            assistant = await self._materialize(config)
+        return assistant
@@ -0,0 +1,167 @@
+"""
+Cross-process safe replacement of files.
+
+Several worker processes may share the directories of threads, assistant
+configurations and file records. A file is replaced by writing a temporary
+file next to it and renaming that into place, so a reader opens either the
+old or the new content and never a truncated one. The temporary file is
+named after the writing process and thread, so concurrent writers do not
+write into each other's.
+
+A writer that reads a file, checks it and replaces it holds an advisory
+lock (fcntl.flock) on a {path}.lock file next to it for the whole sequence.
+The lock lives in a separate file because the rename replaces the file
+itself. Where fcntl is unavailable, the lock only serializes the threads
+of one process.
+
+Saved objects carry a version counter. A save that finds the file at
+another version than the one it last read or wrote raises VersionConflict
+rather than overwriting the other writer's save.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, suppress
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+
+if sys.platform != "win32":  # Windows has no fcntl
+    import fcntl
+
+# (inode, size, modification time) of a file, or None if it does not exist
+Stamp = Optional[Tuple[int, int, int]]
+
+SAVE_ATTEMPTS = 8  # Saves retried after a conflict with another writer
+CONFLICT_BACKOFF = 0.005  # Seconds, doubled after each conflict
+
+
+class VersionConflict(Exception):
+    """Raised when a file was saved by another writer since it was read."""
+
+    def __init__(self, path: str, expected: Any, found: Any = None):
+        """Initialize the error.
+        
+        Args:
+            path: Path of the file
+            expected: Version the writer last read or wrote
+            found: Version of the file, if known
+        """
+        super().__init__(path, expected, found)
+        self.path = path
+        self.expected = expected
+        self.found = found
+
+    def __str__(self) -> str:
+        if self.found is None:
+            return f"{self.path} was saved by another writer since version {self.expected}"
+        return f"{self.path} is at version {self.found}, expected {self.expected}"
+
+
+def wait_after_conflict(attempt: int) -> None:
+    """Sleeps a random time before a save is retried, so writers drift apart.
+    
+    Args:
+        attempt: Number of the attempt that conflicted, from 0
+    """
+    time.sleep(random.uniform(0, CONFLICT_BACKOFF * 2 ** attempt))  # Full jitter
+
+
+# Lock path -> lock, used in place of flock where fcntl is unavailable
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+def _local_lock(path: str) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[None]:
+    """Holds an advisory lock on a file for the duration of a block.
+    
+    The lock is not reentrant: a thread holding it must not take it again.
+    
+    Args:
+        path: Path of the file; the lock is taken on {path}.lock
+        shared: Take a shared lock, which only excludes exclusive holders
+    """
+    lock_path = f"{path}.lock"
+    if sys.platform == "win32":
+        with _local_lock(lock_path):
+            yield
+        return
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Releases the lock
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", fsync: bool = False) -> Iterator[IO]:
+    """Opens a temporary file that replaces path when the block completes.
+    
+    If the block raises, the temporary file is removed and path is left
+    as it was.
+    
+    Args:
+        path: Path of the file to write
+        mode: "w" for text or "wb" for bytes
+        fsync: Flush the content to disk before the rename, so a crash
+            cannot leave an empty file in place of the old one
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+def write_json(path: str, data: Any, indent: Optional[int] = 4, fsync: bool = False) -> None:
+    """Atomically replaces a file with the JSON encoding of data."""
+    with atomic_write(path, fsync=fsync) as f:
+        json.dump(data, f, indent=indent)
+
+def file_stamp(path: str) -> Stamp:
+    """Returns what identifies a version of a file without reading it.
+    
+    A file replaced by rename gets a new inode and one appended to or
+    truncated gets a new size and modification time, so an unchanged
+    stamp means an unchanged file.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+def stored_version(path: str) -> Optional[int]:
+    """Returns the "version" of a JSON file, 0 if it has none, or None if it is missing."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return data.get("version", 0) if isinstance(data, dict) else 0
+
+def check_version(path: str, expected: int) -> None:
+    """Checks that a JSON file is missing or at the expected version.
+    
+    Args:
+        path: Path of the file, whose lock the caller holds
+        expected: Version the caller last read or wrote
+    
+    Raises:
+        VersionConflict: If the file is at another version
+    """
+    found = stored_version(path)
+    if found is not None and found != expected:
+        raise VersionConflict(path, expected, found)
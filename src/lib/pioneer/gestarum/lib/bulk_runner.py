@@ -0,0 +1,203 @@
+import json
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Set
+
+from src.lib.pioneer.gestarum.lib.assistant import Assistant
+
+def read_prompts(path: str) -> Iterator[Dict[str, Any]]:
+    """Reads prompts from a JSONL file.
+    
+    Each line is an object with a "prompt" and an optional "id"; lines
+    without an ID are identified by their line number.
+    
+    Args:
+        path: Path to the JSONL file
+    
+    Yields:
+        Prompt records with "id" and "prompt" keys
+    """
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"Skipping invalid prompt on line {line_number}: {e}")
+                continue
+            if isinstance(record, str):
+                record = {"prompt": record}
+            if "prompt" not in record:
+                print(f"Skipping line {line_number}: no prompt")
+                continue
+            record.setdefault("id", str(line_number))
+            yield record
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Collects the IDs of prompts already answered in an output file.
+    
+    A partially written last line (from an interrupted run) is truncated
+    so new results can be appended after it.
+    
+    Args:
+        output_path: Path to the JSONL results file
+    
+    Returns:
+        IDs of prompts answered successfully
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+
+    valid_size = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                result = json.loads(line)
+            except ValueError:
+                break
+            valid_size += len(line)
+            if result.get("status") == "ok":
+                done.add(str(result["id"]))
+
+    if valid_size < os.path.getsize(output_path):
+        print(f"Truncating partial result at the end of {output_path}")
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_size)
+    return done
+
+
+class BulkRunner:
+    """Answers many prompts with one assistant over a pool of threads.
+    
+    Each pool thread carries at most one run at a time, and up to pool_size
+    runs are in flight at once. Results are appended to a JSONL file as they
+    complete, and that file doubles as the checkpoint: a rerun skips prompts
+    already answered successfully and retries the rest.
+    """
+
+    def __init__(
+        self,
+        assistant: Assistant,
+        pool_size: int = 8,
+        thread_prefix: str = "Bulk Thread",
+        isolated: bool = True,
+    ):
+        """Initialize the bulk runner.
+        
+        Args:
+            assistant: Assistant answering the prompts
+            pool_size: Number of threads, and thus the maximum number of
+                runs in flight
+            thread_prefix: Name prefix of the pool threads; threads with
+                these names are reused across runs
+            isolated: Answer every prompt without the history of earlier
+                prompts (each run gets an empty context); if False, prompts
+                on the same pool thread see each other
+        """
+        self.assistant = assistant
+        self.pool_size = max(1, pool_size)
+        self.thread_prefix = thread_prefix
+        self.isolated = isolated
+        self.thread_ids = self._pool_threads()
+
+    def _pool_threads(self) -> List[str]:
+        """Finds or creates the named threads of the pool."""
+        thread_ids = []
+        for i in range(self.pool_size):
+            name = f"{self.thread_prefix} {i}"
+            thread_id = self.assistant.threads.find(name)
+            if thread_id is None:
+                thread_id = self.assistant.create_thread(name=name)
+            thread_ids.append(thread_id)
+        return thread_ids
+
+    def _answer(
+        self, record: Dict[str, Any], free_threads: "queue.Queue[str]"
+    ) -> Dict[str, Any]:
+        """Answers one prompt on a free pool thread."""
+        thread_id = free_threads.get()
+        start = time.perf_counter()
+        result = {"id": record["id"], "prompt": record["prompt"], "thread_id": thread_id}
+        try:
+            response = self.assistant.send_message(
+                thread_id,
+                record["prompt"],
+                record.get("instructions"),
+                [] if self.isolated else None,
+            )
+        except Exception as e:
+            result.update(status="error", error=str(e))
+        else:
+            if response.startswith("Error: Run completed with status"):
+                result.update(status="error", error=response)
+            else:
+                result.update(status="ok", response=response)
+        finally:
+            free_threads.put(thread_id)
+        result["elapsed"] = time.perf_counter() - start
+        return result
+
+    def run(
+        self,
+        prompts: Iterable[Dict[str, Any]],
+        output_path: str,
+        resume: bool = True,
+    ) -> Dict[str, Any]:
+        """Answers prompts and streams the results to a JSONL file.
+        
+        Args:
+            prompts: Prompt records with "id" and "prompt" keys (and an
+                optional "instructions" key), for example from read_prompts()
+            output_path: JSONL file the results are appended to
+            resume: Skip prompts already answered in output_path; if False,
+                the file is overwritten
+        
+        Returns:
+            Summary with counts of answered, failed and skipped prompts,
+            the elapsed time and the throughput
+        """
+        done = load_checkpoint(output_path) if resume else set()
+        summary: Dict[str, Any] = {"ok": 0, "error": 0, "skipped": 0}
+        free_threads: "queue.Queue[str]" = queue.Queue()
+        for thread_id in self.thread_ids:
+            free_threads.put(thread_id)
+
+        start = time.perf_counter()
+        pending: Set[Future] = set()
+        with open(output_path, "a" if resume else "w") as output, \
+                ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+
+            def drain() -> None:
+                finished, still_pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.intersection_update(still_pending)
+                for future in finished:
+                    result = future.result()
+                    summary[result["status"]] += 1
+                    output.write(json.dumps(result) + "\n")
+                output.flush()
+
+            for record in prompts:
+                if str(record["id"]) in done:
+                    summary["skipped"] += 1
+                    continue
+                # Keep a bounded window of submitted prompts
+                if len(pending) >= 2 * self.pool_size:
+                    drain()
+                pending.add(executor.submit(self._answer, record, free_threads))
+
+            while pending:
+                drain()
+
+        elapsed = time.perf_counter() - start
+        summary["elapsed"] = elapsed
+        summary["prompts_per_second"] = (
+            (summary["ok"] + summary["error"]) / elapsed if elapsed > 0 else 0.0
+        )
+        return summary
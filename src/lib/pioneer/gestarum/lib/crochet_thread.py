@@ -5,16 +5,163 @@ This module implements a nonlinear thread model with:
 - Directed graph memory (not linear logs)
 - Character-aware collapse surfaces
 - Asynchronous tension binding
+
+Threads are persisted as a JSON snapshot. In journal mode each new node,
+edge and context change is appended to a line-delimited journal instead,
+and the journal is periodically compacted into the snapshot. Given a
+GraphStorage, such as an SQLiteThreadStorage, the same change records are
+inserted as rows instead.
+
+A response that is still streaming is added as a provisional node, whose
+content grows in memory as text arrives and which is finalized in place
+once the reply is complete; the final content is recorded as an "update"
+of the node.
+
+Prompts may also be pipelined: submit_prompt() adds a prompt under a
+correlation ID without waiting for its responses, and bind_response() adds
+a response under the same ID in any order. A response arriving before its
+prompt waits in a buffer of pending edges until the prompt is submitted.
+The buffer is not persisted; it is rebuilt from the correlation IDs in the
+node metadata when the thread is loaded.
+
+A thread mirroring an assistant Thread records how many of its messages it
+holds (synced_messages), so a client only adds the messages past that mark
+when it loads the graph again.
+
+Given a memory budget, a thread keeps its resident size bounded: once it
+goes over, its oldest nodes are collapsed into a summary node that keeps
+their edges to the remaining nodes, and their full content is spilled to a
+file next to the thread, from which it is read back on demand. Each
+instance spills to a file of its own, removed when the instance is loaded
+again, closed or collected, so instances of one thread in several
+processes or sessions do not overwrite each other's. A MemoryBudget shared
+by several threads bounds them together.
+
+Several processes may save the same thread. Saves to files hold a lock
+next to the snapshot and check that the snapshot and journal are as this
+instance last left them; saves to a store check the stored sequence
+number. If another process saved in between, the thread is reloaded and
+the unsaved changes are applied again on top (see CrochetThread.rebase).
 """
 
+import heapq
 import json
 import os
+import sys
+import threading
 import time
 import uuid
-from typing import Dict, List, Optional, Any, Set
+import weakref
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from itertools import islice
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Any, Set, Tuple, Union
+
+from src.lib.pioneer.gestarum.lib.atomic_file import (
+    SAVE_ATTEMPTS,
+    Stamp,
+    VersionConflict,
+    atomic_write,
+    file_lock,
+    file_stamp,
+    wait_after_conflict,
+)
+from src.lib.pioneer.gestarum.lib.instrumentation import instrumented
+from src.lib.pioneer.gestarum.lib.thread_storage import GraphStorage
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the token count of a text at roughly four characters per token.
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Estimated number of tokens
+    """
+    return len(text) // 4 + 1
+
+
+def _remove_file(path: str) -> None:
+    """Removes a file if it exists."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Interns a repeated label so every node shares one string object."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# Estimated resident bytes of a node or edge besides its content: the object,
+# its ID and timestamp, and its entries in the node dictionary and indexes
+NODE_OVERHEAD_BYTES = 360
+EDGE_OVERHEAD_BYTES = 160
+
+# A budgeted thread over its budget is shrunk to this fraction of it, so it
+# is not collapsed again on the very next message
+LOW_WATER = 0.75
+
+# Tokens of context sent with a pipelined run when a client has no budget set;
+# pipelined runs cannot rely on the history of a remote thread
+PIPELINED_CONTEXT_TOKENS = 4000
+
+SUMMARY = "summary"  # Type and role of the nodes standing for collapsed ones
+SUMMARY_ID_PREFIX = f"{SUMMARY}-"
+
+
+def summarize_nodes(nodes: List["MemoryNode"], max_chars: int = 1200) -> str:
+    """Builds an extractive summary of nodes being collapsed.
+    
+    Each message contributes its author and first line, shortened; earlier
+    summaries among the nodes contribute their lines unchanged. If the
+    result is longer than max_chars, the oldest lines are dropped.
+    
+    Args:
+        nodes: Nodes being collapsed, in chronological order
+        max_chars: Maximum length of the summary
+        
+    Returns:
+        Summary text, one line per message
+    """
+    lines: List[str] = []
+    for node in nodes:
+        if node.type == SUMMARY:
+            lines.extend(node.content.splitlines())
+            continue
+        first_line = node.content.strip().split("\n", 1)[0]
+        if len(first_line) > 100:
+            first_line = first_line[:97] + "..."
+        lines.append(f"{node.character_id or node.role or node.type}: {first_line}")
+        
+    kept: List[str] = []
+    length = 0
+    for line in reversed(lines):
+        length += len(line) + 1
+        if length > max_chars:
+            break
+        kept.append(line)
+    kept.reverse()
+    return "\n".join(kept)
+
 
 class MemoryNode:
-    """A node in the memory graph representing a message or event."""
+    """A node in the memory graph representing a message or event.
+    
+    Nodes use __slots__ and keep the common "role" and "character_id"
+    metadata entries as interned attributes; only other metadata keys get
+    a dictionary of their own. The metadata property assembles a read-only
+    mapping on access, so changing an entry in place raises TypeError;
+    assign a new dictionary instead, e.g.
+    node.metadata = {**node.metadata, "key": value}.
+    """
+    
+    __slots__ = (
+        "id", "content", "type", "timestamp", "role", "character_id", "_extra", "_tokens"
+    )
     
     def __init__(
         self,
@@ -33,11 +180,45 @@ class MemoryNode:
             timestamp: Creation time of the node
             metadata: Additional data associated with the node
         """
-        self.id = node_id
+        self.id = _intern(node_id)
         self.content = content
-        self.type = node_type
+        self.type = _intern(node_type)
         self.timestamp = timestamp or time.time()
         self.metadata = metadata or {}
+        self._tokens: Optional[int] = None
+        
+    def token_count(self, counter: Callable[[str], int] = estimate_tokens) -> int:
+        """Returns the token count of the content, computing it only once.
+        
+        Args:
+            counter: Function that counts the tokens of a text
+        """
+        if self._tokens is None:
+            self._tokens = counter(self.content)
+        return self._tokens
+        
+    @property
+    def metadata(self) -> Mapping[str, Any]:
+        """Metadata of the node, as a read-only mapping."""
+        return MappingProxyType(self._metadata_dict())
+        
+    @metadata.setter
+    def metadata(self, metadata: Mapping[str, Any]) -> None:
+        extra = dict(metadata)
+        self.role = _intern(extra.pop("role", None))
+        self.character_id = _intern(extra.pop("character_id", None))
+        self._extra = extra or None
+        
+    def _metadata_dict(self) -> Dict[str, Any]:
+        """Assembles the metadata of the node as a new dictionary."""
+        metadata: Dict[str, Any] = {}
+        if self.role is not None:
+            metadata["role"] = self.role
+        if self.character_id is not None:
+            metadata["character_id"] = self.character_id
+        if self._extra:
+            metadata.update(self._extra)
+        return metadata
         
     def to_dict(self) -> Dict[str, Any]:
         """Convert the node to a dictionary for serialization."""
@@ -46,7 +227,7 @@ class MemoryNode:
             "content": self.content,
             "type": self.type,
             "timestamp": self.timestamp,
-            "metadata": self.metadata,
+            "metadata": self._metadata_dict(),
         }
         
     @classmethod
@@ -64,6 +245,8 @@ class MemoryNode:
 class MemoryEdge:
     """An edge in the memory graph connecting two nodes."""
     
+    __slots__ = ("source_id", "target_id", "type", "weight", "_metadata")
+    
     def __init__(
         self,
         source_id: str,
@@ -81,12 +264,21 @@ class MemoryEdge:
             weight: Strength of the connection
             metadata: Additional data associated with the edge
         """
-        self.source_id = source_id
-        self.target_id = target_id
-        self.type = edge_type
+        self.source_id = _intern(source_id)
+        self.target_id = _intern(target_id)
+        self.type = _intern(edge_type)
         self.weight = weight
         self.metadata = metadata or {}
         
+    @property
+    def metadata(self) -> Mapping[str, Any]:
+        """Metadata of the edge, as a read-only mapping."""
+        return MappingProxyType(self._metadata or {})
+        
+    @metadata.setter
+    def metadata(self, metadata: Mapping[str, Any]) -> None:
+        self._metadata = dict(metadata) if metadata else None
+        
     def to_dict(self) -> Dict[str, Any]:
         """Convert the edge to a dictionary for serialization."""
         return {
@@ -94,7 +286,7 @@ class MemoryEdge:
             "target_id": self.target_id,
             "type": self.type,
             "weight": self.weight,
-            "metadata": self.metadata,
+            "metadata": dict(self._metadata) if self._metadata else {},
         }
         
     @classmethod
@@ -109,6 +301,160 @@ class MemoryEdge:
         )
 
 
+class EdgeColumns:
+    """Column-oriented edge storage for large threads.
+    
+    Edges are kept as parallel arrays of source index, target index, type
+    code and weight instead of one MemoryEdge object each. It behaves like
+    a list of MemoryEdge: appending takes an edge, while iterating and
+    indexing build lightweight MemoryEdge views on demand.
+    """
+    
+    def __init__(self) -> None:
+        """Initialize empty edge columns."""
+        self.node_ids: List[str] = []  # index -> node ID
+        self.node_index: Dict[str, int] = {}  # node ID -> index
+        self.types: List[str] = []  # type code -> edge type
+        self.type_codes: Dict[str, int] = {}  # edge type -> type code
+        self.sources = array("I")
+        self.targets = array("I")
+        self.type_column = array("H")
+        self.weights = array("d")
+        self.metadata: Dict[int, Dict[str, Any]] = {}  # sparse, by edge position
+        
+    def _node_code(self, node_id: str) -> int:
+        code = self.node_index.get(node_id)
+        if code is None:
+            code = len(self.node_ids)
+            node_id = _intern(node_id)
+            self.node_ids.append(node_id)
+            self.node_index[node_id] = code
+        return code
+        
+    def _type_code(self, edge_type: str) -> int:
+        code = self.type_codes.get(edge_type)
+        if code is None:
+            code = len(self.types)
+            edge_type = _intern(edge_type)
+            self.types.append(edge_type)
+            self.type_codes[edge_type] = code
+        return code
+        
+    def append(self, edge: MemoryEdge) -> None:
+        """Appends an edge to the columns.
+        
+        Args:
+            edge: Edge to store
+        """
+        if edge._metadata:
+            self.metadata[len(self.sources)] = edge._metadata
+        self.sources.append(self._node_code(edge.source_id))
+        self.targets.append(self._node_code(edge.target_id))
+        self.type_column.append(self._type_code(edge.type))
+        self.weights.append(edge.weight)
+        
+    def extend(self, edges: Iterable[MemoryEdge]) -> None:
+        """Appends several edges to the columns."""
+        for edge in edges:
+            self.append(edge)
+        
+    def __len__(self) -> int:
+        return len(self.sources)
+        
+    def __getitem__(self, position: int) -> MemoryEdge:
+        if position < 0:
+            position += len(self.sources)
+        return MemoryEdge(
+            source_id=self.node_ids[self.sources[position]],
+            target_id=self.node_ids[self.targets[position]],
+            edge_type=self.types[self.type_column[position]],
+            weight=self.weights[position],
+            metadata=self.metadata.get(position),
+        )
+        
+    def __iter__(self) -> Iterator[MemoryEdge]:
+        for position in range(len(self.sources)):
+            yield self[position]
+
+
+class MemoryBudget:
+    """Resident byte budget shared by the CrochetThreads of a process.
+    
+    Threads report their resident size after each change. When the total
+    goes over max_bytes, the least recently changed threads are shrunk down
+    to their hot nodes, oldest first, until the total is back under the low
+    water mark. Threads used from several OS threads at once must each be
+    registered with the lock their users hold: a thread whose lock is busy
+    is skipped rather than shrunk under its user.
+    """
+    
+    def __init__(self, max_bytes: int):
+        """Initialize a budget.
+        
+        Args:
+            max_bytes: Maximum estimated resident bytes of all threads
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        # id(thread) -> (weak reference, last reported bytes), least recent first
+        self._threads: "OrderedDict[int, Tuple[weakref.ref, int]]" = OrderedDict()
+        self._locks: "weakref.WeakKeyDictionary[CrochetThread, threading.Lock]" = (
+            weakref.WeakKeyDictionary()
+        )
+        
+    def register(self, thread: "CrochetThread", lock: threading.Lock) -> None:
+        """Registers the lock held by the users of a thread.
+        
+        Args:
+            thread: Thread sharing this budget
+            lock: Lock held while the thread is in use; other threads' updates
+                only shrink it after acquiring the lock without waiting
+        """
+        with self._lock:
+            self._locks[thread] = lock
+            
+    def update(self, thread: "CrochetThread") -> None:
+        """Records a thread's resident size, shrinking other threads if needed.
+        
+        Threads other than the one that changed are skipped while their
+        registered lock is held.
+        
+        Args:
+            thread: Thread that just changed
+        """
+        with self._lock:
+            key = id(thread)
+            _, previous = self._threads.pop(key, (None, 0))
+            self._threads[key] = (weakref.ref(thread), thread.resident_bytes)
+            self.total_bytes += thread.resident_bytes - previous
+            if self.total_bytes <= self.max_bytes:
+                return
+                
+            target = int(self.max_bytes * LOW_WATER)
+            for other_key in list(self._threads):
+                if self.total_bytes <= target:
+                    break
+                ref, reported = self._threads[other_key]
+                other = ref()
+                if other is None:  # Collected since it last reported
+                    del self._threads[other_key]
+                    self.total_bytes -= reported
+                    continue
+                lock = self._locks.get(other) if other is not thread else None
+                if lock is None:
+                    resident = other.shrink(0)
+                elif lock.acquire(blocking=False):
+                    try:
+                        resident = other.shrink(0)
+                    finally:
+                        lock.release()
+                else:  # In use by another OS thread
+                    continue
+                self._threads[other_key] = (ref, resident)
+                self.total_bytes += resident - reported
+
+
 class CrochetThread:
     """
     A nonlinear thread implementation based on McTavish's model.
@@ -120,23 +466,257 @@ class CrochetThread:
     - Character-aware responses (different personas can respond differently)
     """
     
-    def __init__(self, thread_id: str, name: str, storage_dir: str = "threads"):
+    def __init__(
+        self,
+        thread_id: str,
+        name: str,
+        storage_dir: str = "threads",
+        journal: bool = False,
+        compact_every: int = 1000,
+        compact_edges: bool = False,
+        token_counter: Callable[[str], int] = estimate_tokens,
+        storage: Optional[GraphStorage] = None,
+        memory_budget: Optional[int] = None,
+        process_budget: Optional[MemoryBudget] = None,
+        hot_nodes: int = 32,
+        spill_dir: Optional[str] = None,
+        summarizer: Callable[[List[MemoryNode]], str] = summarize_nodes,
+    ):
         """Initialize a Crochet thread.
         
         Args:
             thread_id: OpenAI thread ID or unique identifier
             name: Human-readable name for the thread
             storage_dir: Directory to store thread data
+            journal: Append changes to a journal on save instead of rewriting
+                the whole snapshot
+            compact_every: Number of journal records after which save()
+                compacts the journal into a fresh snapshot
+            compact_edges: Store edges in array-backed columns rather than
+                one MemoryEdge object each, for large edge-heavy threads
+            token_counter: Function used to count tokens when assembling
+                budgeted context; counts are cached on each node
+            storage: Optional graph store; each save then
+                inserts the records added since the last one, and the
+                snapshot and journal files are not used
+            memory_budget: Optional maximum estimated resident bytes of the
+                thread; over it, the oldest nodes are collapsed into a
+                summary node and their content is spilled to disk
+            process_budget: Optional budget shared with other threads,
+                which may shrink this thread when they grow
+            hot_nodes: Number of newest nodes that are never collapsed
+            spill_dir: Directory of the spill files; defaults to storage_dir
+            summarizer: Function writing the content of a summary node from
+                the nodes it replaces
+        
+        Raises:
+            ValueError: If storage is not a GraphStorage
         """
+        if storage is not None and not isinstance(storage, GraphStorage):
+            raise ValueError(f"{type(storage).__name__} does not store graphs")
         self.thread_id = thread_id
         self.name = name
         self.storage_dir = storage_dir
         self.nodes: Dict[str, MemoryNode] = {}
-        self.edges: List[MemoryEdge] = []
+        self.compact_edges = compact_edges
+        self.edges: Union[List[MemoryEdge], EdgeColumns] = self._new_edge_store()
         self.characters: Set[str] = set()
         self.current_context_nodes: List[str] = []  # IDs of nodes in current context
+        self._provisional: Set[str] = set()  # IDs of responses still streaming
+        # Pipelined prompts by correlation ID: the prompt node of each one
+        # still awaiting responses, the number of responses it awaits, and
+        # the response nodes that arrived before their prompt
+        self._prompts: Dict[str, str] = {}
+        self._awaited: Dict[str, int] = {}
+        self._unbound: Dict[str, List[str]] = {}
+        # Adjacency index: node ID -> neighbor ID, or a list once there are several
+        self._outgoing: Dict[str, Union[str, List[str]]] = {}
+        self._incoming: Dict[str, Union[str, List[str]]] = {}
+        # Secondary indexes: node IDs in chronological order, and positions
+        # into that sequence grouped by role and, for assistant messages, by
+        # character
+        self._chronological: List[str] = []
+        self._by_role: Dict[str, array] = {}
+        self._by_character: Dict[str, array] = {}
+        self._chronology_sorted = True
+        self.token_counter = token_counter
+        self.journal = journal
+        self.compact_every = compact_every
+        self._pending_records: List[Dict[str, Any]] = []  # not yet journaled
+        self._journal_seq = 0  # sequence number of the last recorded change
+        self._journal_size = 0  # records in the journal since the last snapshot
+        # Stamps of the snapshot and journal as this instance last left them
+        self._stamps: Tuple[Stamp, Stamp] = (None, None)
+        self.storage = storage
+        # Messages of the mirrored assistant Thread already in the graph; None
+        # after loading a graph saved before the count was recorded
+        self.synced_messages: Optional[int] = 0
+        self.memory_budget = memory_budget
+        self.process_budget = process_budget
+        self.hot_nodes = hot_nodes
+        self.spill_dir = spill_dir or storage_dir
+        self.summarizer = summarizer
+        self.resident_bytes = 0  # estimated, see NODE_OVERHEAD_BYTES
+        self._spill_started = False  # the spill file is created on first use
+        self._spill_path = os.path.join(
+            self.spill_dir, f"{thread_id}.{os.getpid()}.{uuid.uuid4().hex}.spill"
+        )
+        # Removes the spill file when the thread is closed or collected
+        self._remove_spill = weakref.finalize(self, _remove_file, self._spill_path)
+        
+        if storage is None:
+            os.makedirs(self.storage_dir, exist_ok=True)
+        if memory_budget is not None or process_budget is not None:
+            os.makedirs(self.spill_dir, exist_ok=True)
         
-        os.makedirs(self.storage_dir, exist_ok=True)
+    @property
+    def snapshot_path(self) -> str:
+        """Path of the JSON snapshot file.
+        
+        It differs from the {thread_id}.json file of the Thread with the same
+        ID, which older versions overwrote.
+        """
+        return os.path.join(self.storage_dir, f"{self.thread_id}.crochet.json")
+        
+    @property
+    def journal_path(self) -> str:
+        """Path of the append-only journal file."""
+        return os.path.join(self.storage_dir, f"{self.thread_id}.journal")
+        
+    @property
+    def spill_path(self) -> str:
+        """Path of the file holding the content of collapsed nodes.
+        
+        It only serves the nodes collapsed by this instance and is named
+        after the process and the instance, so other instances of the
+        thread, here or in other processes, never write to it. It is
+        removed on each load and when the instance is closed.
+        """
+        return self._spill_path
+        
+    def close(self) -> None:
+        """Removes the spill file; the thread must not be used afterwards.
+        
+        Unsaved changes are not written.
+        """
+        self._remove_spill()
+        
+    def _record(self, op: str, data: Any) -> None:
+        """Queues a change record for the journal or the store."""
+        if self.journal or self.storage is not None:
+            self._journal_seq += 1
+            self._pending_records.append(
+                {"seq": self._journal_seq, "op": op, "data": data}
+            )
+            
+    def mark_synced(self, count: int) -> None:
+        """Records that the first count messages of the mirrored Thread are in the graph.
+        
+        Args:
+            count: Number of the Thread's messages the graph now holds
+        """
+        if count != self.synced_messages:
+            self.synced_messages = count
+            self._record("synced", count)
+            
+    @staticmethod
+    def _node_bytes(node: MemoryNode) -> int:
+        """Estimates the resident bytes of a node."""
+        size = sys.getsizeof(node.content) + NODE_OVERHEAD_BYTES
+        if node._extra:
+            size += sys.getsizeof(node._extra)
+        return size
+        
+    def _add_node(self, node: MemoryNode) -> None:
+        """Stores a node and records it in the secondary indexes."""
+        self.nodes[node.id] = node
+        self.resident_bytes += self._node_bytes(node)
+        if node.character_id:
+            self.characters.add(node.character_id)
+        if (
+            self._chronological
+            and self.nodes[self._chronological[-1]].timestamp > node.timestamp
+        ):
+            self._chronology_sorted = False
+        self._index_node(node, len(self._chronological))
+        self._chronological.append(node.id)
+        
+    def _index_node(self, node: MemoryNode, position: int) -> None:
+        """Records a node's chronological position under its role and character."""
+        if node.role is not None:
+            self._by_role.setdefault(node.role, array("q")).append(position)
+        if node.role == "assistant" and node.character_id is not None:
+            self._by_character.setdefault(node.character_id, array("q")).append(position)
+            
+    def _rebuild_node_indexes(self) -> None:
+        """Rebuilds the secondary indexes with nodes sorted by timestamp."""
+        self._chronological = sorted(
+            self.nodes, key=lambda node_id: self.nodes[node_id].timestamp
+        )
+        self._by_role = {}
+        self._by_character = {}
+        for position, node_id in enumerate(self._chronological):
+            self._index_node(self.nodes[node_id], position)
+        self._chronology_sorted = True
+        
+    def _positions_since(self, positions: array, since: Optional[float]) -> array:
+        """Returns the tail of a position list with timestamps at or after since."""
+        if since is None:
+            return positions
+        start = bisect_left(
+            positions,
+            since,
+            key=lambda position: self.nodes[self._chronological[position]].timestamp,
+        )
+        return positions[start:]
+            
+    def _set_context(self, node_ids: List[str]) -> None:
+        """Replaces the current context nodes."""
+        self.current_context_nodes = node_ids
+        self._record("context", node_ids)
+        
+    def _new_edge_store(self) -> Union[List[MemoryEdge], EdgeColumns]:
+        """Creates an empty edge container for the configured storage."""
+        return EdgeColumns() if self.compact_edges else []
+        
+    def _add_edge(self, edge: MemoryEdge) -> None:
+        """Appends an edge and records it in the adjacency index."""
+        self.edges.append(edge)
+        self._link(edge)
+        self.resident_bytes += EDGE_OVERHEAD_BYTES
+        
+    def _link(self, edge: MemoryEdge) -> None:
+        """Records an edge in the adjacency index."""
+        for adjacency, key, neighbor_id in (
+            (self._outgoing, edge.source_id, edge.target_id),
+            (self._incoming, edge.target_id, edge.source_id),
+        ):
+            existing = adjacency.get(key)
+            if existing is None:
+                adjacency[key] = neighbor_id
+            elif isinstance(existing, str):
+                adjacency[key] = [existing, neighbor_id]
+            else:
+                existing.append(neighbor_id)
+                
+    @staticmethod
+    def _neighbors(
+        adjacency: Dict[str, Union[str, List[str]]], node_id: str
+    ) -> List[str]:
+        """Returns the neighbor IDs of a node in one adjacency direction."""
+        neighbors = adjacency.get(node_id)
+        if neighbors is None:
+            return []
+        if isinstance(neighbors, str):
+            return [neighbors]
+        return neighbors
+        
+    def _rebuild_index(self) -> None:
+        """Rebuilds the adjacency index from the edge list."""
+        self._outgoing = {}
+        self._incoming = {}
+        for edge in self.edges:
+            self._link(edge)
         
     def add_message(self, role: str, content: str, character_id: Optional[str] = None) -> str:
         """Adds a message to the thread as a new node.
@@ -154,7 +734,6 @@ class CrochetThread:
         
         if character_id and role == "assistant":
             metadata["character_id"] = character_id
-            self.characters.add(character_id)
             
         node = MemoryNode(
             node_id=node_id,
@@ -163,7 +742,8 @@ class CrochetThread:
             metadata=metadata,
         )
         
-        self.nodes[node_id] = node
+        self._add_node(node)
+        self._record("node", node.to_dict())
         
         if role == "assistant" and self.current_context_nodes:
             for context_node_id in self.current_context_nodes:
@@ -172,40 +752,36 @@ class CrochetThread:
                     target_id=node_id,
                     edge_type="reply",
                 )
-                self.edges.append(edge)
+                self._add_edge(edge)
+                self._record("edge", edge.to_dict())
                 
         if role == "user":
-            self.current_context_nodes = [node_id]
+            self._set_context([node_id])
             
+        self._enforce_budget()
         return node_id
         
     def add_character_response(self, character_id: str, content: str, 
-                              context_node_ids: Optional[List[str]] = None) -> str:
+                              context_node_ids: Optional[List[str]] = None,
+                              provisional: bool = False) -> str:
         """Adds a character-specific response to the thread.
         
         Args:
             character_id: Character identifier
             content: Response content
             context_node_ids: Optional list of node IDs this response relates to
+            provisional: The response is still streaming; the node is marked
+                provisional and is not collapsed until update_node_content()
+                finalizes it
             
         Returns:
             ID of the created node
         """
-        node_id = str(uuid.uuid4())
-        metadata = {
-            "role": "assistant",
-            "character_id": character_id,
-        }
-        
-        node = MemoryNode(
-            node_id=node_id,
-            content=content,
-            node_type="message",
-            metadata=metadata,
+        node_id = self._add_response_node(
+            character_id, content, {"provisional": True} if provisional else {}
         )
-        
-        self.nodes[node_id] = node
-        self.characters.add(character_id)
+        if provisional:
+            self._provisional.add(node_id)
         
         connect_to = context_node_ids or self.current_context_nodes
         for context_node_id in connect_to:
@@ -215,10 +791,247 @@ class CrochetThread:
                     target_id=node_id,
                     edge_type="reply",
                 )
-                self.edges.append(edge)
+                self._add_edge(edge)
+                self._record("edge", edge.to_dict())
                 
+        self._enforce_budget()
+        return node_id
+        
+    def _add_response_node(
+        self, character_id: str, content: str, metadata: Dict[str, Any]
+    ) -> str:
+        """Adds an assistant message node of a character, without edges.
+        
+        Args:
+            character_id: Character identifier
+            content: Response content
+            metadata: Metadata entries besides the role and character
+            
+        Returns:
+            ID of the created node
+        """
+        node = MemoryNode(
+            node_id=str(uuid.uuid4()),
+            content=content,
+            node_type="message",
+            metadata={"role": "assistant", "character_id": character_id, **metadata},
+        )
+        self._add_node(node)
+        self._record("node", node.to_dict())
+        return node.id
+        
+    def submit_prompt(
+        self, correlation_id: str, content: str, expected_responses: int = 1
+    ) -> str:
+        """Adds a user prompt whose responses are bound to it by correlation ID.
+        
+        Unlike add_message(), the prompt does not become the current
+        context, so any number of prompts can await their responses at
+        once. Responses already buffered under the correlation ID are bound
+        to it straight away. The prompt is not collapsed until
+        expected_responses responses were bound or cancelled.
+        
+        Args:
+            correlation_id: Identifier shared by the prompt and its responses
+            content: Prompt content
+            expected_responses: Number of responses the prompt awaits
+            
+        Returns:
+            ID of the created node
+        
+        Raises:
+            ValueError: If a prompt with the correlation ID still awaits
+                responses
+        """
+        if correlation_id in self._prompts:
+            raise ValueError(f"Prompt {correlation_id} is already awaiting responses")
+        node = MemoryNode(
+            node_id=str(uuid.uuid4()),
+            content=content,
+            node_type="message",
+            metadata={
+                "role": "user",
+                "correlation_id": correlation_id,
+                "expected_responses": expected_responses,
+            },
+        )
+        self._add_node(node)
+        self._record("node", node.to_dict())
+        
+        self._prompts[correlation_id] = node.id
+        self._awaited[correlation_id] = expected_responses
+        for response_id in self._unbound.pop(correlation_id, []):
+            self._bind(correlation_id, response_id)
+        self._close_if_answered(correlation_id)
+        
+        self._enforce_budget()
+        return node.id
+        
+    def bind_response(self, correlation_id: str, character_id: str, content: str) -> str:
+        """Adds a character's response to a pipelined prompt, in any order.
+        
+        The response is linked to the prompt with the correlation ID by a
+        reply edge. If that prompt was not submitted yet, the edge waits in
+        the pending buffer (see unbound_responses()) and the response is
+        not collapsed until it is bound. So does a response to a prompt
+        that already received all its expected responses.
+        
+        Args:
+            correlation_id: Correlation ID of the prompt being answered
+            character_id: Character identifier
+            content: Response content
+            
+        Returns:
+            ID of the created node
+        """
+        node_id = self._add_response_node(
+            character_id, content, {"correlation_id": correlation_id}
+        )
+        if correlation_id in self._prompts:
+            self._bind(correlation_id, node_id)
+            self._close_if_answered(correlation_id)
+        else:
+            self._unbound.setdefault(correlation_id, []).append(node_id)
+        self._enforce_budget()
         return node_id
         
+    def cancel_response(self, correlation_id: str) -> None:
+        """Records that one response expected by a pipelined prompt will not arrive.
+        
+        The prompt's expected_responses metadata is lowered, so a thread
+        loaded later does not wait for the response either.
+        
+        Args:
+            correlation_id: Correlation ID of the prompt
+        """
+        prompt_id = self._prompts.get(correlation_id)
+        if prompt_id is None:
+            return
+        node = self.nodes[prompt_id]
+        metadata = dict(node.metadata)
+        metadata["expected_responses"] -= 1
+        self._replace_node(dict(node.to_dict(), metadata=metadata))
+        self._record("update", node.to_dict())
+        self._awaited[correlation_id] -= 1
+        self._close_if_answered(correlation_id)
+        
+    def unbound_responses(self) -> Dict[str, List[str]]:
+        """Returns the responses waiting for their prompt.
+        
+        Returns:
+            Response node IDs by correlation ID
+        """
+        return {
+            correlation_id: list(node_ids)
+            for correlation_id, node_ids in self._unbound.items()
+        }
+        
+    def _bind(self, correlation_id: str, response_id: str) -> None:
+        """Links a response to the awaiting prompt with its correlation ID."""
+        edge = MemoryEdge(
+            source_id=self._prompts[correlation_id],
+            target_id=response_id,
+            edge_type="reply",
+        )
+        self._add_edge(edge)
+        self._record("edge", edge.to_dict())
+        self._awaited[correlation_id] -= 1
+        
+    def _close_if_answered(self, correlation_id: str) -> None:
+        """Stops tracking a prompt that awaits no more responses."""
+        if self._awaited[correlation_id] <= 0:
+            del self._prompts[correlation_id]
+            del self._awaited[correlation_id]
+            
+    def _index_correlations(self) -> None:
+        """Rebuilds the pipelined prompts and pending buffer from node metadata.
+        
+        A response counts as bound if any edge leads to it, which includes
+        one from a summary that replaced its prompt. Responses whose prompt
+        arrived in the meantime, for example from another process, are
+        bound now.
+        """
+        prompts: Dict[str, MemoryNode] = {}
+        answered: Dict[str, int] = {}
+        waiting: List[MemoryNode] = []
+        for node in self.nodes.values():
+            correlation_id = node._extra.get("correlation_id") if node._extra else None
+            if correlation_id is None:
+                continue
+            if node.role == "user":
+                prompts[correlation_id] = node
+            elif node.id in self._incoming:
+                answered[correlation_id] = answered.get(correlation_id, 0) + 1
+            else:
+                waiting.append(node)
+                
+        self._prompts = {}
+        self._awaited = {}
+        self._unbound = {}
+        for correlation_id, node in prompts.items():
+            self._prompts[correlation_id] = node.id
+            self._awaited[correlation_id] = (
+                node._extra["expected_responses"] - answered.get(correlation_id, 0)
+            )
+        for node in waiting:
+            correlation_id = node._extra["correlation_id"]
+            if correlation_id in self._prompts:
+                self._bind(correlation_id, node.id)
+            else:
+                self._unbound.setdefault(correlation_id, []).append(node.id)
+        for correlation_id in list(self._prompts):
+            self._close_if_answered(correlation_id)
+        
+    def update_node_content(
+        self,
+        node_id: str,
+        content: str,
+        final: bool = True,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Replaces the content of a node in place, such as a streaming response.
+        
+        Args:
+            node_id: ID of the node
+            content: New content
+            final: The content is complete: the node stops being provisional
+                and the change is recorded for the journal or store. Other
+                updates only change the node in memory.
+            metadata: Optional metadata entries merged into the node's on a
+                final update, e.g. {"incomplete": True}
+        
+        Raises:
+            KeyError: If the node is not in the graph
+        """
+        node = self.nodes[node_id]
+        if not final:
+            self._set_content(node, content)
+            return
+        merged = dict(node.metadata)
+        merged.pop("provisional", None)
+        merged.update(metadata or {})
+        self._replace_node(dict(node.to_dict(), content=content, metadata=merged))
+        self._provisional.discard(node_id)
+        self._record("update", self.nodes[node_id].to_dict())
+        self._enforce_budget()
+        
+    def _set_content(self, node: MemoryNode, content: str) -> None:
+        """Replaces a node's content, its cached token count and its counted size."""
+        self.resident_bytes -= self._node_bytes(node)
+        node.content = content
+        node._tokens = None
+        self.resident_bytes += self._node_bytes(node)
+        
+    def _replace_node(self, data: Dict[str, Any]) -> None:
+        """Applies the content and metadata of an updated node, if it is in the graph."""
+        node = self.nodes.get(data["id"])
+        if node is None:  # Collapsed by another process's budget
+            return
+        self.resident_bytes -= self._node_bytes(node)
+        node.metadata = data["metadata"]
+        self.resident_bytes += self._node_bytes(node)
+        self._set_content(node, data["content"])
+        
     def get_character_responses(self, character_id: str) -> List[Dict[str, Any]]:
         """Gets all responses from a specific character.
         
@@ -228,12 +1041,13 @@ class CrochetThread:
         Returns:
             List of node dictionaries for the character's responses
         """
-        responses = []
-        for node_id, node in self.nodes.items():
-            if (node.metadata.get("role") == "assistant" and 
-                node.metadata.get("character_id") == character_id):
-                responses.append(node.to_dict())
-        return responses
+        if not self._chronology_sorted:
+            self._rebuild_node_indexes()
+            
+        return [
+            self.nodes[self._chronological[position]].to_dict()
+            for position in self._by_character.get(character_id, ())
+        ]
         
     def get_conversation_path(self, start_node_id: str, end_node_id: str) -> List[str]:
         """Finds a path between two nodes in the conversation graph.
@@ -248,73 +1062,719 @@ class CrochetThread:
         if start_node_id not in self.nodes or end_node_id not in self.nodes:
             return []
             
-        visited = {start_node_id}
-        queue = [(start_node_id, [start_node_id])]
+        parents: Dict[str, Optional[str]] = {start_node_id: None}
+        queue = deque([start_node_id])
         
         while queue:
-            current, path = queue.pop(0)
+            current = queue.popleft()
             
             if current == end_node_id:
+                path = []
+                step: Optional[str] = current
+                while step is not None:
+                    path.append(step)
+                    step = parents[step]
+                path.reverse()
                 return path
                 
-            for edge in self.edges:
-                if edge.source_id == current and edge.target_id not in visited:
-                    visited.add(edge.target_id)
-                    queue.append((edge.target_id, path + [edge.target_id]))
+            for target_id in self._neighbors(self._outgoing, current):
+                if target_id not in parents:
+                    parents[target_id] = current
+                    queue.append(target_id)
                     
         return []
         
-    def get_linear_conversation(self) -> List[Dict[str, Any]]:
+    def _traverse(
+        self, node_id: str, adjacency: Dict[str, Union[str, List[str]]]
+    ) -> List[str]:
+        """Breadth-first traversal from a node over one direction of the index.
+        
+        Args:
+            node_id: Node to start from (not included in the result)
+            adjacency: Either the outgoing or the incoming adjacency index
+            
+        Returns:
+            Reachable node IDs in breadth-first order
+        """
+        if node_id not in self.nodes:
+            return []
+            
+        visited = {node_id}
+        order = []
+        queue = deque([node_id])
+        
+        while queue:
+            current = queue.popleft()
+            for neighbor_id in self._neighbors(adjacency, current):
+                if neighbor_id not in visited:
+                    visited.add(neighbor_id)
+                    order.append(neighbor_id)
+                    queue.append(neighbor_id)
+                    
+        return order
+        
+    def get_ancestors(self, node_id: str) -> List[str]:
+        """Gets every node that leads to the given node, nearest first.
+        
+        Args:
+            node_id: Node ID
+            
+        Returns:
+            List of ancestor node IDs in breadth-first order
+        """
+        return self._traverse(node_id, self._incoming)
+        
+    def get_descendants(self, node_id: str) -> List[str]:
+        """Gets every node reachable from the given node, nearest first.
+        
+        Args:
+            node_id: Node ID
+            
+        Returns:
+            List of descendant node IDs in breadth-first order
+        """
+        return self._traverse(node_id, self._outgoing)
+        
+    def build_context(
+        self,
+        target_node_id: str,
+        token_budget: int,
+        character_id: Optional[str] = None,
+        include_target: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Assembles the most relevant messages around a node within a token budget.
+        
+        Candidates are taken in priority order: the target's ancestor chain
+        (nearest first), then sibling branches (other replies to the target's
+        parents), then the most recent earlier messages. Each tier stops at
+        the first message that no longer fits.
+        
+        Args:
+            target_node_id: Node the context is assembled for
+            token_budget: Maximum total tokens of the returned messages
+            character_id: If given, earlier assistant messages are only taken
+                from this character
+            include_target: Whether the target itself is part of the result
+            
+        Returns:
+            Selected messages in chronological order, shaped like the entries
+            of get_linear_conversation(), or an empty list for unknown nodes
+        """
+        target = self.nodes.get(target_node_id)
+        if target is None:
+            return []
+        if not self._chronology_sorted:
+            self._rebuild_node_indexes()
+            
+        selected: Dict[str, MemoryNode] = {}
+        remaining = token_budget
+        if include_target:
+            remaining -= target.token_count(self.token_counter)
+            selected[target.id] = target
+            if remaining < 0:
+                return []
+                
+        siblings = (
+            sibling_id
+            for parent_id in self._neighbors(self._incoming, target_node_id)
+            for sibling_id in reversed(self._neighbors(self._outgoing, parent_id))
+        )
+        if character_id is None:
+            assistant_positions = self._by_role.get("assistant", array("q"))
+        else:
+            assistant_positions = self._by_character.get(character_id, array("q"))
+        earlier = (
+            self._chronological[position]
+            for position in heapq.merge(
+                reversed(self._by_role.get("user", array("q"))),
+                reversed(assistant_positions),
+                reverse=True,
+            )
+        )
+        
+        for tier in (self.get_ancestors(target_node_id), siblings, earlier):
+            for node_id in tier:
+                node = self.nodes.get(node_id)
+                if (
+                    node is None
+                    or node_id in selected
+                    or node_id == target_node_id
+                    or node.timestamp > target.timestamp
+                ):
+                    continue
+                cost = node.token_count(self.token_counter)
+                if cost > remaining:
+                    break
+                selected[node_id] = node
+                remaining -= cost
+                
+        return [
+            {
+                "role": node.role or "unknown",
+                "content": node.content,
+                "character_id": node.character_id,
+                "timestamp": node.timestamp,
+                "id": node.id,
+            }
+            for node in sorted(selected.values(), key=lambda node: node.timestamp)
+        ]
+        
+    def get_linear_conversation(
+        self,
+        limit: Optional[int] = None,
+        since: Optional[float] = None,
+        character_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
         """Converts the graph to a linear conversation for compatibility.
         
+        The conversation is read from the role and character indexes, so a
+        window costs time proportional to its size rather than the thread's.
+        
+        Args:
+            limit: Only return the most recent limit messages
+            since: Only return messages with a timestamp at or after this time
+            character_id: Only include assistant messages from this character
+                (user messages are always included)
+        
         Returns:
             List of messages in chronological order
         """
-        sorted_nodes = sorted(
-            self.nodes.values(), 
-            key=lambda node: node.timestamp
-        )
+        if not self._chronology_sorted:
+            self._rebuild_node_indexes()
+            
+        if character_id is None:
+            assistant_positions = self._by_role.get("assistant", array("q"))
+        else:
+            assistant_positions = self._by_character.get(character_id, array("q"))
+        sources = [
+            self._positions_since(self._by_role.get("user", array("q")), since),
+            self._positions_since(assistant_positions, since),
+        ]
+        
+        if limit is None:
+            positions = list(heapq.merge(*sources))
+        else:
+            positions = list(islice(
+                heapq.merge(*(reversed(source) for source in sources), reverse=True),
+                limit,
+            ))
+            positions.reverse()
         
         return [
             {
-                "role": node.metadata.get("role", "unknown"),
+                "role": node.role or "unknown",
                 "content": node.content,
-                "character_id": node.metadata.get("character_id"),
+                "character_id": node.character_id,
                 "timestamp": node.timestamp,
                 "id": node.id,
             }
-            for node in sorted_nodes
-            if node.metadata.get("role") in ["user", "assistant"]
+            for node in (self.nodes[self._chronological[position]] for position in positions)
+        ]
+        
+    def _enforce_budget(self) -> None:
+        """Shrinks the thread if it is over its budget and reports its size."""
+        if self.memory_budget is not None and self.resident_bytes > self.memory_budget:
+            self.shrink(int(self.memory_budget * LOW_WATER))
+        if self.process_budget is not None:
+            self.process_budget.update(self)
+            
+    def shrink(self, target_bytes: int = 0) -> int:
+        """Collapses the oldest nodes until the thread fits in target_bytes.
+        
+        The hot_nodes newest nodes, the current context, responses still
+        streaming, and pipelined prompts and responses not yet bound are
+        never collapsed, so the thread may stay above target_bytes.
+        
+        Args:
+            target_bytes: Estimated resident bytes to shrink to
+            
+        Returns:
+            Estimated resident bytes afterwards
+        """
+        if self.resident_bytes > target_bytes:
+            self._collapse(target_bytes)
+        return self.resident_bytes
+        
+    def _collapse(self, target_bytes: int) -> None:
+        """Replaces the oldest nodes with one summary node.
+        
+        The nodes and every edge touching them are appended to the spill
+        file as one record. Edges between a collapsed node and a remaining
+        one are kept as edges of the summary node, so traversals still reach
+        the frontier. An older summary among the oldest nodes is collapsed
+        into the new one, so a thread holds few summaries however long it
+        grows.
+        
+        Args:
+            target_bytes: Estimated resident bytes to shrink to
+        """
+        if not self._chronology_sorted:
+            self._rebuild_node_indexes()
+        protected = set(self.current_context_nodes) | self._provisional
+        protected.update(self._prompts.values())
+        for node_ids in self._unbound.values():
+            protected.update(node_ids)
+        collapsed: List[MemoryNode] = []
+        remaining = self.resident_bytes
+        for node_id in islice(self._chronological, max(len(self.nodes) - self.hot_nodes, 0)):
+            if remaining <= target_bytes:
+                break
+            if node_id in protected:
+                continue
+            node = self.nodes[node_id]
+            collapsed.append(node)
+            remaining -= self._node_bytes(node)
+        if not collapsed or (len(collapsed) == 1 and collapsed[0].type == SUMMARY):
+            return
+            
+        summary_id = f"{SUMMARY_ID_PREFIX}{uuid.uuid4()}"
+        collapsed_ids = {node.id for node in collapsed}
+        kept: List[MemoryEdge] = []
+        spilled_edges: List[Dict[str, Any]] = []
+        frontier: Dict[Tuple[str, str, str], MemoryEdge] = {}
+        for edge in self.edges:
+            from_collapsed = edge.source_id in collapsed_ids
+            to_collapsed = edge.target_id in collapsed_ids
+            if not (from_collapsed or to_collapsed):
+                kept.append(edge)
+                continue
+            spilled_edges.append(edge.to_dict())
+            if from_collapsed and to_collapsed:
+                continue
+            source_id = summary_id if from_collapsed else edge.source_id
+            target_id = summary_id if to_collapsed else edge.target_id
+            frontier.setdefault(
+                (source_id, target_id, edge.type),
+                MemoryEdge(source_id, target_id, edge.type, edge.weight),
+            )
+            
+        spill = self._write_spill({
+            "nodes": [node.to_dict() for node in collapsed],
+            "edges": spilled_edges,
+        })
+        summary = MemoryNode(
+            node_id=summary_id,
+            content=self.summarizer(collapsed),
+            node_type=SUMMARY,
+            timestamp=collapsed[-1].timestamp,
+            metadata={
+                "role": SUMMARY,
+                "summarized": sum(
+                    node.metadata["summarized"] if node.type == SUMMARY else 1
+                    for node in collapsed
+                ),
+                "first_timestamp": (
+                    collapsed[0].metadata["first_timestamp"]
+                    if collapsed[0].type == SUMMARY else collapsed[0].timestamp
+                ),
+                "spill": spill,
+            },
+        )
+        
+        for node_id in collapsed_ids:
+            del self.nodes[node_id]
+        self.nodes[summary.id] = summary
+        self.edges = self._new_edge_store()
+        self.edges.extend(kept)
+        self.edges.extend(frontier.values())
+        self._rebuild_index()
+        self._rebuild_node_indexes()
+        self._recount_bytes()
+        
+    def _recount_bytes(self) -> None:
+        """Recomputes the estimated resident bytes from scratch."""
+        self.resident_bytes = (
+            sum(self._node_bytes(node) for node in self.nodes.values())
+            + len(self.edges) * EDGE_OVERHEAD_BYTES
+        )
+        
+    def _write_spill(self, record: Dict[str, Any]) -> List[int]:
+        """Appends a record to the spill file and returns its [offset, length]."""
+        data = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        with open(self.spill_path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        self._spill_started = True
+        return [offset, len(data)]
+        
+    def _read_spill(self, spill: List[int]) -> Dict[str, Any]:
+        """Reads a record written by _write_spill()."""
+        offset, length = spill
+        with open(self.spill_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+            
+    def _spilled_records(self, summary_ids: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Reads the spill records behind summary nodes, nested ones included."""
+        stack = [self.nodes[summary_id].metadata["spill"] for summary_id in summary_ids]
+        while stack:
+            record = self._read_spill(stack.pop())
+            yield record
+            stack.extend(
+                node_data["metadata"]["spill"]
+                for node_data in record["nodes"]
+                if node_data["type"] == SUMMARY
+            )
+            
+    def summary_ids(self) -> List[str]:
+        """Returns the IDs of the resident summary nodes, oldest first."""
+        if not self._chronology_sorted:
+            self._rebuild_node_indexes()
+        return [
+            self._chronological[position]
+            for position in self._by_role.get(SUMMARY, ())
+        ]
+        
+    def summarized_nodes(self, summary_id: str) -> List[Dict[str, Any]]:
+        """Reads back the nodes a summary node stands for, without loading them.
+        
+        Args:
+            summary_id: ID of a resident summary node
+            
+        Returns:
+            Dictionaries of the collapsed message nodes, nested summaries
+            expanded, in chronological order
+        """
+        nodes = [
+            node_data
+            for record in self._spilled_records([summary_id])
+            for node_data in record["nodes"]
+            if node_data["type"] != SUMMARY
+        ]
+        nodes.sort(key=lambda node_data: node_data["timestamp"])
+        return nodes
+        
+    def expand(self, summary_id: str) -> List[str]:
+        """Restores the nodes and edges a summary node stands for.
+        
+        Nested summaries stay collapsed and can be expanded in turn. The
+        restored nodes count against the budget again, and are collapsed
+        by the next change that finds the thread over it.
+        
+        Args:
+            summary_id: ID of a resident summary node
+            
+        Returns:
+            IDs of the restored nodes
+        """
+        record = self._read_spill(self.nodes[summary_id].metadata["spill"])
+        del self.nodes[summary_id]
+        for node_data in record["nodes"]:
+            node = MemoryNode.from_dict(node_data)
+            self.nodes[node.id] = node
+        edges = [
+            edge for edge in self.edges
+            if edge.source_id != summary_id and edge.target_id != summary_id
         ]
+        self.edges = self._new_edge_store()
+        self.edges.extend(edges)
+        self.edges.extend(MemoryEdge.from_dict(edge_data) for edge_data in record["edges"])
+        self._rebuild_index()
+        self._rebuild_node_indexes()
+        self._recount_bytes()
+        return [node_data["id"] for node_data in record["nodes"]]
         
+    @instrumented("crochet.save")
     def save(self) -> None:
-        """Saves the thread to a JSON file."""
-        path = os.path.join(self.storage_dir, f"{self.thread_id}.json")
-        with open(path, "w") as f:
-            json.dump({
-                "thread_id": self.thread_id,
-                "name": self.name,
-                "nodes": {node_id: node.to_dict() for node_id, node in self.nodes.items()},
-                "edges": [edge.to_dict() for edge in self.edges],
-                "characters": list(self.characters),
-                "current_context_nodes": self.current_context_nodes,
-            }, f, indent=4)
+        """Saves the thread.
+        
+        With a store only the changes made since the last save are inserted.
+        Otherwise, without journaling this writes a full snapshot. In journal
+        mode only the changes made since the last save are appended to the
+        journal, and the journal is compacted once it holds compact_every
+        records.
+        
+        If another process saved the thread since this instance loaded or
+        saved it, the thread is rebased onto those changes and saved again.
+        
+        Raises:
+            VersionConflict: If the thread conflicts without a journal or
+                store, whose change records a rebase needs, or if a store
+                still conflicts after SAVE_ATTEMPTS attempts
+        """
+        self._persist(compact=False)
+            
+    @instrumented("crochet.compact")
+    def compact(self) -> None:
+        """Writes a full snapshot and truncates the journal.
+        
+        The snapshot is written to a temporary file and atomically renamed
+        into place. It records the last journal sequence number it covers,
+        so a crash before the journal is truncated cannot replay a change
+        twice. With a store there is nothing to compact and this only saves.
+        
+        Collapsed nodes are written as the original nodes and edges, read
+        back from the spill file one record at a time.
+        
+        Raises:
+            VersionConflict: As for save()
+        """
+        self._persist(compact=True)
+        
+    def _persist(self, compact: bool) -> None:
+        """Saves or compacts the thread, rebasing it after a conflict.
+        
+        Files are rebased while the lock is held, so the save that follows
+        cannot conflict again; a store is retried.
+        """
+        if self.storage is None:
+            with file_lock(self.snapshot_path):
+                if self._file_stamps() != self._stamps:
+                    if not self.journal:
+                        raise VersionConflict(self.snapshot_path, self._journal_seq)
+                    pending = self._pending_records
+                    self._load()
+                    self._reapply(pending)
+                if compact or not self.journal:
+                    self._compact()
+                else:
+                    self._append_journal()
+                self._stamps = self._file_stamps()
+            return
+            
+        for attempt in range(SAVE_ATTEMPTS):
+            if not self._pending_records:
+                return
+            try:
+                self.storage.save_graph(self.thread_id, self.name, self._pending_records)
+            except VersionConflict:
+                if attempt == SAVE_ATTEMPTS - 1:
+                    raise
+                wait_after_conflict(attempt)
+                self.rebase()
+                continue
+            self._pending_records = []
+            return
+                
+    def _file_stamps(self) -> Tuple[Stamp, Stamp]:
+        return file_stamp(self.snapshot_path), file_stamp(self.journal_path)
             
+    def _append_journal(self) -> None:
+        """Appends the pending records to the journal, compacting it when due."""
+        if self._pending_records:
+            with open(self.journal_path, "a") as f:
+                for record in self._pending_records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_size += len(self._pending_records)
+            self._pending_records = []
+            
+        if self._journal_size >= self.compact_every:
+            self._compact()
+            
+    def _compact(self) -> None:
+        """Writes the snapshot and truncates the journal, under the file lock."""
+        summary_ids = self.summary_ids()
+        with atomic_write(self.snapshot_path, fsync=True) as f:
+            if summary_ids:
+                self._write_snapshot(f, summary_ids)
+            else:
+                json.dump({
+                    "thread_id": self.thread_id,
+                    "name": self.name,
+                    "nodes": {node_id: node.to_dict() for node_id, node in self.nodes.items()},
+                    "edges": [edge.to_dict() for edge in self.edges],
+                    "characters": list(self.characters),
+                    "current_context_nodes": self.current_context_nodes,
+                    "journal_seq": self._journal_seq,
+                    "synced_messages": self.synced_messages,
+                }, f, indent=4)
+        
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "w"):
+                pass
+        self._pending_records = []
+        self._journal_size = 0
+        
+    def rebase(self) -> None:
+        """Reloads the thread and applies the unsaved changes on top.
+        
+        Nodes and edges added since the last save are added again after
+        the loaded ones, with new sequence numbers; the context and synced
+        message count of this instance replace the loaded ones.
+        """
+        pending = self._pending_records
+        self.load()
+        self._reapply(pending)
+        
+    def _reapply(self, pending: List[Dict[str, Any]]) -> None:
+        """Applies change records again after the graph was reloaded."""
+        for record in pending:
+            op, data = record["op"], record["data"]
+            if op == "node":
+                if data["id"] not in self.nodes:
+                    self._add_node(MemoryNode.from_dict(data))
+                    self._record("node", data)
+            elif op == "update":
+                if data["id"] in self.nodes:
+                    self._replace_node(data)
+                    self._record("update", data)
+            elif op == "edge":
+                self._add_edge(MemoryEdge.from_dict(data))
+                self._record("edge", data)
+            elif op == "context":
+                self._set_context(data)
+            elif op == "synced":
+                self.mark_synced(data)
+        self._index_correlations()
+        self._enforce_budget()
+            
+    def _write_snapshot(self, f: Any, summary_ids: List[str]) -> None:
+        """Streams a snapshot of a thread with collapsed nodes to a file.
+        
+        Summary nodes and their edges are left out; the nodes and edges
+        they replaced are written instead.
+        """
+        def write_items(items: Iterable[str]) -> None:
+            for position, item in enumerate(items):
+                if position:
+                    f.write(", ")
+                f.write(item)
+                
+        f.write(f'{{"thread_id": {json.dumps(self.thread_id)}, "name": {json.dumps(self.name)}, "nodes": {{')
+        write_items(
+            f"{json.dumps(node_data['id'])}: {json.dumps(node_data)}"
+            for node_data in self._stored_items("nodes", summary_ids)
+            if node_data["type"] != SUMMARY
+        )
+        f.write('}, "edges": [')
+        write_items(
+            json.dumps(edge_data)
+            for edge_data in self._stored_items("edges", summary_ids)
+            if not edge_data["source_id"].startswith(SUMMARY_ID_PREFIX)
+            and not edge_data["target_id"].startswith(SUMMARY_ID_PREFIX)
+        )
+        f.write("], ")
+        f.write(json.dumps({
+            "characters": list(self.characters),
+            "current_context_nodes": self.current_context_nodes,
+            "journal_seq": self._journal_seq,
+            "synced_messages": self.synced_messages,
+        })[1:])
+        
+    def _stored_items(self, kind: str, summary_ids: List[str]) -> Iterator[Dict[str, Any]]:
+        """Yields the resident and spilled node or edge dictionaries."""
+        if kind == "nodes":
+            yield from (node.to_dict() for node in self.nodes.values())
+        else:
+            yield from (edge.to_dict() for edge in self.edges)
+        for record in self._spilled_records(summary_ids):
+            yield from record[kind]
+            
+    @instrumented("crochet.load")
     def load(self) -> 'CrochetThread':
-        """Loads the thread from a JSON file."""
-        path = os.path.join(self.storage_dir, f"{self.thread_id}.json")
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                data = json.load(f)
-                self.name = data["name"]
-                self.nodes = {
-                    node_id: MemoryNode.from_dict(node_data)
-                    for node_id, node_data in data["nodes"].items()
-                }
-                self.edges = [
-                    MemoryEdge.from_dict(edge_data)
-                    for edge_data in data["edges"]
-                ]
-                self.characters = set(data["characters"])
-                self.current_context_nodes = data["current_context_nodes"]
+        """Loads the thread from its store, or from its snapshot and journal.
+        
+        A snapshot written by an older version under {thread_id}.json is
+        read if there is no {thread_id}.crochet.json yet. If the graph has
+        nodes but no recorded synced_messages, that is left as None.
+        Loading again replaces the graph in memory and discards the changes
+        not saved yet.
+        """
+        if self.storage is None:
+            with file_lock(self.snapshot_path, shared=True):
+                return self._load()
+        return self._load()
+        
+    def _load(self) -> 'CrochetThread':
+        """Loads the thread; without a store the caller holds the file lock."""
+        self._restore({"name": self.name, "edges": [], "current_context_nodes": []}, [])
+        self._pending_records = []
+        self.synced_messages = None
+        if self._spill_started:  # Loaded nodes no longer refer to it
+            _remove_file(self.spill_path)
+            self._spill_started = False
+        if self.storage is not None:
+            data = self.storage.load_graph(self.thread_id)
+            if data is not None:
+                self._restore(data, data["nodes"])
+            self._journal_seq = data["journal_seq"] if data is not None else 0
+        else:
+            self._load_files()
+            self._stamps = self._file_stamps()
+        if self.synced_messages is None and not self.nodes:
+            self.synced_messages = 0
+        self._index_correlations()
+        self._enforce_budget()
         return self
+        
+    def _load_files(self) -> None:
+        """Loads the snapshot and replays the journal, under the file lock."""
+        snapshot_seq = 0
+        data = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                data = json.load(f)
+        else:
+            legacy_path = os.path.join(self.storage_dir, f"{self.thread_id}.json")
+            if os.path.exists(legacy_path):
+                with open(legacy_path, "r") as f:
+                    data = json.load(f)
+                if "nodes" not in data:
+                    data = None  # The Thread's own file
+        if data is not None:
+            self._restore(data, data["nodes"].values())
+            snapshot_seq = data.get("journal_seq", 0)
+                
+        self._journal_seq = snapshot_seq
+        self._journal_size = 0
+        self._replay_journal(snapshot_seq)
+        
+    def _restore(self, data: Dict[str, Any], nodes: Iterable[Dict[str, Any]]) -> None:
+        """Replaces the graph with loaded node and edge dictionaries."""
+        self.name = data["name"]
+        self.nodes = {}
+        for node_data in nodes:
+            node = MemoryNode.from_dict(node_data)
+            self.nodes[node.id] = node
+        self.edges = self._new_edge_store()
+        self.edges.extend(MemoryEdge.from_dict(edge_data) for edge_data in data["edges"])
+        self.characters = {
+            node.character_id for node in self.nodes.values() if node.character_id
+        }
+        self.current_context_nodes = data["current_context_nodes"]
+        self.synced_messages = data.get("synced_messages")
+        self._rebuild_index()
+        self._rebuild_node_indexes()
+        self._recount_bytes()
+        
+    def _replay_journal(self, snapshot_seq: int) -> None:
+        """Applies journal records newer than the snapshot.
+        
+        A torn final record left by a crash mid-append is discarded and the
+        journal is truncated back to the last complete record.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+            
+        valid_bytes = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                self._journal_size += 1
+                if record["seq"] <= snapshot_seq:
+                    continue
+                    
+                op, data = record["op"], record["data"]
+                if op == "node":
+                    self._add_node(MemoryNode.from_dict(data))
+                elif op == "update":
+                    self._replace_node(data)
+                elif op == "edge":
+                    self._add_edge(MemoryEdge.from_dict(data))
+                elif op == "context":
+                    self.current_context_nodes = data
+                elif op == "synced":
+                    self.synced_messages = data
+                self._journal_seq = record["seq"]
+                
+        if valid_bytes < os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_bytes)
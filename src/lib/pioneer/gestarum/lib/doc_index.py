@@ -0,0 +1,404 @@
+"""
+Local BM25 index over the Obsidian vault, usable as a file_search stand-in.
+
+Notes are split into passages of a few paragraphs, and the passages are
+indexed with BM25. The index directory holds:
+
+- notes.json: content hash, passages and term counts of every note, so a
+  rebuild only re-reads notes whose content changed
+- CURRENT: name of the generation directory readers open
+- gen-*/: one directory per build, holding
+  - lexicon.json: term -> (offset, document frequency) and passage sources
+  - postings.bin: (passage, term frequency) pairs as native uint32 values
+  - lengths.bin: passage lengths in terms as native uint32 values
+  - passages.bin / passage_offsets.bin: UTF-8 passage texts and their offsets
+
+A build writes a new generation directory and then replaces CURRENT, so a
+reader opening the index during a rebuild gets every file from one build.
+The binary files are memory-mapped when the index is opened, so a query
+only touches the postings of its own terms.
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import time
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from src.lib.pioneer.gestarum.lib.atomic_file import atomic_write
+
+INDEX_VERSION = 1
+CURRENT_FILE = "CURRENT"
+OPEN_ATTEMPTS = 3  # Opens retried when a rebuild removed the generation being opened
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_WIKILINK = re.compile(r"\[\[([^\]|]+)(?:\|([^\]]+))?\]\]")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he in is it its of on or "
+    "that the this to was were which will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase index terms, without stopwords.
+    
+    Args:
+        text: Text to tokenize
+    
+    Returns:
+        Terms in order of appearance
+    """
+    return [word for word in _WORD.findall(text.casefold()) if word not in _STOPWORDS]
+
+def clean_markdown(text: str) -> str:
+    """Removes Obsidian link and tag syntax, keeping the words."""
+    text = _WIKILINK.sub(lambda m: m.group(2) or m.group(1), text)
+    return re.sub(r"(?<!\w)#(\w)", r"\1", text)
+
+def split_passages(text: str, max_words: int = 120) -> List[Tuple[str, str]]:
+    """Splits a note into passages of whole paragraphs.
+    
+    Paragraphs are merged until a passage reaches max_words; a heading
+    starts a new passage and is remembered as its section.
+    
+    Args:
+        text: Markdown text of the note
+        max_words: Target maximum passage length in words
+    
+    Returns:
+        (section heading, passage text) pairs
+    """
+    passages: List[Tuple[str, str]] = []
+    heading, words = "", 0
+    chunk: List[str] = []
+
+    def flush() -> None:
+        nonlocal chunk, words
+        if chunk:
+            passages.append((heading, "\n\n".join(chunk)))
+        chunk, words = [], 0
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        first_line, _, rest = paragraph.partition("\n")
+        if re.match(r"#{1,6}\s", first_line):
+            flush()
+            heading = first_line.lstrip("#").strip()
+            paragraph = rest.strip()
+            if not paragraph:
+                continue
+        length = len(paragraph.split())
+        if words and words + length > max_words:
+            flush()
+        chunk.append(paragraph)
+        words += length
+    flush()
+    return passages
+
+def _write_atomic(path: str, data: bytes) -> None:
+    with atomic_write(path, "wb") as f:
+        f.write(data)
+
+def _current_generation(index_dir: str) -> Optional[str]:
+    """Returns the name of the generation directory readers open, if any."""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    if os.path.getsize(path) == 0:
+        return None  # Empty files cannot be mapped
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def find_notes(docs_dir: str) -> List[str]:
+    """Lists the markdown notes of a vault, skipping Obsidian's own folder."""
+    notes = []
+    for root, dirs, files in os.walk(docs_dir):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for name in files:
+            if name.endswith(".md"):
+                notes.append(os.path.join(root, name))
+    return sorted(notes)
+
+
+class DocIndex:
+    """Read-only view of an index directory built by build()."""
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        """Open an index.
+        
+        Args:
+            index_dir: Directory written by DocIndex.build()
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        
+        Raises:
+            FileNotFoundError: If no index was built in index_dir
+        """
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        for attempt in range(OPEN_ATTEMPTS):
+            generation = _current_generation(index_dir)
+            if generation is None:
+                raise FileNotFoundError(f"No index in {index_dir}")
+            try:
+                lexicon, self._maps = self._open(os.path.join(index_dir, generation))
+                break
+            except FileNotFoundError:
+                # A rebuild removed the generation between reading CURRENT
+                # and opening its files; the new CURRENT names a later one
+                if attempt == OPEN_ATTEMPTS - 1:
+                    raise
+        self.generation = generation
+        self.terms: Dict[str, List[int]] = lexicon["terms"]
+        self.sources: List[List[str]] = lexicon["sources"]
+        self.num_passages: int = lexicon["num_passages"]
+        self.avg_length: float = lexicon["avg_length"] or 1.0
+
+        self._postings = self._view("postings", "I")
+        self._lengths = self._view("lengths", "I")
+        self._offsets = self._view("passage_offsets", "Q")
+
+    @staticmethod
+    def _open(generation_dir: str) -> Tuple[Dict[str, Any], Dict[str, Optional[mmap.mmap]]]:
+        """Reads the lexicon and maps the binary files of one generation."""
+        with open(os.path.join(generation_dir, "lexicon.json"), "r") as f:
+            lexicon = json.load(f)
+        maps: Dict[str, Optional[mmap.mmap]] = {}
+        try:
+            for name in ("postings", "lengths", "passages", "passage_offsets"):
+                maps[name] = _map(os.path.join(generation_dir, f"{name}.bin"))
+        except BaseException:
+            for mapped in maps.values():
+                if mapped is not None:
+                    mapped.close()
+            raise
+        return lexicon, maps
+
+    def _view(self, name: str, typecode: Literal["I", "Q"]) -> Any:
+        mapped = self._maps[name]
+        return memoryview(mapped).cast(typecode) if mapped is not None else ()
+
+    @classmethod
+    def build(
+        cls,
+        docs_dir: str,
+        index_dir: str,
+        max_words: int = 120,
+    ) -> "DocIndex":
+        """Builds or incrementally updates the index of a vault.
+        
+        Only notes whose content hash changed are read and split again; a
+        new generation is written only if any note changed.
+        
+        Args:
+            docs_dir: Vault directory
+            index_dir: Directory to write the index to
+            max_words: Target maximum passage length in words
+        
+        Returns:
+            The opened index
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        notes_path = os.path.join(index_dir, "notes.json")
+        cached: Dict[str, Any] = {}
+        if os.path.exists(notes_path):
+            with open(notes_path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("max_words") == max_words:
+                cached = data["notes"]
+
+        notes: Dict[str, Any] = {}
+        changed = 0
+        for path in find_notes(docs_dir):
+            rel_path = os.path.relpath(path, docs_dir)
+            with open(path, "rb") as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            entry = cached.get(rel_path)
+            if entry is None or entry["sha256"] != content_hash:
+                changed += 1
+                title = os.path.splitext(os.path.basename(rel_path))[0]
+                text = clean_markdown(raw.decode("utf-8", errors="replace"))
+                entry = {"sha256": content_hash, "passages": []}
+                for heading, passage in split_passages(text, max_words) or [("", "")]:
+                    terms = tokenize(f"{title} {heading} {passage}")
+                    entry["passages"].append({
+                        "heading": heading,
+                        "text": passage,
+                        "length": len(terms),
+                        "tf": dict(Counter(terms)),
+                    })
+            notes[rel_path] = entry
+
+        removed = len(set(cached) - set(notes))
+        if changed or removed or _current_generation(index_dir) is None:
+            print(f"Indexing {len(notes)} notes ({changed} changed, {removed} removed)")
+            cls._write(index_dir, notes)
+            _write_atomic(notes_path, json.dumps({
+                "version": INDEX_VERSION,
+                "max_words": max_words,
+                "notes": notes,
+            }).encode("utf-8"))
+        return cls(index_dir)
+
+    @staticmethod
+    def _write(index_dir: str, notes: Dict[str, Any]) -> None:
+        """Writes a new generation from the per-note cache and makes it current.
+        
+        Generations older than the one replaced are removed. The replaced
+        one is kept for readers that read CURRENT just before the swap;
+        readers that already opened a generation keep their memory maps
+        even after its files are removed.
+        """
+        postings_by_term: Dict[str, List[int]] = {}
+        lengths = array("I")
+        offsets = array("Q", [0])
+        texts = bytearray()
+        sources: List[List[str]] = []
+
+        for rel_path in sorted(notes):
+            for passage in notes[rel_path]["passages"]:
+                passage_id = len(lengths)
+                for term, tf in passage["tf"].items():
+                    postings_by_term.setdefault(term, []).extend((passage_id, tf))
+                lengths.append(passage["length"])
+                texts += passage["text"].encode("utf-8")
+                offsets.append(len(texts))
+                sources.append([rel_path, passage["heading"]])
+
+        postings = array("I")
+        terms: Dict[str, List[int]] = {}
+        for term in sorted(postings_by_term):
+            pairs = postings_by_term[term]
+            terms[term] = [len(postings), len(pairs) // 2]
+            postings.extend(pairs)
+
+        # Named by time so generations sort in build order
+        generation = f"gen-{time.time_ns():020d}-{os.getpid()}"
+        generation_dir = os.path.join(index_dir, generation)
+        os.makedirs(generation_dir)
+        for name, data in (
+            ("postings.bin", postings.tobytes()),
+            ("lengths.bin", lengths.tobytes()),
+            ("passages.bin", bytes(texts)),
+            ("passage_offsets.bin", offsets.tobytes()),
+            ("lexicon.json", json.dumps({
+                "version": INDEX_VERSION,
+                "num_passages": len(lengths),
+                "avg_length": sum(lengths) / len(lengths) if lengths else 0.0,
+                "terms": terms,
+                "sources": sources,
+            }).encode("utf-8")),
+        ):
+            with open(os.path.join(generation_dir, name), "wb") as f:
+                f.write(data)
+
+        previous = _current_generation(index_dir)
+        _write_atomic(os.path.join(index_dir, CURRENT_FILE), generation.encode("utf-8"))
+        if previous is not None:
+            for name in os.listdir(index_dir):
+                if name.startswith("gen-") and name < previous:
+                    shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+
+    def passage_text(self, passage_id: int) -> str:
+        """Returns the text of a passage."""
+        start, end = self._offsets[passage_id], self._offsets[passage_id + 1]
+        texts = self._maps["passages"]
+        return texts[start:end].decode("utf-8") if texts is not None else ""
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Finds the passages that best match a query.
+        
+        Args:
+            query: Free-text query
+            k: Maximum number of passages to return
+        
+        Returns:
+            Passages with "path", "heading", "text" and "score", best first
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            idf = math.log(1 + (self.num_passages - df + 0.5) / (df + 0.5))
+            for i in range(offset, offset + 2 * df, 2):
+                passage_id, tf = self._postings[i], self._postings[i + 1]
+                norm = self.k1 * (
+                    1 - self.b + self.b * self._lengths[passage_id] / self.avg_length
+                )
+                scores[passage_id] = scores.get(passage_id, 0.0) + (
+                    idf * tf * (self.k1 + 1) / (tf + norm)
+                )
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [
+            {
+                "path": self.sources[passage_id][0],
+                "heading": self.sources[passage_id][1],
+                "text": self.passage_text(passage_id),
+                "score": score,
+            }
+            for passage_id, score in best
+        ]
+
+    def close(self) -> None:
+        """Releases the memory maps."""
+        for view in (self._postings, self._lengths, self._offsets):
+            if isinstance(view, memoryview):
+                view.release()
+        for mapped in self._maps.values():
+            if mapped is not None:
+                mapped.close()
+
+
+def format_passages(passages: List[Dict[str, Any]]) -> str:
+    """Formats retrieved passages as instructions for a run.
+    
+    Args:
+        passages: Results of DocIndex.search()
+    
+    Returns:
+        Text quoting each passage with its note, or "" if there are none
+    """
+    if not passages:
+        return ""
+    parts = ["Relevant passages from The Book of Shannon notes:"]
+    for number, passage in enumerate(passages, 1):
+        source = os.path.splitext(passage["path"])[0]
+        if passage["heading"]:
+            source = f"{source} > {passage['heading']}"
+        parts.append(f"[{number}] {source}\n{passage['text']}")
+    return "\n\n".join(parts)
+
+def with_passages(
+    index: "DocIndex", query: str, k: int, instructions: Optional[str] = None
+) -> Optional[str]:
+    """Appends the top passages for a query to per-run instructions.
+    
+    Args:
+        index: Index to search
+        query: User message to retrieve passages for
+        k: Maximum number of passages
+        instructions: Existing per-run instructions, if any
+        
+    Returns:
+        The instructions followed by the formatted passages
+    """
+    passages = format_passages(index.search(query, k))
+    if not passages:
+        return instructions
+    return f"{instructions}\n\n{passages}" if instructions else passages
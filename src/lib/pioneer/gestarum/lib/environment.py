@@ -0,0 +1,69 @@
+"""
+Deferred loading of the environment and of the OpenAI SDK.
+
+Importing openai and python-dotenv makes up most of the start-up time of a
+short CLI or worker invocation, so neither is imported until a client is
+actually built or a .env file actually needs loading.
+"""
+
+import os
+from typing import Any, Optional
+
+_env_loaded = False
+
+def find_env_file(start: Optional[str] = None) -> Optional[str]:
+    """Finds the nearest .env file in a directory or its parents.
+    
+    Args:
+        start: Directory to start from (defaults to the working directory)
+    
+    Returns:
+        Path of the file, or None if there is none
+    """
+    directory = os.path.abspath(start or os.getcwd())
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+def load_env() -> None:
+    """Loads the nearest .env file into the environment, once per process.
+    
+    python-dotenv is only imported when there is a file to load. Variables
+    that are already set keep their values.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    path = find_env_file()
+    if path is not None:
+        from dotenv import load_dotenv
+        load_dotenv(path)
+
+def default_client(use_async: bool = False) -> Any:
+    """Builds an OpenAI client from the OPENAI_API_KEY environment variable.
+    
+    Args:
+        use_async: Build an AsyncOpenAI client instead of an OpenAI one
+    
+    Returns:
+        The new client
+    
+    Raises:
+        ValueError: If OPENAI_API_KEY is not set
+    """
+    load_env()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    # call_with_retry() owns retries, and knows which calls are safe to repeat
+    if use_async:
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key, max_retries=0)
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, max_retries=0)
@@ -1,86 +1,353 @@
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+import time
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
-from openai import OpenAI
+from src.lib.pioneer.gestarum.lib.atomic_file import check_version, file_lock, write_json
+from src.lib.pioneer.gestarum.lib.instrumentation import instrumented, span
+from src.lib.pioneer.gestarum.lib.rate_limit import RetryPolicy, call_with_retry
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+MAX_FILES = 20  # OpenAI's limit on files attached through this manager
+
+def content_sha256(file_path: str) -> str:
+    """Computes the SHA-256 hex digest of a file's content.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 class FileManagement:
-    """Handles file uploads and ensures compliance with OpenAI's 20-file limit."""
+    """Handles file uploads and ensures compliance with OpenAI's 20-file limit.
+    
+    Every uploaded file is recorded with the hash of its content, so asking
+    for the same content again reuses the existing upload. Each time a file
+    is referenced (uploaded, reused or touched by an assistant) its last use
+    is updated, and when the limit is reached the least recently referenced
+    files are deleted first. The records live in the file directory, which
+    assistants share by default, so recency is tracked across assistants.
+    Each change re-reads the records under a file lock and writes them
+    back before releasing it, so managers in other processes sharing the
+    directory do not lose each other's changes. Uploads run without the
+    lock and are merged into the records afterwards.
+    """
 
-    def __init__(self, client: OpenAI, storage_dir: str = "files"):
+    def __init__(
+        self,
+        client: "OpenAI",
+        storage_dir: str = "files",
+        max_files: int = MAX_FILES,
+        max_workers: int = 8,
+    ):
         """Initialize file management.
         
         Args:
             client: OpenAI client instance
             storage_dir: Directory to store file metadata
+            max_files: Maximum number of uploaded files kept at once
+            max_workers: Maximum number of concurrent uploads
         """
         self.client = client
         self.storage_dir = storage_dir
+        self.max_files = max_files
+        self.max_workers = max_workers
         os.makedirs(self.storage_dir, exist_ok=True)
-        self.uploaded_files = self.load_files()
+        self.metadata_path = os.path.join(self.storage_dir, "uploaded_files.json")
+        self.version = 0  # Of the records last read or written
+        self.files: Dict[str, Dict[str, Any]] = self.load_files()  # By file ID
+
+    @property
+    def uploaded_files(self) -> List[str]:
+        """Uploaded file IDs, least recently referenced first."""
+        return sorted(self.files, key=lambda file_id: self.files[file_id]["last_used"])
 
-    def upload_files(self, file_paths: List[str]) -> List[str]:
+    @instrumented("files.upload_files")
+    def upload_files(
+        self, file_paths: List[str], owner: Optional[str] = None
+    ) -> List[str]:
         """Uploads files while managing OpenAI's file constraints.
         
+        Files whose content was uploaded before are reused instead of being
+        uploaded again, and entries that are already known file IDs are
+        treated as references to those files. New content is uploaded
+        concurrently, and the least recently referenced files are evicted
+        once the uploads are recorded.
+        
         Args:
             file_paths: List of paths to files to upload
-            
+            owner: Name of the assistant referencing the files
+        
         Returns:
-            List of uploaded file IDs
+            List of file IDs for the given files, uploaded or reused
+        
+        Raises:
+            Exception: The API error of an upload that failed after retries;
+                files uploaded before it are still recorded
         """
-        while len(self.uploaded_files) + len(file_paths) > 20:
-            self.delete_oldest_files(keep_latest=20 - len(file_paths))
+        with file_lock(self.metadata_path, shared=True):
+            self.files = self.load_files()
+        by_hash = {record["sha256"]: file_id for file_id, record in self.files.items()}
 
-        new_files = []
+        # Hash and upload without the lock, so other managers are not held up
+        wanted: List[Tuple[str, str]] = []  # (path, file ID or content hash)
+        to_upload: Dict[str, str] = {}  # Content hash -> path
         for file_path in file_paths:
+            if file_path in self.files:
+                wanted.append((file_path, file_path))
+                continue
             if not os.path.exists(file_path):
                 print(f"Warning: File {file_path} does not exist, skipping")
                 continue
-                
+            content_hash = content_sha256(file_path)
+            existing = by_hash.get(content_hash)
+            if existing is None:
+                to_upload.setdefault(content_hash, file_path)
+            else:
+                print(f"Reusing file {existing} for {file_path}")
+            wanted.append((file_path, content_hash))
+
+        uploaded: Dict[str, str] = {}  # Content hash -> file ID
+        try:
+            self._upload_concurrently(to_upload, uploaded)
+        finally:
+            duplicates = self._merge_uploads(to_upload, uploaded, wanted, owner)
+            self._delete_duplicates(duplicates)
+
+        by_hash = {record["sha256"]: file_id for file_id, record in self.files.items()}
+        file_ids: List[str] = []
+        for file_path, key in wanted:
+            file_id = by_hash.get(key, key)
+            if file_id not in self.files:
+                print(f"Warning: File {file_path} was deleted meanwhile, skipping")
+            elif file_id not in file_ids:
+                file_ids.append(file_id)
+        return file_ids
+
+    def _merge_uploads(
+        self,
+        to_upload: Dict[str, str],
+        uploaded: Dict[str, str],
+        wanted: List[Tuple[str, str]],
+        owner: Optional[str],
+    ) -> List[str]:
+        """Records new uploads and references, then evicts beyond the limit.
+        
+        The records are re-read under the file lock, so changes made by other
+        managers while the files were uploading are kept.
+        
+        Args:
+            to_upload: Paths that were uploaded keyed by content hash
+            uploaded: New file IDs keyed by content hash
+            wanted: The referenced paths with their file ID or content hash
+            owner: Name of the assistant referencing the files
+        
+        Returns:
+            IDs of new uploads whose content another manager recorded first
+        """
+        duplicates: List[str] = []
+        with file_lock(self.metadata_path):
+            self.files = self.load_files()
+            by_hash = {record["sha256"]: file_id for file_id, record in self.files.items()}
+            now = time.time()
+            for content_hash, file_id in uploaded.items():
+                if content_hash in by_hash:
+                    duplicates.append(file_id)
+                    continue
+                self.files[file_id] = {
+                    "sha256": content_hash,
+                    "path": to_upload[content_hash],
+                    "uploaded_at": now,
+                    "last_used": now,
+                    "owners": [],
+                }
+                by_hash[content_hash] = file_id
+            referenced = {
+                by_hash.get(key, key) for _, key in wanted
+            }.intersection(self.files)
+            self._reference(referenced, owner, now)
+            self._evict(len(self.files) - self.max_files, referenced)
+        return duplicates
+
+    def _delete_duplicates(self, file_ids: List[str]) -> None:
+        """Deletes unrecorded uploads, reporting rather than raising errors."""
+        for file_id in file_ids:
             try:
-                file = self.client.files.create(
-                    file=open(file_path, "rb"), purpose="assistants"
-                )
-                new_files.append(file.id)
-                print(f"Uploaded file {file_path} with ID {file.id}")
+                with span("files.delete"):
+                    call_with_retry(self.client.files.delete, file_id, idempotent=True)
             except Exception as e:
-                print(f"Error uploading file {file_path}: {e}")
-
-        self.uploaded_files.extend(new_files)
-        self.save_files()
-        return new_files
+                print(f"Error deleting duplicate file with ID {file_id}: {e}")
+            else:
+                print(f"Deleted duplicate file with ID {file_id}")
 
-    def delete_oldest_files(self, keep_latest: int = 20) -> None:
-        """Deletes the oldest files to ensure compliance with OpenAI's file limit.
+    def _upload_concurrently(
+        self, to_upload: Dict[str, str], uploaded: Dict[str, str]
+    ) -> None:
+        """Uploads files in parallel, filling uploaded as each one finishes.
         
         Args:
-            keep_latest: Number of newest files to keep
+            to_upload: Paths to upload keyed by content hash
+            uploaded: Receives the new file IDs keyed by content hash
+        
+        Raises:
+            Exception: The first upload error, after every upload finished
         """
-        while len(self.uploaded_files) > keep_latest:
-            oldest_file = self.uploaded_files.pop(0)
+        def upload(item: Tuple[str, str]) -> Optional[BaseException]:
+            content_hash, file_path = item
+            with open(file_path, "rb") as f:
+                # Pass the content so a retry resends it from the start
+                content = (os.path.basename(file_path), f.read())
             try:
-                self.client.files.delete(oldest_file)
-                print(f"Deleted file with ID {oldest_file}")
+                with span("files.upload"):
+                    file = call_with_retry(
+                        self.client.files.create, file=content, purpose="assistants"
+                    )
             except Exception as e:
-                print(f"Error deleting file with ID {oldest_file}: {e}")
+                print(f"Error uploading file {file_path}: {e}")
+                return e
+            uploaded[content_hash] = file.id
+            print(f"Uploaded file {file_path} with ID {file.id}")
+            return None
 
-        self.save_files()
+        if not to_upload:
+            return
+        from concurrent.futures import ThreadPoolExecutor  # Deferred: only uploads need it
+        workers = min(self.max_workers, len(to_upload))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            errors = [e for e in pool.map(upload, to_upload.items()) if e is not None]
+        if errors:
+            raise errors[0]
+
+    def touch(self, files: List[str], owner: Optional[str] = None) -> None:
+        """Marks files as just referenced, protecting them from eviction.
+        
+        Args:
+            files: IDs or uploaded paths of the referenced files; unknown
+                entries are ignored
+            owner: Name of the assistant referencing the files
+        """
+        with file_lock(self.metadata_path):
+            self.files = self.load_files()
+            by_path = {record["path"]: file_id for file_id, record in self.files.items()}
+            known = {
+                entry if entry in self.files else by_path[entry]
+                for entry in files
+                if entry in self.files or entry in by_path
+            }
+            if known:
+                self._reference(known, owner, time.time())
+                self._write_files()
+
+    def _reference(self, file_ids: Any, owner: Optional[str], now: float) -> None:
+        """Updates the last use and owners of referenced files."""
+        for file_id in file_ids:
+            record = self.files[file_id]
+            record["last_used"] = now
+            if owner and owner not in record["owners"]:
+                record["owners"].append(owner)
+
+    def _evict(self, count: int, protected: Any = ()) -> None:
+        """Deletes the least recently referenced files.
+        
+        Args:
+            count: Number of files to delete
+            protected: IDs of files that must not be deleted
+        
+        A file the API no longer knows (a 404, such as openai.NotFoundError)
+        was already deleted, and only its record is dropped.
+        
+        Raises:
+            Exception: The API error of a deletion that failed after retries;
+                the file stays recorded
+        """
+        candidates = [
+            file_id for file_id in self.uploaded_files if file_id not in protected
+        ]
+        try:
+            for file_id in candidates[:max(count, 0)]:
+                try:
+                    with span("files.delete"):
+                        call_with_retry(self.client.files.delete, file_id, idempotent=True)
+                except Exception as e:
+                    if RetryPolicy.status_code(e) != 404:
+                        raise
+                    print(f"File with ID {file_id} was already deleted")
+                else:
+                    print(f"Deleted least recently used file with ID {file_id}")
+                del self.files[file_id]
+        finally:
+            self._write_files()
+
+    def delete_oldest_files(self, keep_latest: int = MAX_FILES) -> None:
+        """Deletes the least recently referenced files beyond a limit.
+        
+        Args:
+            keep_latest: Number of most recently referenced files to keep
+        
+        Raises:
+            Exception: The API error of a deletion that failed after retries;
+                the file stays in the list of uploaded files
+        """
+        with file_lock(self.metadata_path):
+            self.files = self.load_files()
+            self._evict(len(self.files) - keep_latest)
 
     def list_uploaded_files(self) -> List[str]:
         """Returns a list of uploaded file IDs."""
         return self.uploaded_files
 
     def save_files(self) -> None:
-        """Saves the list of uploaded files to a JSON file."""
-        path = os.path.join(self.storage_dir, "uploaded_files.json")
-        with open(path, "w") as f:
-            json.dump(self.uploaded_files, f, indent=4)
-
-    def load_files(self) -> List[str]:
-        """Loads the list of uploaded files from a JSON file."""
-        path = os.path.join(self.storage_dir, "uploaded_files.json")
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                return json.load(f)
-        return []
+        """Saves the uploaded file records to a JSON file.
+        
+        Raises:
+            VersionConflict: If another manager saved the records since
+                this one last read or saved them
+        """
+        with file_lock(self.metadata_path):
+            check_version(self.metadata_path, self.version)
+            self._write_files()
+
+    def _write_files(self) -> None:
+        """Replaces the records file, whose lock the caller holds."""
+        with span("files.save"):
+            write_json(
+                self.metadata_path, {"version": self.version + 1, "files": self.files}
+            )
+        self.version += 1
+
+    def load_files(self) -> Dict[str, Dict[str, Any]]:
+        """Loads the uploaded file records from a JSON file.
+        
+        The older format, a plain list of file IDs oldest first, is read as
+        records without a content hash and in the same recency order.
+        """
+        if not os.path.exists(self.metadata_path):
+            self.version = 0
+            return {}
+        with open(self.metadata_path, "r") as f:
+            data = json.load(f)
+        self.version = data.get("version", 0) if isinstance(data, dict) else 0
+        if isinstance(data, list):
+            return {
+                file_id: {
+                    "sha256": None,
+                    "path": None,
+                    "uploaded_at": position,
+                    "last_used": position,
+                    "owners": [],
+                }
+                for position, file_id in enumerate(data)
+            }
+        return data["files"]
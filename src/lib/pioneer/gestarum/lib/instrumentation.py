@@ -0,0 +1,317 @@
+"""
+Per-stage latency histograms for the assistant turn pipeline.
+
+A turn passes through stages: the API requests that post the message, start
+the run and poll it, the time the run spends queued and in progress, and the
+local saves of threads, graphs and file records. Each stage is timed with a
+span and recorded in a histogram, from which p50/p99 per stage are exported
+as JSON or in the Prometheus text format.
+
+Instrumentation is process-wide and off unless the SHANNON_INSTRUMENTATION
+environment variable is set or configure_instrumentation() enables it. While
+it is off, span() returns one shared no-op context manager, so an
+instrumented call costs a function call and an attribute check.
+
+Hooks are called with (stage, seconds, error) after every observation, so
+other sinks, such as a tracing exporter or a slow-request log, can be attached
+without changing the call sites.
+
+Example:
+    configure_instrumentation()
+    with span("thread.save"):
+        thread.save()
+    print(get_instrumentation().to_prometheus())
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+from types import TracebackType
+from typing import (
+    Any, Awaitable, Callable, ContextManager, Dict, List, Optional, Sequence, Tuple, Type,
+    TypeVar, cast,
+)
+
+T = TypeVar("T")
+
+# (stage, seconds, error) -> None
+Hook = Callable[[str, float, Optional[BaseException]], None]
+
+# Upper bounds in seconds, four per decade from 0.1 ms to 100 s
+DEFAULT_BUCKETS: Tuple[float, ...] = tuple(round(10 ** (e / 4), 6) for e in range(-16, 9))
+
+METRIC_PREFIX = "shannon_stage"
+
+_DISABLED = nullcontext()
+
+_CO_COROUTINE = 0x80  # inspect.CO_COROUTINE; inspect is slow to import
+
+
+class Histogram:
+    """Thread-safe latency histogram with fixed buckets."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """Initialize the histogram.
+        
+        Args:
+            buckets: Ascending upper bounds in seconds; larger observations
+                fall into an implicit +Inf bucket
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        """Records one duration.
+        
+        Args:
+            seconds: Duration of the stage
+            error: Whether the stage raised
+        """
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+            if error:
+                self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by interpolating within its bucket.
+        
+        Args:
+            q: Quantile between 0 and 1
+        
+        Returns:
+            Estimated duration in seconds, 0.0 if nothing was observed
+        """
+        with self._lock:
+            counts, count, maximum = list(self.counts), self.count, self.max
+        if count == 0:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else maximum
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(estimate, maximum)
+            seen += bucket_count
+        return maximum
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the cumulative bucket counts, count, sum and errors."""
+        with self._lock:
+            counts, count, total, errors = list(self.counts), self.count, self.sum, self.errors
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return {"cumulative": cumulative, "count": count, "sum": total, "errors": errors}
+
+
+class _Span:
+    """Times a block and records it under a stage when the block exits."""
+
+    __slots__ = ("instrumentation", "stage", "start")
+
+    def __init__(self, instrumentation: "Instrumentation", stage: str):
+        self.instrumentation = instrumentation
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.instrumentation.observe(self.stage, time.perf_counter() - self.start, exc)
+
+
+class Instrumentation:
+    """Histograms of stage latencies, plus hooks called on each observation."""
+
+    def __init__(self, enabled: bool = True, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """Initialize the instrumentation.
+        
+        Args:
+            enabled: Whether spans record anything
+            buckets: Histogram bucket bounds in seconds
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, Histogram] = {}
+        self.hooks: List[Hook] = []
+        self._lock = threading.Lock()
+
+    def span(self, stage: str) -> ContextManager:
+        """Returns a context manager timing a block as a stage."""
+        if not self.enabled:
+            return _DISABLED
+        return _Span(self, stage)
+
+    def observe(self, stage: str, seconds: float, error: Optional[BaseException] = None) -> None:
+        """Records a duration measured by the caller.
+        
+        Args:
+            stage: Stage name, such as "runs.create"
+            seconds: Duration of the stage
+            error: Error the stage raised, if any
+        """
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.buckets))
+        histogram.observe(seconds, error is not None)
+        for hook in self.hooks:
+            try:
+                hook(stage, seconds, error)
+            except Exception as e:
+                print(f"Warning: instrumentation hook failed: {e}")
+
+    def add_hook(self, hook: Hook) -> None:
+        """Calls hook(stage, seconds, error) after every observation."""
+        self.hooks = self.hooks + [hook]  # Copied, so observers iterate safely
+
+    def remove_hook(self, hook: Hook) -> None:
+        """Stops calling a hook added with add_hook()."""
+        self.hooks = [h for h in self.hooks if h is not hook]
+
+    def reset(self) -> None:
+        """Drops every recorded observation."""
+        with self._lock:
+            self.histograms = {}
+
+    def _stages(self) -> List[Tuple[str, Histogram]]:
+        """Returns the histograms sorted by stage, safe from concurrent additions."""
+        with self._lock:
+            return sorted(self.histograms.items())
+
+    def to_json(self) -> Dict[str, Dict[str, Any]]:
+        """Summarizes each stage, with durations in milliseconds.
+        
+        Returns:
+            {stage: {"count", "errors", "mean_ms", "p50_ms", "p90_ms",
+            "p99_ms", "max_ms"}}
+        """
+        summary = {}
+        for stage, histogram in self._stages():
+            snapshot = histogram.snapshot()
+            count = snapshot["count"]
+            summary[stage] = {
+                "count": count,
+                "errors": snapshot["errors"],
+                "mean_ms": snapshot["sum"] / count * 1000 if count else 0.0,
+                "p50_ms": histogram.quantile(0.50) * 1000,
+                "p90_ms": histogram.quantile(0.90) * 1000,
+                "p99_ms": histogram.quantile(0.99) * 1000,
+                "max_ms": histogram.max * 1000,
+            }
+        return summary
+
+    def to_prometheus(self) -> str:
+        """Renders every histogram in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_seconds Latency of a stage of the turn pipeline.",
+            f"# TYPE {METRIC_PREFIX}_seconds histogram",
+        ]
+        errors = [
+            f"# HELP {METRIC_PREFIX}_errors_total Stages that raised.",
+            f"# TYPE {METRIC_PREFIX}_errors_total counter",
+        ]
+        for stage, histogram in self._stages():
+            snapshot = histogram.snapshot()
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            bounds = [repr(bound) for bound in histogram.buckets] + ["+Inf"]
+            for bound, cumulative in zip(bounds, snapshot["cumulative"]):
+                lines.append(
+                    f'{METRIC_PREFIX}_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{METRIC_PREFIX}_seconds_sum{{stage="{label}"}} {snapshot["sum"]!r}')
+            lines.append(f'{METRIC_PREFIX}_seconds_count{{stage="{label}"}} {snapshot["count"]}')
+            errors.append(f'{METRIC_PREFIX}_errors_total{{stage="{label}"}} {snapshot["errors"]}')
+        return "\n".join(lines + errors) + "\n"
+
+
+_instrumentation = Instrumentation(enabled=bool(os.getenv("SHANNON_INSTRUMENTATION")))
+
+def get_instrumentation() -> Instrumentation:
+    """Returns the process-wide instrumentation.
+    
+    It is enabled at start-up if the SHANNON_INSTRUMENTATION environment
+    variable is set, and otherwise only by configure_instrumentation().
+    """
+    return _instrumentation
+
+def configure_instrumentation(
+    enabled: bool = True,
+    buckets: Optional[Sequence[float]] = None,
+) -> Instrumentation:
+    """Enables or disables the process-wide instrumentation.
+    
+    Args:
+        enabled: Whether spans record anything
+        buckets: New histogram bucket bounds in seconds; recorded
+            observations are dropped when they change
+    
+    Returns:
+        The process-wide instrumentation
+    """
+    if buckets is not None and tuple(buckets) != _instrumentation.buckets:
+        _instrumentation.buckets = tuple(buckets)
+        _instrumentation.reset()
+    _instrumentation.enabled = enabled
+    return _instrumentation
+
+def span(stage: str) -> ContextManager:
+    """Times a block as a stage of the process-wide instrumentation.
+    
+    Args:
+        stage: Stage name, such as "thread.save"
+    """
+    if not _instrumentation.enabled:
+        return _DISABLED
+    return _Span(_instrumentation, stage)
+
+def observe(stage: str, seconds: float, error: Optional[BaseException] = None) -> None:
+    """Records a duration measured by the caller in the process-wide instrumentation."""
+    if _instrumentation.enabled:
+        _instrumentation.observe(stage, seconds, error)
+
+def instrumented(stage: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorates a function or coroutine function so each call is timed as a stage.
+    
+    Args:
+        stage: Stage name
+    """
+    def decorate(func: Callable[..., T]) -> Callable[..., T]:
+        if getattr(getattr(func, "__code__", None), "co_flags", 0) & _CO_COROUTINE:
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(stage):
+                    return await cast(Awaitable[Any], func(*args, **kwargs))
+            return cast(Callable[..., T], async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
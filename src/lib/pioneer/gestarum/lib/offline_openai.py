@@ -0,0 +1,427 @@
+"""
+Offline stand-in for the parts of the OpenAI client used by the Pioneer module.
+
+OfflineOpenAI and AsyncOfflineOpenAI mimic client.beta.assistants,
+client.beta.threads (messages, runs, create_and_run and run streaming) and client.files
+in memory, with configurable latency and failure injection, so assistants
+can be exercised and benchmarked without network access or an API key.
+"""
+
+import asyncio
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class OfflineAPIError(Exception):
+    """Injected API failure, shaped like openai.APIStatusError.
+
+    It exposes status_code and response.headers so retry logic written for
+    the real client can handle it unchanged.
+    """
+
+    def __init__(self, status_code: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def _text_message(message_id: str, thread_id: str, role: str, text: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=message_id,
+        object="thread.message",
+        thread_id=thread_id,
+        role=role,
+        created_at=time.time(),
+        content=[SimpleNamespace(type="text", text=SimpleNamespace(value=text))],
+    )
+
+
+class OfflineBackend:
+    """In-memory state and behaviour shared by offline clients."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        run_duration: float = 0.05,
+        stream_chunks: int = 8,
+        failure_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 0.05,
+        reply_words: int = 40,
+        seed: Optional[int] = 0,
+    ):
+        """Initialize the backend.
+
+        Args:
+            latency: Seconds added to every request
+            run_duration: Seconds a run takes from creation to completion
+            stream_chunks: Number of text deltas a streamed reply is split into
+            failure_rate: Probability that a request fails with a 500 error
+            rate_limit_rate: Probability that a request fails with a 429 error
+            retry_after: Retry-After value in seconds sent with 429 errors
+            reply_words: Length of generated replies in words
+            seed: Seed for the failure injection random generator
+        """
+        self.latency = latency
+        self.run_duration = run_duration
+        self.stream_chunks = max(1, stream_chunks)
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.reply_words = reply_words
+        self.requests: Counter = Counter()  # endpoint -> request count
+        self.assistants: Dict[str, SimpleNamespace] = {}
+        self.threads: Dict[str, List[SimpleNamespace]] = {}
+        self.runs: Dict[str, SimpleNamespace] = {}
+        self.files: Dict[str, SimpleNamespace] = {}
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}_offline{next(self._ids)}"
+
+    def begin(self, endpoint: str) -> float:
+        """Counts a request, injects failures and returns its latency."""
+        with self._lock:
+            self.requests[endpoint] += 1
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise OfflineAPIError(
+                429, "Rate limit reached (offline)",
+                {"retry-after": str(self.retry_after)},
+            )
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise OfflineAPIError(500, "Internal server error (offline)")
+        return self.latency
+
+    def reply_for(self, thread_id: str) -> str:
+        """Generates a deterministic reply to the newest user message."""
+        prompt = ""
+        for message in reversed(self.threads.get(thread_id, [])):
+            if message.role == "user":
+                prompt = message.content[0].text.value
+                break
+        words = (f"Regarding '{prompt[:60]}': information is the resolution of uncertainty.").split()
+        return " ".join(itertools.islice(itertools.cycle(words), self.reply_words))
+
+    def add_message(self, thread_id: str, role: str, content: str) -> SimpleNamespace:
+        if thread_id not in self.threads:
+            raise OfflineAPIError(404, f"No thread found with id '{thread_id}'")
+        message = _text_message(self.new_id("msg"), thread_id, role, content)
+        with self._lock:
+            self.threads[thread_id].append(message)
+        return message
+
+    def create_run(self, thread_id: str, assistant_id: str, additional_messages: Any = None) -> SimpleNamespace:
+        if assistant_id not in self.assistants:
+            raise OfflineAPIError(404, f"No assistant found with id '{assistant_id}'")
+        for message in additional_messages or []:
+            self.add_message(thread_id, message["role"], message["content"])
+        run = SimpleNamespace(
+            id=self.new_id("run"),
+            object="thread.run",
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            status="queued",
+            created_at=time.time(),
+            completes_at=time.time() + self.run_duration,
+        )
+        self.runs[run.id] = run
+        return run
+
+    def advance_run(self, run: SimpleNamespace, force: bool = False) -> SimpleNamespace:
+        """Moves a run forward according to the elapsed time."""
+        if run.status in ("queued", "in_progress"):
+            if force or time.time() >= run.completes_at:
+                self.add_message(run.thread_id, "assistant", self.reply_for(run.thread_id))
+                run.status = "completed"
+            else:
+                run.status = "in_progress"
+        return run
+
+    def chunks(self, text: str) -> List[str]:
+        """Splits a reply into the text deltas of a streamed response."""
+        size = max(1, -(-len(text) // self.stream_chunks))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _stream_events(backend: OfflineBackend, run: SimpleNamespace) -> Iterator[SimpleNamespace]:
+    """Builds the event sequence of a streamed run (without delays)."""
+    yield SimpleNamespace(event="thread.run.created", data=run)
+    text = backend.reply_for(run.thread_id)
+    message_id = backend.new_id("msg")
+    for chunk in backend.chunks(text):
+        yield SimpleNamespace(
+            event="thread.message.delta",
+            data=SimpleNamespace(
+                id=message_id,
+                delta=SimpleNamespace(content=[
+                    SimpleNamespace(index=0, type="text", text=SimpleNamespace(value=chunk))
+                ]),
+            ),
+        )
+    message = _text_message(message_id, run.thread_id, "assistant", text)
+    backend.threads[run.thread_id].append(message)
+    run.status = "completed"
+    yield SimpleNamespace(event="thread.message.completed", data=message)
+    yield SimpleNamespace(event="thread.run.completed", data=run)
+
+
+class _RunStreamState:
+    """State shared by the synchronous and asynchronous offline run streams."""
+
+    def __init__(self, backend: OfflineBackend, run_factory: Any):
+        self._backend = backend
+        self._run_factory = run_factory
+        self._run: Optional[SimpleNamespace] = None
+        self._messages: List[SimpleNamespace] = []
+        self._consumed = False
+
+    @property
+    def _started_run(self) -> SimpleNamespace:
+        if self._run is None:
+            raise RuntimeError("The run stream was not entered")
+        return self._run
+
+
+class _OfflineRunStream(_RunStreamState):
+    """Synchronous stand-in for the SDK's AssistantStreamManager."""
+
+    def __enter__(self) -> "_OfflineRunStream":
+        time.sleep(self._backend.begin("runs.stream"))
+        self._run = self._run_factory()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def __iter__(self) -> Iterator[SimpleNamespace]:
+        delay = self._backend.run_duration / self._backend.stream_chunks
+        for event in _stream_events(self._backend, self._started_run):
+            if event.event == "thread.message.delta":
+                time.sleep(delay)
+            elif event.event == "thread.message.completed":
+                self._messages.append(event.data)
+            yield event
+        self._consumed = True
+
+    @property
+    def text_deltas(self) -> Iterator[str]:
+        for event in self:
+            if event.event == "thread.message.delta":
+                yield event.data.delta.content[0].text.value
+
+    def until_done(self) -> None:
+        if not self._consumed:
+            for _ in self:
+                pass
+
+    def get_final_run(self) -> SimpleNamespace:
+        self.until_done()
+        return self._started_run
+
+    def get_final_messages(self) -> List[SimpleNamespace]:
+        self.until_done()
+        return self._messages
+
+
+class _AsyncOfflineRunStream(_RunStreamState):
+    """Asynchronous stand-in for the SDK's AsyncAssistantStreamManager."""
+
+    async def __aenter__(self) -> "_AsyncOfflineRunStream":
+        await asyncio.sleep(self._backend.begin("runs.stream"))
+        self._run = self._run_factory()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+    async def __aiter__(self) -> Any:
+        delay = self._backend.run_duration / self._backend.stream_chunks
+        for event in _stream_events(self._backend, self._started_run):
+            if event.event == "thread.message.delta":
+                await asyncio.sleep(delay)
+            elif event.event == "thread.message.completed":
+                self._messages.append(event.data)
+            yield event
+        self._consumed = True
+
+    @property
+    async def text_deltas(self) -> Any:
+        async for event in self:
+            if event.event == "thread.message.delta":
+                yield event.data.delta.content[0].text.value
+
+    async def until_done(self) -> None:
+        if not self._consumed:
+            async for _ in self:
+                pass
+
+    async def get_final_run(self) -> SimpleNamespace:
+        await self.until_done()
+        return self._started_run
+
+    async def get_final_messages(self) -> List[SimpleNamespace]:
+        await self.until_done()
+        return self._messages
+
+
+class _Resource:
+    """Base for offline API resources; wraps calls in latency and failures."""
+
+    def __init__(self, backend: OfflineBackend, is_async: bool):
+        self._backend = backend
+        self._is_async = is_async
+
+    def _call(self, endpoint: str, handler: Any) -> Any:
+        if self._is_async:
+            async def call() -> Any:
+                await asyncio.sleep(self._backend.begin(endpoint))
+                return handler()
+            return call()
+        time.sleep(self._backend.begin(endpoint))
+        return handler()
+
+
+class _Assistants(_Resource):
+    def create(self, name: Optional[str] = None, **kwargs: Any) -> Any:
+        def handler() -> SimpleNamespace:
+            assistant = SimpleNamespace(
+                id=self._backend.new_id("asst"), object="assistant", name=name, **kwargs
+            )
+            self._backend.assistants[assistant.id] = assistant
+            return assistant
+        return self._call("assistants.create", handler)
+
+    def retrieve(self, assistant_id: str, **kwargs: Any) -> Any:
+        def handler() -> SimpleNamespace:
+            if assistant_id not in self._backend.assistants:
+                raise OfflineAPIError(404, f"No assistant found with id '{assistant_id}'")
+            return self._backend.assistants[assistant_id]
+        return self._call("assistants.retrieve", handler)
+
+
+class _Messages(_Resource):
+    def create(self, thread_id: str, role: str, content: str, **kwargs: Any) -> Any:
+        return self._call(
+            "messages.create",
+            lambda: self._backend.add_message(thread_id, role, content),
+        )
+
+    def list(self, thread_id: str, order: str = "desc", limit: int = 20, **kwargs: Any) -> Any:
+        def handler() -> SimpleNamespace:
+            messages = list(self._backend.threads.get(thread_id, []))
+            if order == "desc":
+                messages.reverse()
+            return SimpleNamespace(data=messages[:limit])
+        return self._call("messages.list", handler)
+
+
+class _Runs(_Resource):
+    def create(self, thread_id: str, assistant_id: str, additional_messages: Any = None, **kwargs: Any) -> Any:
+        return self._call(
+            "runs.create",
+            lambda: self._backend.create_run(thread_id, assistant_id, additional_messages),
+        )
+
+    def retrieve(self, run_id: str, thread_id: str, **kwargs: Any) -> Any:
+        return self._call(
+            "runs.retrieve",
+            lambda: self._backend.advance_run(self._backend.runs[run_id]),
+        )
+
+    def stream(self, thread_id: str, assistant_id: str, additional_messages: Any = None, **kwargs: Any) -> Any:
+        stream_class = _AsyncOfflineRunStream if self._is_async else _OfflineRunStream
+        return stream_class(
+            self._backend,
+            lambda: self._backend.create_run(thread_id, assistant_id, additional_messages),
+        )
+
+
+class _Threads(_Resource):
+    def __init__(self, backend: OfflineBackend, is_async: bool):
+        super().__init__(backend, is_async)
+        self.messages = _Messages(backend, is_async)
+        self.runs = _Runs(backend, is_async)
+
+    def create(self, messages: Optional[List[Dict[str, str]]] = None, **kwargs: Any) -> Any:
+        def handler() -> SimpleNamespace:
+            thread = SimpleNamespace(id=self._backend.new_id("thread"), object="thread")
+            self._backend.threads[thread.id] = []
+            for message in messages or []:
+                self._backend.add_message(thread.id, message["role"], message["content"])
+            return thread
+        return self._call("threads.create", handler)
+
+    def _new_thread_run(self, assistant_id: str, thread: Optional[Dict[str, Any]]) -> SimpleNamespace:
+        thread_id = self._backend.new_id("thread")
+        self._backend.threads[thread_id] = []
+        for message in (thread or {}).get("messages", []):
+            self._backend.add_message(thread_id, message["role"], message["content"])
+        return self._backend.create_run(thread_id, assistant_id)
+
+    def create_and_run(self, assistant_id: str, thread: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        return self._call(
+            "threads.create_and_run",
+            lambda: self._new_thread_run(assistant_id, thread),
+        )
+
+    def create_and_run_stream(self, assistant_id: str, thread: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        stream_class = _AsyncOfflineRunStream if self._is_async else _OfflineRunStream
+        return stream_class(self._backend, lambda: self._new_thread_run(assistant_id, thread))
+
+
+class _Files(_Resource):
+    def create(self, file: Any, purpose: str, **kwargs: Any) -> Any:
+        def handler() -> SimpleNamespace:
+            content = file[1] if isinstance(file, tuple) else file
+            data = content.read() if hasattr(content, "read") else content
+            uploaded = SimpleNamespace(
+                id=self._backend.new_id("file"), object="file",
+                bytes=len(data), purpose=purpose,
+            )
+            self._backend.files[uploaded.id] = uploaded
+            return uploaded
+        return self._call("files.create", handler)
+
+    def delete(self, file_id: str, **kwargs: Any) -> Any:
+        def handler() -> SimpleNamespace:
+            if self._backend.files.pop(file_id, None) is None:
+                raise OfflineAPIError(404, f"No such File object: {file_id}")
+            return SimpleNamespace(id=file_id, object="file", deleted=True)
+        return self._call("files.delete", handler)
+
+
+class OfflineOpenAI:
+    """Drop-in offline replacement for openai.OpenAI in this package."""
+
+    _is_async = False
+
+    def __init__(self, backend: Optional[OfflineBackend] = None, **backend_options: Any):
+        """Initialize the offline client.
+
+        Args:
+            backend: Backend to share with other clients (created if not given)
+            **backend_options: Options for a new OfflineBackend
+        """
+        self.backend = backend or OfflineBackend(**backend_options)
+        self.api_key = "offline"
+        self.base_url = "offline://"
+        self.beta = SimpleNamespace(
+            assistants=_Assistants(self.backend, self._is_async),
+            threads=_Threads(self.backend, self._is_async),
+        )
+        self.files = _Files(self.backend, self._is_async)
+
+
+class AsyncOfflineOpenAI(OfflineOpenAI):
+    """Drop-in offline replacement for openai.AsyncOpenAI in this package."""
+
+    _is_async = True
@@ -0,0 +1,348 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from src.lib.pioneer.gestarum.lib.instrumentation import observe
+
+T = TypeVar("T")
+
+# Statuses with which the server declined the request: a retry cannot repeat
+# its effect, so every call retries them
+RETRYABLE_STATUSES = {408, 429}
+
+# Transient statuses after which the request may have taken effect; only
+# idempotent calls retry them, as must errors without a status
+IDEMPOTENT_RETRYABLE_STATUSES = {409, 500, 502, 503, 504}
+
+# Connection errors (of httpx, under the SDK's APIConnectionError) raised
+# before any of the request was sent
+UNSENT_ERRORS = ("ConnectError", "ConnectTimeout")
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations.
+    
+    A caller reserves an amount and is told how long to wait before using
+    it, so the same bucket serves threads (which sleep) and coroutines
+    (which await). The bucket may go into debt; later callers wait longer.
+    An amount larger than the capacity is charged in full, so its caller
+    waits until the rate covers it.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Initialize the bucket.
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held (defaults to one second's worth,
+                but at least one)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Takes an amount from the bucket.
+        
+        Args:
+            amount: Tokens to take; amounts above the capacity put the
+                bucket into debt
+        
+        Returns:
+            Seconds to wait before the reserved tokens may be used
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Process-wide limiter for API requests and tokens.
+    
+    Limits are per minute; None disables that limit. When the API answers
+    with a rate limit error, pause() holds back every caller until the
+    Retry-After period is over, so one 429 does not turn into many.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        """Initialize the limiter.
+        
+        Args:
+            requests_per_minute: Maximum request rate, or None for no limit
+            tokens_per_minute: Maximum token rate, or None for no limit
+        """
+        self.requests = (
+            TokenBucket(requests_per_minute / 60.0, max(requests_per_minute / 60.0, 1.0))
+            if requests_per_minute else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 60.0)
+            if tokens_per_minute else None
+        )
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserves one request and a number of tokens.
+        
+        Args:
+            tokens: Estimated tokens the request consumes
+        
+        Returns:
+            Seconds to wait before sending the request
+        """
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1.0))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Blocks until a request with the given tokens may be sent.
+        
+        Waits are recorded as the stage rate_limit.wait.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            observe("rate_limit.wait", wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        """Waits without blocking the event loop until a request may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            import asyncio  # Deferred: only coroutines need it
+            observe("rate_limit.wait", wait)
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Holds back all callers for a number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RetryPolicy:
+    """Retry with jittered exponential backoff that honours Retry-After."""
+
+    def __init__(
+        self,
+        max_attempts: int = 6,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        """Initialize the retry policy.
+        
+        Args:
+            max_attempts: Attempts per call, including the first one
+            base_delay: Backoff ceiling of the first retry in seconds
+            max_delay: Cap on any single backoff in seconds
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def status_code(error: BaseException) -> Optional[int]:
+        """Returns the HTTP status of an API error, if it has one."""
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        return status if isinstance(status, int) else None
+
+    @staticmethod
+    def never_sent(error: BaseException) -> bool:
+        """Checks whether an error, or one it was raised from, failed to connect."""
+        seen = set()
+        while error is not None and id(error) not in seen:
+            if type(error).__name__ in UNSENT_ERRORS:
+                return True
+            seen.add(id(error))
+            error = error.__cause__ or error.__context__
+        return False
+
+    def is_retryable(self, error: BaseException, idempotent: bool = False) -> bool:
+        """Checks whether an error is transient and a retry is safe.
+        
+        Rate limits and request timeouts are always retried, as are
+        connection failures before the request was sent. Server errors,
+        conflicts and other connection failures and timeouts may leave the
+        request done, so they are only retried for idempotent calls; a
+        repeated POST could post a message or start a run twice.
+        
+        Args:
+            error: Error of the failed attempt
+            idempotent: Whether repeating the call has no further effect
+        """
+        status = self.status_code(error)
+        if status is not None:
+            return status in RETRYABLE_STATUSES or (
+                idempotent and status in IDEMPOTENT_RETRYABLE_STATUSES
+            )
+        if self.never_sent(error):
+            return True
+        name = type(error).__name__
+        return idempotent and ("Connection" in name or "Timeout" in name)
+
+    @staticmethod
+    def retry_after(error: BaseException) -> Optional[float]:
+        """Reads the server's requested delay from an error's headers."""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000.0
+            value = headers.get("retry-after")
+            if not value:
+                return None
+            try:
+                return float(value)
+            except ValueError:
+                import email.utils  # Deferred: HTTP dates are rare
+                retry_at = email.utils.parsedate_to_datetime(value)
+                return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        """Returns the wait before the next attempt.
+        
+        Args:
+            attempt: Number of the failed attempt, starting at 1
+            error: Error of the failed attempt
+        """
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)  # Full jitter
+
+
+_limiter: Optional[RateLimiter] = None
+_policy = RetryPolicy()
+
+def _env_limit(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process-wide limiter.
+    
+    Unless configure_rate_limits() was called, its limits are read from the
+    OPENAI_REQUESTS_PER_MINUTE and OPENAI_TOKENS_PER_MINUTE environment
+    variables on first use; without them only Retry-After pauses apply.
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(
+            _env_limit("OPENAI_REQUESTS_PER_MINUTE"),
+            _env_limit("OPENAI_TOKENS_PER_MINUTE"),
+        )
+    return _limiter
+
+def configure_rate_limits(
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+) -> RateLimiter:
+    """Replaces the process-wide limiter (and optionally the retry policy).
+    
+    Args:
+        requests_per_minute: Maximum request rate, or None for no limit
+        tokens_per_minute: Maximum token rate, or None for no limit
+        retry_policy: Retry policy for all API calls
+    
+    Returns:
+        The new limiter
+    """
+    global _limiter, _policy
+    _limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    if retry_policy is not None:
+        _policy = retry_policy
+    return _limiter
+
+def note_failure(error: BaseException) -> None:
+    """Pauses the process-wide limiter if an error asks for a Retry-After."""
+    if RetryPolicy.status_code(error) == 429:
+        retry_after = RetryPolicy.retry_after(error)
+        if retry_after:
+            get_rate_limiter().pause(retry_after)
+
+def call_with_retry(
+    func: Callable[..., T],
+    *args: Any,
+    tokens: int = 0,
+    idempotent: bool = False,
+    **kwargs: Any,
+) -> T:
+    """Calls an API function under the shared rate limiter, retrying failures.
+    
+    Which failures are retried depends on idempotent (see
+    RetryPolicy.is_retryable()). Each retry's backoff is recorded as the
+    stage api.retry, together with the error that caused it. The client should be built with
+    max_retries=0, as default_client() does, so its own retries do not
+    multiply these.
+    
+    Args:
+        func: Client method to call
+        *args: Positional arguments for func
+        tokens: Estimated tokens the request consumes
+        idempotent: Whether repeating the call has no further effect, as
+            for retrievals, listings and deletions
+        **kwargs: Keyword arguments for func
+    
+    Returns:
+        The result of func
+    
+    Raises:
+        The last error if it is not transient or every attempt failed
+    """
+    limiter = get_rate_limiter()
+    for attempt in range(1, _policy.max_attempts + 1):
+        limiter.acquire(tokens if attempt == 1 else 0)
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == _policy.max_attempts or not _policy.is_retryable(e, idempotent):
+                raise
+            note_failure(e)
+            delay = _policy.delay(attempt, e)
+            observe("api.retry", delay, e)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+async def acall_with_retry(
+    func: Callable[..., Awaitable[T]],
+    *args: Any,
+    tokens: int = 0,
+    idempotent: bool = False,
+    **kwargs: Any,
+) -> T:
+    """Asyncio counterpart of call_with_retry() for AsyncOpenAI methods."""
+    import asyncio  # Deferred: only coroutines need it
+    limiter = get_rate_limiter()
+    for attempt in range(1, _policy.max_attempts + 1):
+        await limiter.acquire_async(tokens if attempt == 1 else 0)
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if attempt == _policy.max_attempts or not _policy.is_retryable(e, idempotent):
+                raise
+            note_failure(e)
+            delay = _policy.delay(attempt, e)
+            observe("api.retry", delay, e)
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.lib.pioneer.gestarum.lib.assistant_configuration import AssistantConfiguration
+from src.lib.pioneer.gestarum.lib.atomic_file import atomic_write
+
+class ResponseCache:
+    """Persistent cache of assistant responses on disk.
+    
+    Each entry is a small JSON file named after the configuration fingerprint
+    and the entry key. A file's modification time records its last use, so
+    the least recently used order survives restarts without an index file.
+    Entries expire after a TTL, and the least recently used ones are evicted
+    once the entry count or total size exceeds its limit.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "cache/responses",
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 7 * 24 * 3600.0,
+    ):
+        """Initialize the response cache.
+        
+        Args:
+            cache_dir: Directory to store cache entries
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of the cache entries in bytes
+            ttl: Seconds a response stays valid after it was stored (None
+                for no expiry)
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Entry filename -> size in bytes, least recently used first
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def normalize_message(message: str) -> str:
+        """Normalizes a message so trivially different phrasings share an entry."""
+        return " ".join(message.split()).casefold()
+
+    @staticmethod
+    def context_fingerprint(
+        context: Optional[List[Dict[str, str]]] = None,
+        additional_instructions: Optional[str] = None,
+    ) -> str:
+        """Returns a hash of everything besides the message sent with a run.
+        
+        Args:
+            context: Context messages sent with the run, if any
+            additional_instructions: Per-run instructions, if any
+        """
+        payload = json.dumps(
+            {
+                "context": [
+                    [entry.get("role"), entry.get("content")] for entry in context or []
+                ],
+                "instructions": additional_instructions,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def key(
+        self,
+        config: AssistantConfiguration,
+        message: str,
+        context: Optional[List[Dict[str, str]]] = None,
+        additional_instructions: Optional[str] = None,
+    ) -> str:
+        """Builds the cache key of a request.
+        
+        Args:
+            config: Configuration of the assistant answering the request
+            message: User message
+            context: Context messages sent with the run, or for a run on a
+                remote thread, the thread's history; runs on threads with
+                different histories must not share an entry
+            additional_instructions: Per-run instructions, if any
+        
+        Returns:
+            Key of the form "<config fingerprint prefix>-<request hash>"
+        """
+        request = "\0".join([
+            config.fingerprint(),
+            self.context_fingerprint(context, additional_instructions),
+            self.normalize_message(message),
+        ])
+        digest = hashlib.sha256(request.encode("utf-8")).hexdigest()
+        return f"{config.fingerprint()[:16]}-{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns a cached response and marks it as recently used.
+        
+        Args:
+            key: Cache key from key()
+        
+        Returns:
+            The response, or None on a miss or an expired entry
+        """
+        filename = f"{key}.json"
+        path = os.path.join(self.cache_dir, filename)
+        with self._lock:
+            index = self._load_index()
+            if filename not in index:
+                self.misses += 1
+                return None
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading cache entry {path}: {e}")
+                self._remove(filename)
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.time() - entry["created_at"] > self.ttl:
+                self._remove(filename)
+                self.misses += 1
+                return None
+            index.move_to_end(filename)
+            os.utime(path)
+            self.hits += 1
+            return entry["response"]
+
+    def put(self, key: str, response: str) -> None:
+        """Stores a response and evicts entries beyond the limits.
+        
+        Args:
+            key: Cache key from key()
+            response: Response text
+        """
+        filename = f"{key}.json"
+        path = os.path.join(self.cache_dir, filename)
+        data = json.dumps({"created_at": time.time(), "response": response})
+        with self._lock:
+            index = self._load_index()
+            with atomic_write(path) as f:
+                f.write(data)
+            self._total_bytes += len(data) - index.pop(filename, 0)
+            index[filename] = len(data)
+            self._evict()
+
+    def discard_config(self, config_fingerprint: str) -> int:
+        """Removes every entry stored for a configuration fingerprint.
+        
+        Args:
+            config_fingerprint: Fingerprint from AssistantConfiguration.fingerprint()
+        
+        Returns:
+            Number of removed entries
+        """
+        prefix = f"{config_fingerprint[:16]}-"
+        with self._lock:
+            stale = [name for name in self._load_index() if name.startswith(prefix)]
+            for filename in stale:
+                self._remove(filename)
+        return len(stale)
+
+    def on_config_saved(self, config: AssistantConfiguration, previous: str) -> None:
+        """Save listener that drops the responses of a superseded configuration."""
+        removed = self.discard_config(previous)
+        if removed:
+            print(f"Invalidated {removed} cached responses for '{config.name}'")
+
+    def watch(self, config: AssistantConfiguration) -> None:
+        """Invalidates cached responses whenever the configuration changes."""
+        config.add_save_listener(self.on_config_saved)
+
+    def clear(self) -> None:
+        """Removes every cached response."""
+        with self._lock:
+            for filename in list(self._load_index()):
+                self._remove(filename)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns entry, size and hit counters of the cache."""
+        with self._lock:
+            index = self._load_index()
+            return {
+                "entries": len(index),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """Builds the LRU index from the cache directory on first use."""
+        if self._index is None:
+            entries: List[Tuple[float, str, int]] = []
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(".json"):
+                    stat = os.stat(os.path.join(self.cache_dir, filename))
+                    entries.append((stat.st_mtime, filename, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict(
+                (filename, size) for _, filename, size in entries
+            )
+            self._total_bytes = sum(size for _, _, size in entries)
+            self._evict()
+        return self._index
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until the limits hold."""
+        while self._index and (
+            len(self._index) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._index)))
+
+    def _remove(self, filename: str) -> None:
+        """Deletes an entry from the index and the disk."""
+        self._total_bytes -= self._index.pop(filename, 0)
+        try:
+            os.remove(os.path.join(self.cache_dir, filename))
+        except FileNotFoundError:
+            pass
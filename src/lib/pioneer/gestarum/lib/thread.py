@@ -1,23 +1,40 @@
-import json
-import os
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Dict, List, Optional
+
+from src.lib.pioneer.gestarum.lib.atomic_file import (
+    SAVE_ATTEMPTS,
+    VersionConflict,
+    wait_after_conflict,
+)
+from src.lib.pioneer.gestarum.lib.instrumentation import instrumented
+from src.lib.pioneer.gestarum.lib.thread_storage import JSONThreadStorage, ThreadStorage
 
 class Thread:
     """Manages a persistent thread for an assistant conversation."""
 
-    def __init__(self, thread_id: str, name: str, storage_dir: str = "threads"):
+    def __init__(
+        self,
+        thread_id: str,
+        name: str,
+        storage_dir: str = "threads",
+        storage: Optional[ThreadStorage] = None,
+    ):
         """Initialize thread.
         
         Args:
             thread_id: OpenAI thread ID
             name: Human-readable name for the thread
             storage_dir: Directory to store thread data
+            storage: Store to persist the thread in; defaults to a JSON file
+                in storage_dir
         """
         self.thread_id = thread_id
         self.name = name
         self.storage_dir = storage_dir
+        self.storage = storage if storage is not None else JSONThreadStorage(storage_dir)
         self.messages: List[Dict[str, str]] = []
-        os.makedirs(self.storage_dir, exist_ok=True)
+        self._saved_count = 0  # Messages already in the store
+        self._lock = threading.Lock()  # Pipelined runs share a thread
 
     def add_message(self, role: str, content: str) -> None:
         """Adds a message to the thread history.
@@ -26,27 +43,56 @@ class Thread:
             role: Message role (user or assistant)
             content: Message content
         """
-        self.messages.append({
-            "role": role,
-            "content": content,
-        })
+        with self._lock:
+            self.messages.append({
+                "role": role,
+                "content": content,
+            })
 
+    @instrumented("thread.save")
     def save(self) -> None:
-        """Saves the thread to a JSON file."""
-        path = os.path.join(self.storage_dir, f"{self.thread_id}.json")
-        with open(path, "w") as f:
-            json.dump({
-                "thread_id": self.thread_id,
-                "name": self.name,
-                "messages": self.messages,
-            }, f, indent=4)
+        """Saves the thread, passing the store only the messages added since.
+        
+        If another process saved messages to the thread since this one
+        loaded or saved it, the thread is rebased onto them and saved again.
+        Messages may be added and saved from several OS threads at once,
+        such as by pipelined runs on the same thread.
+        
+        Raises:
+            VersionConflict: If the thread still conflicts after
+                SAVE_ATTEMPTS attempts
+        """
+        with self._lock:
+            for attempt in range(SAVE_ATTEMPTS):
+                try:
+                    self.storage.save_messages(
+                        self.thread_id, self.name, self.messages, self._saved_count
+                    )
+                except VersionConflict:
+                    if attempt == SAVE_ATTEMPTS - 1:
+                        raise
+                    wait_after_conflict(attempt)
+                    self.rebase()
+                    continue
+                self._saved_count = len(self.messages)
+                return
+            
+    def rebase(self) -> None:
+        """Reloads the stored messages and appends the unsaved ones after them.
+        
+        The name of this thread is kept.
+        """
+        unsaved = self.messages[self._saved_count:]
+        loaded = self.storage.load_messages(self.thread_id)
+        stored = loaded[1] if loaded is not None else []
+        self.messages = stored + unsaved
+        self._saved_count = len(stored)
             
+    @instrumented("thread.load")
     def load(self) -> 'Thread':
-        """Loads the thread from a JSON file."""
-        path = os.path.join(self.storage_dir, f"{self.thread_id}.json")
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                data = json.load(f)
-                self.name = data["name"]
-                self.messages = data["messages"]
+        """Loads the thread from its store."""
+        loaded = self.storage.load_messages(self.thread_id)
+        if loaded is not None:
+            self.name, self.messages = loaded
+            self._saved_count = len(self.messages)
         return self
@@ -0,0 +1,630 @@
+"""
+Pluggable persistence for Thread and CrochetThread.
+
+JSONThreadStorage keeps the original layout: one {thread_id}.json file per
+thread, plus an index of thread names so listing threads does not parse
+every file. It suits a handful of threads.
+
+SQLiteThreadStorage keeps every thread in one SQLite database in WAL mode,
+for hundreds of thousands of threads. Messages, Crochet nodes and Crochet
+edges are rows in indexed tables; saving inserts only the rows added since
+the last save, and lookups by name, message range or node attributes are
+answered by the database instead of by loading threads.
+
+Both stores may be shared by several processes. Saves check a version
+first and raise VersionConflict instead of overwriting another process's
+changes: for messages the version is the number of stored messages, which
+must equal the position the save starts at, and for graphs it is the
+journal sequence number, which must precede that of the first record.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.lib.pioneer.gestarum.lib.atomic_file import (
+    Stamp,
+    VersionConflict,
+    atomic_write,
+    file_lock,
+    file_stamp,
+    write_json,
+)
+
+Message = Dict[str, str]
+
+
+class ThreadStorage(ABC):
+    """Interface of a thread store.
+    
+    Thread messages are addressed by position: save_messages() receives the
+    index of the first message not yet saved, so a store may append rather
+    than rewrite. Stores that also hold Crochet graphs implement
+    GraphStorage as well.
+    """
+
+    @abstractmethod
+    def list_threads(self) -> Dict[str, str]:
+        """Returns the name of every stored thread, keyed by thread ID."""
+
+    @abstractmethod
+    def thread_name(self, thread_id: str) -> Optional[str]:
+        """Returns the name of a stored thread, or None if it is unknown."""
+
+    @abstractmethod
+    def find_thread(self, name: str) -> Optional[str]:
+        """Returns the ID of a stored thread with the given name, if any."""
+
+    @abstractmethod
+    def load_messages(
+        self, thread_id: str, start: int = 0
+    ) -> Optional[Tuple[str, List[Message]]]:
+        """Loads a thread's name and its messages from a position on.
+        
+        Args:
+            thread_id: Thread ID
+            start: Index of the first message to return
+        
+        Returns:
+            (name, messages), or None if the thread is not stored
+        """
+
+    @abstractmethod
+    def save_messages(
+        self, thread_id: str, name: str, messages: List[Message], start: int = 0
+    ) -> None:
+        """Saves a thread's name and the messages from a position on.
+        
+        Args:
+            thread_id: Thread ID
+            name: Human-readable name of the thread
+            messages: Every message of the thread
+            start: Index of the first message not saved before
+        
+        Raises:
+            VersionConflict: If the store holds a number of messages of the
+                thread other than start
+        """
+
+    def close(self) -> None:
+        """Releases the resources of the store."""
+
+
+class GraphStorage(ABC):
+    """Interface of a store of Crochet graphs.
+    
+    Graphs are saved as the change records a CrochetThread queues ("node",
+    "update", "edge", "context" and "synced"), so a store may insert only
+    what changed.
+    """
+
+    @abstractmethod
+    def load_graph(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Loads a Crochet graph.
+        
+        Returns:
+            Dictionary with "name", "nodes" (node dictionaries in
+            chronological order), "edges" (edge dictionaries in insertion
+            order), "current_context_nodes", "journal_seq" and
+            "synced_messages" (None if never recorded), or None if the
+            graph is not stored
+        """
+
+    @abstractmethod
+    def save_graph(
+        self, thread_id: str, name: str, records: List[Dict[str, Any]]
+    ) -> None:
+        """Applies the change records of a Crochet graph.
+        
+        Args:
+            thread_id: Thread ID
+            name: Human-readable name of the thread
+            records: Records with "seq", "op" and "data", oldest first
+        
+        Raises:
+            VersionConflict: If the stored journal_seq of the graph is not
+                the one preceding the first record
+        """
+
+
+class JSONThreadStorage(ThreadStorage):
+    """Stores each thread as a JSON file in a directory.
+    
+    Thread names are kept in threads_index.jsonl, to which a line is
+    appended whenever a thread is created or renamed; the last line for an
+    ID wins. A directory written before the index existed is scanned once
+    to build it. Lines appended by other processes are read when the index
+    grows.
+    
+    Files are replaced atomically, and saves and index appends hold a file
+    lock, so processes can share the directory.
+    """
+
+    INDEX_FILE = "threads_index.jsonl"
+
+    def __init__(self, storage_dir: str = "threads"):
+        """Initialize the store.
+        
+        Args:
+            storage_dir: Directory holding the thread files
+        """
+        self.storage_dir = storage_dir
+        self.index_path = os.path.join(storage_dir, self.INDEX_FILE)
+        self._names: Optional[Dict[str, str]] = None  # Loaded on first use
+        self._index_bytes = 0  # Of the index file read into _names
+        # Thread ID -> stamp of its file when this store last read or wrote
+        # it, and the number of messages it held then
+        self._counts: Dict[str, Tuple[Stamp, int]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+    def _path(self, thread_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{thread_id}.json")
+
+    def _read_index(self) -> Dict[str, str]:
+        """Reads the name index, building it from the thread files if absent."""
+        with file_lock(self.index_path):
+            if os.path.exists(self.index_path):
+                names: Dict[str, str] = {}
+                self._read_index_lines(names, 0)
+                return names
+            names = self._scan_threads()
+            with atomic_write(self.index_path) as f:
+                for thread_id, name in names.items():
+                    f.write(json.dumps({"id": thread_id, "name": name}) + "\n")
+            self._index_bytes = os.path.getsize(self.index_path)
+            return names
+
+    def _read_index_lines(self, names: Dict[str, str], offset: int) -> None:
+        """Reads the index from a byte offset on into names.
+        
+        The caller holds the index lock, so a torn line can only be left by
+        an interrupted append; the index is truncated back to before it.
+        """
+        valid_bytes = offset
+        with open(self.index_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A torn line from an interrupted append
+                entry = json.loads(line)
+                names[entry["id"]] = entry["name"]
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self.index_path):
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        self._index_bytes = valid_bytes
+
+    def _scan_threads(self) -> Dict[str, str]:
+        """Reads the name of every thread file in the directory."""
+        names: Dict[str, str] = {}
+        for filename in sorted(os.listdir(self.storage_dir)):
+            if not filename.endswith(".json"):
+                continue
+            thread_id = filename[: -len(".json")]
+            if "." in thread_id:
+                continue  # Crochet snapshots and other sidecar files
+            loaded = self.load_messages(thread_id)
+            if loaded is not None:
+                names[thread_id] = loaded[0]
+        return names
+
+    def _index(self) -> Dict[str, str]:
+        with self._lock:
+            if self._names is None:
+                self._names = self._read_index()
+            elif os.path.getsize(self.index_path) != self._index_bytes:
+                with file_lock(self.index_path):  # Appended by another process
+                    if os.path.getsize(self.index_path) < self._index_bytes:
+                        self._names = {}
+                        self._index_bytes = 0
+                    self._read_index_lines(self._names, self._index_bytes)
+            return self._names
+
+    def list_threads(self) -> Dict[str, str]:
+        """Returns the name of every stored thread, keyed by thread ID."""
+        return dict(self._index())
+
+    def thread_name(self, thread_id: str) -> Optional[str]:
+        """Returns the name of a stored thread, or None if it is unknown."""
+        name = self._index().get(thread_id)
+        if name is None:
+            # Possibly saved through another store on the same directory
+            loaded = self.load_messages(thread_id)
+            if loaded is not None:
+                name = loaded[0]
+        return name
+
+    def find_thread(self, name: str) -> Optional[str]:
+        """Returns the ID of a stored thread with the given name, if any."""
+        for thread_id, thread_name in self._index().items():
+            if thread_name == name:
+                return thread_id
+        return None
+
+    def load_messages(
+        self, thread_id: str, start: int = 0
+    ) -> Optional[Tuple[str, List[Message]]]:
+        """Loads a thread's name and its messages from a position on."""
+        try:
+            f = open(self._path(thread_id), "r")
+        except FileNotFoundError:
+            return None
+        with f:
+            stat = os.fstat(f.fileno())  # Of the file read, even if replaced since
+            data = json.load(f)
+        if "messages" not in data:
+            return None  # A Crochet snapshot written by an older version
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        self._counts[thread_id] = (stamp, len(data["messages"]))
+        return data["name"], data["messages"][start:]
+
+    def _stored_count(self, thread_id: str) -> Optional[int]:
+        """Returns the number of stored messages, or None if there is no thread file.
+        
+        The file is only parsed if it changed since this store last read
+        or wrote it.
+        """
+        stamp = file_stamp(self._path(thread_id))
+        if stamp is None:
+            return None
+        known = self._counts.get(thread_id)
+        if known is not None and known[0] == stamp:
+            return known[1]
+        loaded = self.load_messages(thread_id)
+        return len(loaded[1]) if loaded is not None else None
+
+    def save_messages(
+        self, thread_id: str, name: str, messages: List[Message], start: int = 0
+    ) -> None:
+        """Rewrites a thread's file and records its name in the index."""
+        path = self._path(thread_id)
+        with file_lock(path):
+            stored = self._stored_count(thread_id)
+            if stored is not None and stored != start:
+                raise VersionConflict(path, start, stored)
+            write_json(path, {
+                "thread_id": thread_id,
+                "name": name,
+                "messages": messages,
+            })
+            self._counts[thread_id] = (file_stamp(path), len(messages))
+        names = self._index()
+        with self._lock:
+            if names.get(thread_id) != name:
+                with file_lock(self.index_path), open(self.index_path, "a") as f:
+                    f.write(json.dumps({"id": thread_id, "name": name}) + "\n")
+                names[thread_id] = name
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_by_name ON threads (name);
+
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (thread_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS graphs (
+    thread_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    current_context TEXT NOT NULL DEFAULT '[]',
+    journal_seq INTEGER NOT NULL DEFAULT 0,
+    synced_messages INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    thread_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    node_type TEXT NOT NULL,
+    role TEXT,
+    character_id TEXT,
+    timestamp REAL NOT NULL,
+    content TEXT NOT NULL,
+    extra TEXT,
+    PRIMARY KEY (thread_id, node_id)
+);
+CREATE INDEX IF NOT EXISTS nodes_by_time ON nodes (thread_id, timestamp);
+CREATE INDEX IF NOT EXISTS nodes_by_role ON nodes (thread_id, role, timestamp);
+CREATE INDEX IF NOT EXISTS nodes_by_character
+    ON nodes (thread_id, character_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS edges (
+    thread_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    source_id TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    edge_type TEXT NOT NULL,
+    weight REAL NOT NULL,
+    metadata TEXT,
+    PRIMARY KEY (thread_id, seq)
+);
+CREATE INDEX IF NOT EXISTS edges_by_source ON edges (thread_id, source_id);
+CREATE INDEX IF NOT EXISTS edges_by_target ON edges (thread_id, target_id);
+"""
+
+
+class SQLiteThreadStorage(ThreadStorage, GraphStorage):
+    """Stores every thread in one SQLite database in WAL mode.
+
+    WAL lets readers proceed while a save is being written, and each save
+    is one transaction, so a crash leaves either all or none of its rows.
+    The connection is shared by the threads of a process under a lock.
+    """
+    
+    def __init__(self, path: str = "threads/threads.db"):
+        """Open or create a database.
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(graphs)")}
+        if "synced_messages" not in columns:  # Databases created before it was tracked
+            self._conn.execute("ALTER TABLE graphs ADD COLUMN synced_messages INTEGER")
+        
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Runs the statements of a block in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+        
+    def list_threads(self) -> Dict[str, str]:
+        """Returns the name of every stored thread, keyed by thread ID."""
+        return dict(self._query("SELECT thread_id, name FROM threads"))
+
+    def thread_name(self, thread_id: str) -> Optional[str]:
+        """Returns the name of a stored thread, or None if it is unknown."""
+        rows = self._query("SELECT name FROM threads WHERE thread_id = ?", (thread_id,))
+        return rows[0][0] if rows else None
+
+    def find_thread(self, name: str) -> Optional[str]:
+        """Returns the ID of a stored thread with the given name, if any."""
+        rows = self._query(
+            "SELECT thread_id FROM threads WHERE name = ? ORDER BY rowid LIMIT 1", (name,)
+        )
+        return rows[0][0] if rows else None
+
+    def message_count(self, thread_id: str) -> int:
+        """Returns the number of stored messages of a thread."""
+        rows = self._query("SELECT COUNT(*) FROM messages WHERE thread_id = ?", (thread_id,))
+        return int(rows[0][0])
+
+    def load_messages(
+        self, thread_id: str, start: int = 0
+    ) -> Optional[Tuple[str, List[Message]]]:
+        """Loads a thread's name and its messages from a position on."""
+        name = self.thread_name(thread_id)
+        if name is None:
+            return None
+        rows = self._query(
+            "SELECT role, content FROM messages"
+            " WHERE thread_id = ? AND position >= ? ORDER BY position",
+            (thread_id, start),
+        )
+        return name, [{"role": role, "content": content} for role, content in rows]
+
+    def save_messages(
+        self, thread_id: str, name: str, messages: List[Message], start: int = 0
+    ) -> None:
+        """Upserts the thread's name and inserts the messages from start on."""
+        with self._transaction() as conn:
+            last = conn.execute(
+                "SELECT MAX(position) FROM messages WHERE thread_id = ?", (thread_id,)
+            ).fetchone()[0]
+            stored = last + 1 if last is not None else 0
+            if stored != start:
+                raise VersionConflict(f"{self.path}:{thread_id}", start, stored)
+            conn.execute(
+                "INSERT INTO threads (thread_id, name) VALUES (?, ?)"
+                " ON CONFLICT (thread_id) DO UPDATE SET name = excluded.name",
+                (thread_id, name),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages (thread_id, position, role, content)"
+                " VALUES (?, ?, ?, ?)",
+                (
+                    (thread_id, position, message["role"], message["content"])
+                    for position, message in enumerate(messages[start:], start)
+                ),
+            )
+
+    def load_graph(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Loads a Crochet graph; see GraphStorage.load_graph()."""
+        rows = self._query(
+            "SELECT name, current_context, journal_seq, synced_messages FROM graphs"
+            " WHERE thread_id = ?",
+            (thread_id,),
+        )
+        if not rows:
+            return None
+        name, context, journal_seq, synced_messages = rows[0]
+        nodes = []
+        for node_id, node_type, role, character_id, timestamp, content, extra in self._query(
+            "SELECT node_id, node_type, role, character_id, timestamp, content, extra"
+            " FROM nodes WHERE thread_id = ? ORDER BY timestamp",
+            (thread_id,),
+        ):
+            metadata = json.loads(extra) if extra else {}
+            if role is not None:
+                metadata["role"] = role
+            if character_id is not None:
+                metadata["character_id"] = character_id
+            nodes.append({
+                "id": node_id,
+                "content": content,
+                "type": node_type,
+                "timestamp": timestamp,
+                "metadata": metadata,
+            })
+        edges = [
+            {
+                "source_id": source_id,
+                "target_id": target_id,
+                "type": edge_type,
+                "weight": weight,
+                "metadata": json.loads(metadata) if metadata else {},
+            }
+            for source_id, target_id, edge_type, weight, metadata in self._query(
+                "SELECT source_id, target_id, edge_type, weight, metadata"
+                " FROM edges WHERE thread_id = ? ORDER BY seq",
+                (thread_id,),
+            )
+        ]
+        return {
+            "name": name,
+            "nodes": nodes,
+            "edges": edges,
+            "current_context_nodes": json.loads(context),
+            "journal_seq": journal_seq,
+            "synced_messages": synced_messages,
+        }
+
+    def save_graph(
+        self, thread_id: str, name: str, records: List[Dict[str, Any]]
+    ) -> None:
+        """Inserts the nodes and edges of the records in one transaction."""
+        node_rows = []
+        edge_rows = []
+        context = None
+        synced_messages = None
+        for record in records:
+            op, data = record["op"], record["data"]
+            if op in ("node", "update"):  # An update replaces the node's row
+                extra = dict(data["metadata"])
+                role = extra.pop("role", None)
+                character_id = extra.pop("character_id", None)
+                node_rows.append((
+                    thread_id,
+                    data["id"],
+                    data["type"],
+                    role,
+                    character_id,
+                    data["timestamp"],
+                    data["content"],
+                    json.dumps(extra) if extra else None,
+                ))
+            elif op == "edge":
+                edge_rows.append((
+                    thread_id,
+                    record["seq"],
+                    data["source_id"],
+                    data["target_id"],
+                    data["type"],
+                    data["weight"],
+                    json.dumps(data["metadata"]) if data["metadata"] else None,
+                ))
+            elif op == "context":
+                context = data
+            elif op == "synced":
+                synced_messages = data
+        last_seq = records[-1]["seq"] if records else 0
+        base_seq = records[0]["seq"] - 1 if records else None
+
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT journal_seq FROM graphs WHERE thread_id = ?", (thread_id,)
+            ).fetchall()
+            stored_seq = rows[0][0] if rows else 0
+            if base_seq is not None and stored_seq != base_seq:
+                raise VersionConflict(f"{self.path}:{thread_id}", base_seq, stored_seq)
+            conn.execute(
+                "INSERT INTO graphs (thread_id, name) VALUES (?, ?)"
+                " ON CONFLICT (thread_id) DO UPDATE SET name = excluded.name",
+                (thread_id, name),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO nodes (thread_id, node_id, node_type, role,"
+                " character_id, timestamp, content, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                node_rows,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO edges (thread_id, seq, source_id, target_id,"
+                " edge_type, weight, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                edge_rows,
+            )
+            if context is not None:
+                conn.execute(
+                    "UPDATE graphs SET current_context = ? WHERE thread_id = ?",
+                    (json.dumps(context), thread_id),
+                )
+            if synced_messages is not None:
+                conn.execute(
+                    "UPDATE graphs SET synced_messages = ? WHERE thread_id = ?",
+                    (synced_messages, thread_id),
+                )
+            if last_seq:
+                conn.execute(
+                    "UPDATE graphs SET journal_seq = MAX(journal_seq, ?) WHERE thread_id = ?",
+                    (last_seq, thread_id),
+                )
+
+    def character_nodes(
+        self, thread_id: str, character_id: str, since: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Returns a character's nodes in chronological order, from the index.
+        
+        Args:
+            thread_id: Thread ID
+            character_id: Character identifier
+            since: Only nodes with a timestamp at or after this one
+        
+        Returns:
+            Dictionaries with "id", "content" and "timestamp"
+        """
+        rows = self._query(
+            "SELECT node_id, content, timestamp FROM nodes"
+            " WHERE thread_id = ? AND character_id = ? AND timestamp >= ?"
+            " ORDER BY timestamp",
+            (thread_id, character_id, since if since is not None else float("-inf")),
+        )
+        return [
+            {"id": node_id, "content": content, "timestamp": timestamp}
+            for node_id, content, timestamp in rows
+        ]
+
+    def replies_to(self, thread_id: str, node_id: str) -> List[str]:
+        """Returns the IDs of the nodes an edge leads to from a node."""
+        return [
+            target_id
+            for (target_id,) in self._query(
+                "SELECT target_id FROM edges WHERE thread_id = ? AND source_id = ?"
+                " ORDER BY seq",
+                (thread_id, node_id),
+            )
+        ]
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,619 @@
+"""
+An ASGI server exposing Crochet conversations over HTTP.
+
+Each session ID is a conversation of its own, with a default thread named
+"Session {id}". All sessions share one AssistantManager (and with it one
+OpenAI client, thread store and rate limiter) and one pool for character
+runs. Chats run on a fixed pool of worker threads behind a bounded queue:
+requests beyond it are refused with 503 instead of piling up. Turns of one
+session run one at a time. Idle sessions beyond max_sessions are released
+from memory and reloaded from the thread store on their next request.
+
+Endpoints:
+
+- POST /sessions/{id}/messages with {"message", "character_id"?}: the
+  responses of the characters, as CrochetAssistantClient.chat() returns them
+- POST /sessions/{id}/messages/stream: the same as server-sent events:
+  "delta" events with each character's text as it is generated, one
+  "response" event per character as it completes, then "done" (or "error")
+- GET /sessions/{id}/history?limit=&character_id=: the conversation
+- GET /health: readiness and load
+- GET /metrics: request counts, latencies, sessions and workers, and the
+  per-stage latencies of the turn pipeline if instrumentation is enabled
+- GET /metrics/prometheus: the per-stage latency histograms in the
+  Prometheus text format
+
+The app is plain ASGI without a framework; scripts/serve.py runs it under
+uvicorn when that is installed.
+"""
+
+import asyncio
+import contextlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List,
+    Optional, Tuple,
+)
+from urllib.parse import parse_qs
+
+from src.lib.pioneer.assistant_client_crochet import CrochetAssistantClient
+from src.lib.pioneer.gestarum.lib.assistant_manager import AssistantManager
+from src.lib.pioneer.gestarum.lib.crochet_thread import MemoryBudget
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+from src.lib.pioneer.gestarum.lib.environment import default_client, load_env
+from src.lib.pioneer.gestarum.lib.instrumentation import get_instrumentation, observe
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+from src.lib.pioneer.gestarum.lib.thread_storage import ThreadStorage
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+Headers = List[Tuple[bytes, bytes]]
+
+MAX_BODY_BYTES = 1 << 20
+
+_SESSION_ID = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+_SESSION_ROUTE = re.compile(
+    r"/sessions/(?P<session_id>[^/]+)/(?P<action>messages/stream|messages|history)"
+)
+
+
+class HTTPError(Exception):
+    """An error answered with a JSON body {"error": message}."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Headers] = None):
+        """Initialize the error.
+        
+        Args:
+            status: HTTP status code
+            message: Error message for the response body
+            headers: Optional extra response headers
+        """
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or []
+
+
+class Session:
+    """A conversation and the locks that serialize its turns."""
+
+    __slots__ = ("session_id", "client", "lock", "turn_lock", "users")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.client: Optional[CrochetAssistantClient] = None  # Created on first use
+        self.lock = asyncio.Lock()
+        # Held by the worker using the client, so a budget shared with other
+        # sessions does not shrink its Crochet thread in the middle of a turn
+        self.turn_lock = threading.Lock()
+        self.users = 0  # Requests holding or waiting for the lock
+
+
+class ServerMetrics:
+    """Request counts and recent latencies of a server, by route."""
+
+    def __init__(self, window: int = 1000):
+        """Initialize the metrics.
+        
+        Args:
+            window: Number of most recent latencies kept per route
+        """
+        self.started_at = time.time()
+        self.window = window
+        self.requests: Dict[str, int] = {}  # "route status" -> count
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.rejected = 0
+        self.sessions_created = 0
+        self.sessions_released = 0
+
+    def record(self, route: str, status: int, seconds: float) -> None:
+        """Counts a finished request and keeps its latency."""
+        key = f"{route} {status}"
+        self.requests[key] = self.requests.get(key, 0) + 1
+        self.latencies.setdefault(route, deque(maxlen=self.window)).append(seconds)
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns latency percentiles of the recent requests of each route."""
+        summary = {}
+        for route, samples in self.latencies.items():
+            ordered = sorted(samples)
+            summary[route] = {
+                "count": len(ordered),
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return summary
+
+
+class ChatServer:
+    """ASGI application serving many concurrent Crochet conversations.
+    
+    Session bookkeeping happens on the event loop; only chats, session
+    creation and history reads run on the worker threads.
+    """
+
+    def __init__(
+        self,
+        assistant_name: str,
+        config_directory: str = "src/lib/pioneer/config",
+        client: Optional["OpenAI"] = None,
+        thread_storage: Optional[ThreadStorage] = None,
+        character_ids: Optional[List[str]] = None,
+        max_workers: int = 8,
+        max_queue: int = 64,
+        max_sessions: int = 1000,
+        run_workers: int = 16,
+        context_token_budget: Optional[int] = None,
+        response_cache: Optional[ResponseCache] = None,
+        doc_index: Optional[DocIndex] = None,
+        memory_budget: Optional[int] = None,
+        process_budget: Optional[MemoryBudget] = None,
+        compact_edges: bool = False,
+    ):
+        """Initialize the server.
+        
+        Args:
+            assistant_name: Name of the assistant configuration to serve
+            config_directory: Path to the directory containing assistant configurations
+            client: Optional preconfigured OpenAI client (for example an
+                offline stand-in); built from OPENAI_API_KEY if omitted
+            thread_storage: Optional thread store shared by all sessions
+            character_ids: Optional list of character IDs to use for responses
+            max_workers: Number of worker threads running chats
+            max_queue: Number of requests that may wait for a worker; more
+                are refused with 503
+            max_sessions: Number of sessions kept in memory; the least
+                recently used idle ones are released beyond it
+            run_workers: Size of the pool running character runs
+            context_token_budget: Optional token budget of the context sent
+                with each run (see CrochetAssistantClient)
+            response_cache: Optional on-disk response cache
+            doc_index: Optional local index of the notes
+            memory_budget: Optional byte budget of each session's Crochet thread
+            process_budget: Optional byte budget shared by all sessions; a
+                session's thread is only shrunk between its turns
+            compact_edges: Store the edges of each session's Crochet thread
+                in array-backed columns
+        """
+        self.assistant_name = assistant_name
+        self.config_directory = config_directory
+        self.client = client
+        self.thread_storage = thread_storage
+        self.character_ids = character_ids or ["shannon_default"]
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_sessions = max_sessions
+        self.context_token_budget = context_token_budget
+        self.response_cache = response_cache
+        self.doc_index = doc_index
+        self.memory_budget = memory_budget
+        self.process_budget = process_budget
+        self.compact_edges = compact_edges
+
+        self.manager: Optional[AssistantManager] = None  # Loaded at startup
+        self.workers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat")
+        self.run_executor = ThreadPoolExecutor(max_workers=run_workers, thread_name_prefix="run")
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()  # Least recent first
+        self.metrics = ServerMetrics()
+        self._admitted = 0  # Requests running or waiting for a worker
+        self._startup_lock = asyncio.Lock()
+        self._create_lock = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handles an ASGI connection."""
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        route = self._route_label(scope["method"], scope["path"])
+        start = time.perf_counter()
+        status = 500
+        try:
+            status = await self._dispatch(scope, receive, send)
+        except HTTPError as e:
+            status = e.status
+            await self._send_json(send, e.status, {"error": str(e)}, e.headers)
+        except Exception as e:
+            print(f"Error handling {scope['method']} {scope['path']}: {e}")
+            await self._send_json(send, 500, {"error": "Internal server error"})
+        finally:
+            self.metrics.record(route, status, time.perf_counter() - start)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        """Loads the assistant at startup and releases everything at shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self) -> None:
+        """Loads the assistant configurations, once.
+        
+        Raises:
+            ValueError: If no client is given and OPENAI_API_KEY is not set
+        """
+        if self.manager is not None:
+            return
+        async with self._startup_lock:
+            if self.manager is None:
+                self.manager = await self._run(self._load_manager)
+
+    def _load_manager(self) -> AssistantManager:
+        """Builds the shared manager and materializes the served assistant."""
+        load_env()
+        client = self.client if self.client is not None else default_client()
+        manager = AssistantManager(
+            client,
+            config_directory=self.config_directory,
+            response_cache=self.response_cache,
+            doc_index=self.doc_index,
+            thread_storage=self.thread_storage,
+        )
+        manager.get_assistant_by_name(self.assistant_name)
+        return manager
+
+    async def shutdown(self) -> None:
+        """Releases every session and stops the worker pools."""
+        for session in self.sessions.values():
+            if session.client is not None:
+                session.client.close()
+        self.sessions.clear()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.workers.shutdown)
+        await loop.run_in_executor(None, self.run_executor.shutdown)
+        if self.thread_storage is not None:
+            self.thread_storage.close()
+
+    @staticmethod
+    def _route_label(method: str, path: str) -> str:
+        """Returns the route of a request with the session ID left out."""
+        match = _SESSION_ROUTE.fullmatch(path)
+        if match is not None:
+            return f"{method} /sessions/{{id}}/{match['action']}"
+        if path in ("/health", "/metrics", "/metrics/prometheus"):
+            return f"{method} {path}"
+        return "other"
+
+    async def _dispatch(self, scope: Scope, receive: Receive, send: Send) -> int:
+        """Routes a request to its handler.
+        
+        Returns:
+            Status code of the response
+        """
+        method, path = scope["method"], scope["path"]
+        if path in ("/health", "/metrics"):
+            if method != "GET":
+                raise HTTPError(405, "Method not allowed")
+            data = self.health() if path == "/health" else self.metrics_snapshot()
+            await self._send_json(send, 200, data)
+            return 200
+        if path == "/metrics/prometheus":
+            if method != "GET":
+                raise HTTPError(405, "Method not allowed")
+            body = get_instrumentation().to_prometheus().encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return 200
+
+        match = _SESSION_ROUTE.fullmatch(path)
+        if match is None:
+            raise HTTPError(404, "Not found")
+        session_id, action = match["session_id"], match["action"]
+        if not _SESSION_ID.fullmatch(session_id):
+            raise HTTPError(400, "Session IDs are 1 to 64 letters, digits, '_', '-' or '.'")
+        if method != ("GET" if action == "history" else "POST"):
+            raise HTTPError(405, "Method not allowed")
+        await self.startup()
+
+        if action == "history":
+            data = await self._history(session_id, scope.get("query_string", b""))
+            await self._send_json(send, 200, data)
+            return 200
+        message, character_id = self._parse_message(await self._read_body(receive))
+        if action == "messages/stream":
+            await self._chat_stream(session_id, message, character_id, send)
+            return 200
+        responses = await self._chat(session_id, message, character_id)
+        await self._send_json(send, 200, {"session_id": session_id, "responses": responses})
+        return 200
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        """Reads a request body of at most MAX_BODY_BYTES."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, "Request body too large")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    def _parse_message(self, body: bytes) -> Tuple[str, Optional[str]]:
+        """Validates a message request body.
+        
+        Returns:
+            The message and the optional character ID
+        """
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        message = data.get("message") if isinstance(data, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "Body must have a non-empty \"message\"")
+        character_id = data.get("character_id")
+        if character_id is not None and character_id not in self.character_ids:
+            raise HTTPError(400, f"Unknown character {character_id!r}")
+        return message, character_id
+
+    @staticmethod
+    async def _send_json(
+        send: Send, status: int, data: Any, headers: Optional[Headers] = None
+    ) -> None:
+        body = json.dumps(data).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                *(headers or []),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs a blocking call on a worker thread.
+        
+        The time the call waits for a worker is recorded as the stage
+        server.queue.
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        
+        def run() -> Any:
+            observe("server.queue", time.perf_counter() - submitted)
+            return func(*args)
+        
+        return await loop.run_in_executor(self.workers, run)
+
+    async def _run_turn(self, session: Session, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs func on a worker thread holding the session's turn lock."""
+        def locked() -> Any:
+            with session.turn_lock:
+                return func(*args)
+        
+        return await self._run(locked)
+
+    @contextlib.asynccontextmanager
+    async def _admission(self) -> AsyncIterator[None]:
+        """Admits a request if a worker or a queue slot is free.
+        
+        Raises:
+            HTTPError: 503 if the queue is full
+        """
+        if self._admitted >= self.max_workers + self.max_queue:
+            self.metrics.rejected += 1
+            raise HTTPError(503, "Server busy", [(b"retry-after", b"1")])
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._admitted -= 1
+
+    @contextlib.asynccontextmanager
+    async def _session(
+        self, session_id: str
+    ) -> AsyncIterator[Tuple[Session, CrochetAssistantClient]]:
+        """Holds a session's lock and yields it with its client, created if needed."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(session_id)
+        else:
+            self.sessions.move_to_end(session_id)
+        session.users += 1  # Before anything yields, so it is not released
+        try:
+            self._release_idle()
+            async with session.lock:
+                client = session.client
+                if client is None:
+                    client = session.client = await self._run_turn(
+                        session, self._new_client, session
+                    )
+                    self.metrics.sessions_created += 1
+                yield session, client
+        finally:
+            session.users -= 1
+
+    def _new_client(self, session: Session) -> CrochetAssistantClient:
+        """Creates the client of a session on a worker thread."""
+        manager = self.manager
+        if manager is None:
+            raise HTTPError(503, "Server is starting")
+        if manager.get_assistant_by_name(self.assistant_name) is None:
+            with self._create_lock:  # The first session creates the assistant
+                return self._build_client(manager, session)
+        return self._build_client(manager, session)
+
+    def _build_client(
+        self, manager: AssistantManager, session: Session
+    ) -> CrochetAssistantClient:
+        return CrochetAssistantClient(
+            self.assistant_name,
+            manager=manager,
+            character_ids=self.character_ids,
+            thread_name=f"Session {session.session_id}",
+            executor=self.run_executor,
+            context_token_budget=self.context_token_budget,
+            memory_budget=self.memory_budget,
+            process_budget=self.process_budget,
+            budget_lock=session.turn_lock,
+            compact_edges=self.compact_edges,
+        )
+
+    def _release_idle(self) -> None:
+        """Releases the least recently used idle sessions beyond max_sessions."""
+        excess = len(self.sessions) - self.max_sessions
+        for session_id in list(self.sessions):
+            if excess <= 0:
+                break
+            session = self.sessions[session_id]
+            if session.users:
+                continue
+            del self.sessions[session_id]
+            if session.client is not None:
+                with session.turn_lock:  # Only a budget update can hold it now
+                    session.client.close()
+                self.metrics.sessions_released += 1
+            excess -= 1
+
+    async def _chat(
+        self, session_id: str, message: str, character_id: Optional[str]
+    ) -> Dict[str, Any]:
+        """Runs one turn of a session and returns the responses."""
+        async with self._admission(), self._session(session_id) as (session, client):
+            responses: Dict[str, Any] = await self._run_turn(
+                session, client.chat, message, character_id
+            )
+        return responses
+
+    async def _chat_stream(
+        self, session_id: str, message: str, character_id: Optional[str], send: Send
+    ) -> None:
+        """Runs one turn of a session, streaming responses as server-sent events.
+        
+        The turn runs to completion and is saved even if the client
+        disconnects.
+        """
+        async with self._admission(), self._session(session_id) as (session, client):
+            loop = asyncio.get_running_loop()
+            events: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+
+            def emit(event: Tuple[str, Dict[str, Any]]) -> None:
+                loop.call_soon_threadsafe(events.put_nowait, event)
+
+            def produce() -> None:
+                observe("server.queue", time.perf_counter() - submitted)
+                with session.turn_lock:
+                    try:
+                        for char_id, event in client.chat_stream(message, character_id):
+                            if event["type"] == "delta":
+                                emit(("delta", {
+                                    "character_id": char_id,
+                                    "delta": event["delta"],
+                                    "node_id": event["node_id"],
+                                }))
+                            else:
+                                emit(("response", {
+                                    "character_id": char_id,
+                                    "content": event["content"],
+                                    "node_id": event["node_id"],
+                                }))
+                    except Exception as e:
+                        print(f"Error streaming session {session_id}: {e}")
+                        emit(("error", {"error": str(e)}))
+                    else:
+                        emit(("done", {"session_id": session_id}))
+
+            submitted = time.perf_counter()
+            turn = loop.run_in_executor(self.workers, produce)
+            try:
+                await send({
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream"),
+                        (b"cache-control", b"no-cache"),
+                    ],
+                })
+                while True:
+                    event, data = await events.get()
+                    await send({
+                        "type": "http.response.body",
+                        "body": f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"),
+                        "more_body": event in ("delta", "response"),
+                    })
+                    if event not in ("delta", "response"):
+                        break
+            finally:
+                await turn  # Keep the session locked until the turn is saved
+
+    async def _history(self, session_id: str, query_string: bytes) -> Dict[str, Any]:
+        """Returns a session's conversation."""
+        params = parse_qs(query_string.decode("latin-1"))
+        try:
+            limit = int(params["limit"][0]) if "limit" in params else None
+        except ValueError:
+            raise HTTPError(400, "limit must be an integer")
+        character_id = params.get("character_id", [None])[0]
+        async with self._admission(), self._session(session_id) as (session, client):
+            messages = await self._run_turn(
+                session, client.get_conversation_history, character_id, limit
+            )
+        return {"session_id": session_id, "messages": messages}
+
+    def health(self) -> Dict[str, Any]:
+        """Returns readiness and current load."""
+        return {
+            "status": "ok" if self.manager is not None else "starting",
+            "sessions": len(self.sessions),
+            "in_flight": self._admitted,
+            "capacity": self.max_workers + self.max_queue,
+        }
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Returns the server's counters, latencies and resource use."""
+        return {
+            "uptime_s": time.time() - self.metrics.started_at,
+            "requests": dict(self.metrics.requests),
+            "latency": self.metrics.latency_summary(),
+            "rejected": self.metrics.rejected,
+            "sessions": {
+                "active": len(self.sessions),
+                "busy": sum(session.users > 0 for session in self.sessions.values()),
+                "created": self.metrics.sessions_created,
+                "released": self.metrics.sessions_released,
+            },
+            "workers": {
+                "max": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._admitted,
+            },
+            "memory_bytes": (
+                self.process_budget.total_bytes if self.process_budget is not None else None
+            ),
+            "stages": get_instrumentation().to_json(),
+        }
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from src.lib.pioneer.gestarum.lib.assistant_configuration import AssistantConfiguration
+from src.lib.pioneer.gestarum.lib.crochet_thread import CrochetThread
+from src.lib.pioneer.gestarum.lib.offline_openai import OfflineBackend, OfflineOpenAI
+
+
+@pytest.fixture
+def offline_client() -> OfflineOpenAI:
+    """An offline OpenAI stand-in that answers at once."""
+    return OfflineOpenAI(OfflineBackend(latency=0.0, run_duration=0.0))
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Builds assistant configurations rooted in the test's directory."""
+
+    def make(name: str = "test_assistant", **kwargs) -> AssistantConfiguration:
+        return AssistantConfiguration(
+            name=name,
+            instructions="Test assistant",
+            storage_dir=os.path.join(tmp_path, "config"),
+            threads_dir=os.path.join(tmp_path, "threads"),
+            file_dir=os.path.join(tmp_path, "files"),
+            **kwargs,
+        )
+
+    return make
+
+
+@pytest.fixture
+def open_thread(tmp_path):
+    """Loads the journaled thread "t1" stored in the test's directory."""
+
+    def load() -> CrochetThread:
+        return CrochetThread(
+            "t1", "Test", storage_dir=str(tmp_path), journal=True
+        ).load()
+
+    return load
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from src.lib.pioneer.gestarum.lib.assistant import Assistant
+from src.lib.pioneer.gestarum.lib.bulk_runner import (
+    BulkRunner,
+    load_checkpoint,
+    read_prompts,
+)
+
+
+@pytest.fixture
+def runner(offline_client, make_config):
+    return BulkRunner(Assistant(offline_client, make_config()), pool_size=2)
+
+
+def read_results(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rerun_resumes_after_answered_prompts(runner, tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    prompts = [{"id": str(i), "prompt": f"Question {i}"} for i in range(4)]
+    runner.run(prompts[:2], output)
+
+    summary = runner.run(prompts, output)
+
+    assert (summary["ok"], summary["skipped"]) == (2, 2)
+    assert sorted(result["id"] for result in read_results(output)) == [
+        "0",
+        "1",
+        "2",
+        "3",
+    ]
+
+
+def test_failed_prompts_are_retried_on_rerun(runner, tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"id": "0", "status": "ok", "response": "Done"})
+        + "\n"
+        + json.dumps({"id": "1", "status": "error", "error": "boom"})
+        + "\n"
+    )
+
+    summary = runner.run(
+        [{"id": "0", "prompt": "A"}, {"id": "1", "prompt": "B"}], str(output)
+    )
+
+    assert (summary["ok"], summary["skipped"]) == (1, 1)
+    assert load_checkpoint(str(output)) == {"0", "1"}
+
+
+def test_partial_last_result_is_truncated(tmp_path):
+    output = tmp_path / "results.jsonl"
+    complete = json.dumps({"id": "0", "status": "ok", "response": "Done"}) + "\n"
+    output.write_text(complete + '{"id": "1", "status": "o')
+
+    assert load_checkpoint(str(output)) == {"0"}
+    assert output.read_text() == complete
+
+
+def test_run_without_resume_overwrites_results(runner, tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    prompts = [{"id": "0", "prompt": "Question"}]
+    runner.run(prompts, output)
+
+    summary = runner.run(prompts, output, resume=False)
+
+    assert (summary["ok"], summary["skipped"]) == (1, 0)
+    assert len(read_results(output)) == 1
+
+
+def test_read_prompts_numbers_lines_without_ids(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    path.write_text(
+        '{"id": "q1", "prompt": "First"}\n"Second"\nnot json\n{"no": "prompt"}\n'
+    )
+
+    assert list(read_prompts(str(path))) == [
+        {"id": "q1", "prompt": "First"},
+        {"id": "2", "prompt": "Second"},
+    ]
@@ -0,0 +1,70 @@
+import os
+
+
+def test_journal_replays_changes_after_snapshot(open_thread):
+    thread = open_thread()
+    question = thread.add_message("user", "What is entropy?")
+    thread.add_character_response("shannon", "A measure of uncertainty.", [question])
+    thread.compact()
+    follow_up = thread.add_message("user", "And redundancy?")
+    thread.save()
+
+    loaded = open_thread()
+
+    assert list(loaded.nodes) == list(thread.nodes)
+    assert len(loaded.edges) == len(thread.edges)
+    assert loaded.current_context_nodes == [follow_up]
+    assert loaded.nodes[follow_up].content == "And redundancy?"
+
+
+def test_journal_records_covered_by_snapshot_are_not_replayed(open_thread):
+    thread = open_thread()
+    thread.add_message("user", "Once")
+    thread.save()
+    with open(thread.journal_path, "r") as f:
+        journal = f.read()
+    thread.compact()
+    # A crash between writing the snapshot and truncating the journal
+    with open(thread.journal_path, "w") as f:
+        f.write(journal)
+
+    loaded = open_thread()
+
+    assert len(loaded.nodes) == 1
+
+
+def test_torn_journal_record_is_discarded_and_truncated(open_thread):
+    thread = open_thread()
+    thread.add_message("user", "Complete")
+    thread.save()
+    complete_size = os.path.getsize(thread.journal_path)
+    with open(thread.journal_path, "a") as f:
+        f.write('{"seq": 99, "op": "node", "data": {"id": "to')
+
+    loaded = open_thread()
+
+    assert [node.content for node in loaded.nodes.values()] == ["Complete"]
+    assert os.path.getsize(thread.journal_path) == complete_size
+
+    loaded.add_message("user", "After the crash")
+    loaded.save()
+    assert [node.content for node in open_thread().nodes.values()] == [
+        "Complete",
+        "After the crash",
+    ]
+
+
+def test_unterminated_final_record_counts_as_torn(open_thread):
+    thread = open_thread()
+    first = thread.add_message("user", "First")
+    second = thread.add_message("user", "Second")  # Its context record comes last
+    thread.save()
+    with open(thread.journal_path, "rb") as f:
+        data = f.read()
+    with open(thread.journal_path, "wb") as f:
+        f.write(data.rstrip(b"\n"))
+
+    loaded = open_thread()
+
+    assert list(loaded.nodes) == [first, second]
+    assert loaded.current_context_nodes == [first]
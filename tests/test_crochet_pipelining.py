@@ -0,0 +1,133 @@
+from src.lib.pioneer.assistant_client_crochet import CrochetAssistantClient
+from src.lib.pioneer.gestarum.lib.crochet_thread import CrochetThread
+
+
+def test_provisional_response_is_finalized_in_place(open_thread):
+    thread = open_thread()
+    prompt = thread.add_message("user", "What is entropy?")
+    node_id = thread.add_character_response(
+        "shannon", "A meas", [prompt], provisional=True
+    )
+    assert thread.nodes[node_id].metadata["provisional"] is True
+
+    thread.update_node_content(node_id, "A measure of", final=False)
+    thread.update_node_content(node_id, "A measure of uncertainty.")
+    thread.save()
+
+    node = open_thread().nodes[node_id]
+    assert node.content == "A measure of uncertainty."
+    assert "provisional" not in node.metadata
+    assert node.metadata["character_id"] == "shannon"
+
+
+def test_interrupted_response_keeps_incomplete_marker(open_thread):
+    thread = open_thread()
+    prompt = thread.add_message("user", "What is entropy?")
+    node_id = thread.add_character_response(
+        "shannon", "A meas", [prompt], provisional=True
+    )
+
+    thread.update_node_content(node_id, "A meas", metadata={"incomplete": True})
+    thread.save()
+
+    metadata = open_thread().nodes[node_id].metadata
+    assert metadata["incomplete"] is True
+    assert "provisional" not in metadata
+
+
+def test_provisional_response_survives_shrinking(tmp_path):
+    thread = CrochetThread("t1", "Test", storage_dir=str(tmp_path), hot_nodes=0).load()
+    for turn in range(5):
+        thread.add_message("user", f"Question {turn}")
+    node_id = thread.add_character_response(
+        "shannon", "Streaming", [next(iter(thread.nodes))], provisional=True
+    )
+    thread.add_message("user", "Latest")
+
+    thread.shrink(0)
+
+    assert node_id in thread.nodes
+    assert thread.summary_ids()
+
+    thread.update_node_content(node_id, "Streamed")
+    thread.shrink(0)
+
+    assert node_id not in thread.nodes
+
+
+def test_response_before_prompt_is_bound_by_correlation_id(open_thread):
+    thread = open_thread()
+    early = thread.bind_response("c1", "alice", "Arrived first")
+    assert thread.unbound_responses() == {"c1": [early]}
+
+    prompt = thread.submit_prompt("c1", "The prompt", expected_responses=2)
+    late = thread.bind_response("c1", "bob", "Arrived second")
+
+    assert thread.unbound_responses() == {}
+    assert set(thread.get_descendants(prompt)) == {early, late}
+
+
+def test_buffered_response_is_bound_after_reload(open_thread):
+    thread = open_thread()
+    early = thread.bind_response("c1", "alice", "Arrived first")
+    thread.save()
+
+    loaded = open_thread()
+    assert loaded.unbound_responses() == {"c1": [early]}
+    prompt = loaded.submit_prompt("c1", "The prompt")
+
+    assert loaded.get_descendants(prompt) == [early]
+
+
+def test_responses_go_to_their_own_prompts(open_thread):
+    thread = open_thread()
+    first = thread.submit_prompt("c1", "First")
+    second = thread.submit_prompt("c2", "Second")
+
+    to_second = thread.bind_response("c2", "alice", "For the second")
+    to_first = thread.bind_response("c1", "alice", "For the first")
+
+    assert thread.get_descendants(first) == [to_first]
+    assert thread.get_descendants(second) == [to_second]
+
+
+def test_cancelled_response_lowers_expected_count(open_thread):
+    thread = open_thread()
+    prompt = thread.submit_prompt("c1", "Prompt", expected_responses=2)
+    thread.bind_response("c1", "alice", "Only answer")
+    thread.cancel_response("c1")
+    thread.save()
+
+    assert open_thread().nodes[prompt].metadata["expected_responses"] == 1
+    # A later response with the same ID no longer belongs to the answered prompt
+    late = thread.bind_response("c1", "bob", "Too late")
+    assert thread.unbound_responses() == {"c1": [late]}
+
+
+def test_client_binds_pipelined_responses_to_their_prompts(
+    tmp_path, monkeypatch, offline_client
+):
+    monkeypatch.chdir(tmp_path)
+    client = CrochetAssistantClient(
+        "test_assistant",
+        config_directory=str(tmp_path / "config"),
+        character_ids=["alice", "bob"],
+        client=offline_client,
+    )
+    try:
+        correlation_ids = [client.submit(f"Question {turn}") for turn in range(3)]
+        results = list(client.results())
+        graph = client.crochet_threads[client.thread_id]
+    finally:
+        client.close()
+
+    assert sorted(correlation_id for correlation_id, _, _ in results) == sorted(
+        correlation_ids * 2
+    )
+    for correlation_id, character_id, response in results:
+        node = graph.nodes[response["node_id"]]
+        assert node.metadata["correlation_id"] == correlation_id
+        assert node.character_id == character_id
+        prompt_id = graph.get_ancestors(node.id)[0]
+        assert graph.nodes[prompt_id].metadata["correlation_id"] == correlation_id
+    assert graph.unbound_responses() == {}
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from src.lib.pioneer.gestarum.lib.doc_index import DocIndex
+
+
+@pytest.fixture
+def vault(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / ".obsidian").mkdir(parents=True)
+    (docs / ".obsidian" / "ignored.md").write_text("entropy " * 50)
+    (docs / "Entropy.md").write_text(
+        "# Entropy\n\nEntropy measures the uncertainty of a source.\n"
+    )
+    (docs / "Channels.md").write_text(
+        "# Capacity\n\nA noisy channel has a capacity below which coding works.\n"
+    )
+    return docs
+
+
+def generations(index_dir):
+    return sorted(name for name in os.listdir(index_dir) if name.startswith("gen-"))
+
+
+def test_search_ranks_matching_passages_first(vault, tmp_path):
+    index = DocIndex.build(str(vault), str(tmp_path / "index"))
+    try:
+        results = index.search("channel capacity", k=5)
+    finally:
+        index.close()
+
+    assert [result["path"] for result in results] == ["Channels.md"]
+    assert results[0]["heading"] == "Capacity"
+    assert "noisy channel" in results[0]["text"]
+
+
+def test_unchanged_vault_is_not_rewritten(vault, tmp_path, capsys):
+    index_dir = str(tmp_path / "index")
+    DocIndex.build(str(vault), index_dir).close()
+    capsys.readouterr()
+
+    index = DocIndex.build(str(vault), index_dir)
+    index.close()
+
+    assert capsys.readouterr().out == ""
+    assert generations(index_dir) == [index.generation]
+
+
+def test_rebuild_swaps_generations_under_open_readers(vault, tmp_path):
+    index_dir = str(tmp_path / "index")
+    first = DocIndex.build(str(vault), index_dir)
+    (vault / "Entropy.md").write_text(
+        "# Entropy\n\nRedundancy is what entropy leaves.\n"
+    )
+    second = DocIndex.build(str(vault), index_dir)
+    try:
+        assert second.generation != first.generation
+        assert second.search("redundancy")[0]["path"] == "Entropy.md"
+        assert first.search("uncertainty")[0]["path"] == "Entropy.md"
+    finally:
+        first.close()
+        second.close()
+
+    (vault / "Channels.md").unlink()
+    third = DocIndex.build(str(vault), index_dir)
+    try:
+        assert third.search("capacity") == []
+    finally:
+        third.close()
+    # Only the generation replaced last is kept for late readers
+    assert generations(index_dir) == [second.generation, third.generation]
+
+
+def test_missing_index_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        DocIndex(str(tmp_path))
+
+
+def test_note_without_text_is_found_by_its_title(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "Redundancy.md").write_text("")
+
+    index = DocIndex.build(str(docs), str(tmp_path / "index"))
+    try:
+        (result,) = index.search("redundancy")
+    finally:
+        index.close()
+
+    assert (result["path"], result["text"]) == ("Redundancy.md", "")
@@ -0,0 +1,102 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from src.lib.pioneer.gestarum.lib import file_management
+from src.lib.pioneer.gestarum.lib.file_management import FileManagement
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Gives every reference its own, later time."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(
+        file_management, "time", SimpleNamespace(time=lambda: float(next(ticks)))
+    )
+
+
+@pytest.fixture
+def notes(tmp_path):
+    def write(name, content=None):
+        path = tmp_path / name
+        path.write_text(content if content is not None else f"Notes on {name}")
+        return str(path)
+
+    return write
+
+
+def test_same_content_is_uploaded_once(offline_client, tmp_path, notes):
+    files = FileManagement(offline_client, storage_dir=str(tmp_path / "files"))
+
+    (first,) = files.upload_files([notes("a.md", "Entropy")])
+    (second,) = files.upload_files([notes("b.md", "Entropy")])
+
+    assert first == second
+    assert list(offline_client.backend.files) == [first]
+
+
+def test_least_recently_referenced_file_is_evicted(offline_client, tmp_path, notes):
+    files = FileManagement(
+        offline_client, storage_dir=str(tmp_path / "files"), max_files=2
+    )
+    old, other = files.upload_files([notes("old.md"), notes("other.md")])
+    files.touch([old], owner="shannon")
+
+    (new,) = files.upload_files([notes("new.md")])
+
+    assert files.uploaded_files == [old, new]
+    assert set(offline_client.backend.files) == {old, new}
+    assert files.files[old]["owners"] == ["shannon"]
+    # Records are shared with managers reading the same directory
+    assert FileManagement(
+        offline_client, storage_dir=str(tmp_path / "files")
+    ).uploaded_files == [old, new]
+
+
+def test_files_referenced_by_the_upload_are_not_evicted(
+    offline_client, tmp_path, notes
+):
+    files = FileManagement(
+        offline_client, storage_dir=str(tmp_path / "files"), max_files=2
+    )
+    old, other = files.upload_files([notes("old.md"), notes("other.md")])
+
+    file_ids = files.upload_files([notes("old.md"), notes("new.md")])
+
+    assert file_ids[0] == old
+    assert set(files.files) == set(file_ids)
+    assert other not in offline_client.backend.files
+
+
+def test_file_deleted_elsewhere_only_loses_its_record(offline_client, tmp_path, notes):
+    files = FileManagement(offline_client, storage_dir=str(tmp_path / "files"))
+    gone, kept = files.upload_files([notes("gone.md"), notes("kept.md")])
+    del offline_client.backend.files[gone]
+
+    files.delete_oldest_files(keep_latest=1)
+
+    assert files.uploaded_files == [kept]
+
+
+def test_content_uploaded_elsewhere_meanwhile_is_kept_once(
+    offline_client, tmp_path, notes, monkeypatch
+):
+    storage_dir = str(tmp_path / "files")
+    files = FileManagement(offline_client, storage_dir=storage_dir)
+    other = FileManagement(offline_client, storage_dir=storage_dir)
+    create = offline_client.files.create
+    elsewhere = []
+
+    def create_while_other_uploads(**kwargs):
+        monkeypatch.setattr(offline_client.files, "create", create)
+        # Would deadlock if the records were locked during the upload
+        elsewhere.extend(other.upload_files([notes("copy.md", "Entropy")]))
+        return create(**kwargs)
+
+    monkeypatch.setattr(offline_client.files, "create", create_while_other_uploads)
+    (file_id,) = files.upload_files([notes("a.md", "Entropy")])
+
+    assert [file_id] == elsewhere
+    assert list(offline_client.backend.files) == [file_id]
+    assert files.uploaded_files == [file_id]
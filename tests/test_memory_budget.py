@@ -0,0 +1,119 @@
+import gc
+import os
+import threading
+
+from src.lib.pioneer.gestarum.lib.crochet_thread import CrochetThread, MemoryBudget
+
+
+def budgeted_thread(storage_dir, **kwargs) -> CrochetThread:
+    return CrochetThread(
+        "t1", "Test", storage_dir=str(storage_dir), journal=True, hot_nodes=4, **kwargs
+    ).load()
+
+
+def spill_files(storage_dir):
+    return sorted(name for name in os.listdir(storage_dir) if name.endswith(".spill"))
+
+
+def fill(thread: CrochetThread, messages: int, size: int = 200) -> None:
+    for turn in range(messages):
+        thread.add_message("user", f"Message {turn} " + "x" * size)
+
+
+def test_thread_over_budget_collapses_and_reads_back(tmp_path):
+    thread = budgeted_thread(tmp_path, memory_budget=4000)
+    fill(thread, 40)
+
+    assert len(thread.nodes) < 20
+    (summary_id,) = thread.summary_ids()
+    collapsed = thread.summarized_nodes(summary_id)
+    assert [node["content"][:10] for node in collapsed[:2]] == [
+        "Message 0 ",
+        "Message 1 ",
+    ]
+
+    restored = thread.expand(summary_id)  # Nested summaries stay collapsed
+    assert summary_id not in thread.nodes
+    messages = [node_id for node_id in restored if node_id not in thread.summary_ids()]
+    assert messages and set(messages) <= {node["id"] for node in collapsed}
+    assert all(node_id in thread.nodes for node_id in restored)
+
+
+def test_instances_sharing_a_thread_keep_their_own_spill(tmp_path):
+    first = budgeted_thread(tmp_path, memory_budget=4000)
+    fill(first, 40)
+    first.save()
+    spilled = os.path.getsize(first.spill_path)
+
+    second = budgeted_thread(tmp_path, memory_budget=1500)
+    fill(second, 5, size=300)
+    second.save()
+
+    assert second.spill_path != first.spill_path
+    assert os.path.getsize(first.spill_path) == spilled
+    (summary_id,) = first.summary_ids()
+    assert len(first.summarized_nodes(summary_id)) > 1
+    first.compact()
+    assert len(budgeted_thread(tmp_path).nodes) == 45
+
+
+def test_spill_file_is_removed_on_load_close_and_collection(tmp_path):
+    thread = budgeted_thread(tmp_path, memory_budget=4000)
+    fill(thread, 40)
+    thread.save()
+    assert spill_files(tmp_path) == [os.path.basename(thread.spill_path)]
+
+    thread.load()
+    assert len(spill_files(tmp_path)) == 1  # Collapsed again after loading
+    thread.close()
+    assert spill_files(tmp_path) == []
+
+    other = budgeted_thread(tmp_path, memory_budget=4000)
+    assert spill_files(tmp_path)
+    del other
+    gc.collect()
+    assert spill_files(tmp_path) == []
+
+
+def test_process_budget_shrinks_the_least_recently_changed_thread(tmp_path):
+    budget = MemoryBudget(20000)
+    idle = CrochetThread(
+        "idle", "Idle", storage_dir=str(tmp_path), hot_nodes=4, process_budget=budget
+    )
+    busy = CrochetThread(
+        "busy", "Busy", storage_dir=str(tmp_path), hot_nodes=4, process_budget=budget
+    )
+    fill(idle, 30)
+    fill(busy, 30)
+
+    assert budget.total_bytes <= 20000
+    assert idle.summary_ids()
+    assert len(busy.nodes) > len(idle.nodes)
+
+
+def test_process_budget_skips_threads_whose_lock_is_held(tmp_path):
+    budget = MemoryBudget(20000)
+    in_use = CrochetThread(
+        "in_use",
+        "In use",
+        storage_dir=str(tmp_path),
+        hot_nodes=4,
+        process_budget=budget,
+    )
+    lock = threading.Lock()
+    budget.register(in_use, lock)
+    fill(in_use, 30)
+
+    with lock:
+        other = CrochetThread(
+            "other",
+            "Other",
+            storage_dir=str(tmp_path),
+            hot_nodes=4,
+            process_budget=budget,
+        )
+        fill(other, 30)
+        assert not in_use.summary_ids()
+
+    other.add_message("user", "One more")
+    assert in_use.summary_ids()
@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.lib.pioneer.gestarum.lib import rate_limit
+from src.lib.pioneer.gestarum.lib.instrumentation import configure_instrumentation
+from src.lib.pioneer.gestarum.lib.rate_limit import (
+    RateLimiter,
+    RetryPolicy,
+    call_with_retry,
+    configure_rate_limits,
+)
+
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class ConnectError(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the limiter's clock with one that only sleeps advance."""
+    now = SimpleNamespace(value=0.0)
+
+    def sleep(seconds):
+        now.value += seconds
+
+    monkeypatch.setattr(
+        rate_limit,
+        "time",
+        SimpleNamespace(
+            monotonic=lambda: now.value, sleep=sleep, time=lambda: now.value
+        ),
+    )
+    return now
+
+
+@pytest.fixture
+def retry_policy():
+    configure_rate_limits(retry_policy=RetryPolicy(max_attempts=3, base_delay=0.0))
+    yield
+    configure_rate_limits(retry_policy=RetryPolicy())
+
+
+def test_token_rate_stays_at_the_limit_for_large_requests(clock):
+    limiter = RateLimiter(None, tokens_per_minute=30000)
+
+    for _ in range(20):
+        limiter.acquire(4000)
+
+    # The bucket starts with one second's worth; the rest must be earned
+    assert clock.value == pytest.approx((20 * 4000 - 30000 / 60) / (30000 / 60))
+
+
+def test_token_rate_stays_at_the_limit_for_small_requests(clock):
+    limiter = RateLimiter(None, tokens_per_minute=6000)
+
+    for _ in range(300):
+        limiter.acquire(100)
+
+    assert 300 * 100 / (clock.value / 60) <= 6000 * 1.05
+
+
+def test_request_rate_is_limited(clock):
+    limiter = RateLimiter(requests_per_minute=120)
+
+    for _ in range(21):
+        limiter.acquire()
+
+    # Two requests' worth up front, then one every half second
+    assert clock.value == pytest.approx(19 * 0.5)
+
+
+def test_pause_holds_back_callers(clock):
+    limiter = RateLimiter()
+    limiter.pause(2.5)
+
+    limiter.acquire()
+
+    assert clock.value == pytest.approx(2.5)
+
+
+@pytest.mark.parametrize(
+    "error, idempotent, expected",
+    [
+        (APIError(429), False, True),
+        (APIError(408), False, True),
+        (APIError(500), False, False),
+        (APIError(500), True, True),
+        (APIError(400), True, False),
+        (ConnectError(), False, True),
+        (TimeoutError(), False, False),
+        (TimeoutError(), True, True),
+    ],
+)
+def test_only_safe_failures_are_retried(error, idempotent, expected):
+    assert RetryPolicy().is_retryable(error, idempotent) is expected
+
+
+def test_error_raised_from_a_failed_connection_was_never_sent():
+    try:
+        try:
+            raise ConnectError()
+        except ConnectError as e:
+            raise RuntimeError("APIConnectionError") from e
+    except RuntimeError as e:
+        assert RetryPolicy().is_retryable(e)
+
+
+def test_retries_are_recorded_as_a_stage_not_printed(clock, retry_policy, capsys):
+    instrumentation = configure_instrumentation()
+    instrumentation.reset()
+    observed = []
+    instrumentation.add_hook(
+        lambda stage, seconds, error: observed.append((stage, error))
+    )
+    failures = [APIError(429), APIError(503)]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return "done"
+
+    try:
+        assert call_with_retry(flaky, idempotent=True) == "done"
+    finally:
+        instrumentation.hooks = []
+        configure_instrumentation(enabled=False)
+
+    assert [stage for stage, _ in observed] == ["api.retry", "api.retry"]
+    assert [error.status_code for _, error in observed] == [429, 503]
+    assert capsys.readouterr().out == ""
+
+
+def test_non_idempotent_call_is_not_repeated_after_a_server_error(clock, retry_policy):
+    calls = []
+
+    def post():
+        calls.append(1)
+        raise APIError(500)
+
+    with pytest.raises(APIError):
+        call_with_retry(post)
+
+    assert len(calls) == 1
@@ -0,0 +1,137 @@
+import pytest
+
+from src.lib.pioneer.gestarum.lib import response_cache
+from src.lib.pioneer.gestarum.lib.assistant import Assistant
+from src.lib.pioneer.gestarum.lib.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses"))
+
+
+def test_hit_after_put_ignores_whitespace_and_case(cache, make_config):
+    config = make_config()
+    cache.put(cache.key(config, "What is  entropy?"), "Uncertainty.")
+
+    assert cache.get(cache.key(config, "what is entropy?")) == "Uncertainty."
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_depends_on_context_and_instructions(cache, make_config):
+    config = make_config()
+    plain = cache.key(config, "Why?")
+
+    assert (
+        cache.key(config, "Why?", context=[{"role": "user", "content": "Hi"}]) != plain
+    )
+    assert cache.key(config, "Why?", additional_instructions="Be brief") != plain
+    assert cache.key(config, "Why?", context=[]) == plain
+
+
+def test_expired_entry_is_a_miss_and_removed(tmp_path, make_config, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "responses"), ttl=60.0)
+    config = make_config()
+    key = cache.key(config, "Question")
+    now = 1_000_000.0
+    monkeypatch.setattr(response_cache.time, "time", lambda: now)
+    cache.put(key, "Answer")
+
+    now += 59.0
+    assert cache.get(key) == "Answer"
+    now += 2.0
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, make_config):
+    cache = ResponseCache(str(tmp_path / "responses"), max_entries=2)
+    config = make_config()
+    first, second, third = (cache.key(config, f"Question {i}") for i in range(3))
+    cache.put(first, "1")
+    cache.put(second, "2")
+    cache.get(first)
+
+    cache.put(third, "3")
+
+    assert cache.get(second) is None
+    assert cache.get(first) == "1"
+    assert cache.get(third) == "3"
+
+
+def test_entries_are_evicted_beyond_max_bytes(tmp_path, make_config):
+    cache = ResponseCache(str(tmp_path / "responses"), max_bytes=300)
+    config = make_config()
+    for i in range(5):
+        cache.put(cache.key(config, f"Question {i}"), "x" * 100)
+
+    stats = cache.stats()
+    assert 0 < stats["entries"] < 5
+    assert stats["bytes"] <= 300
+    assert cache.get(cache.key(config, "Question 4")) == "x" * 100
+
+
+def test_entries_persist_across_instances(tmp_path, make_config):
+    config = make_config()
+    key = ResponseCache(str(tmp_path / "responses")).key(config, "Question")
+    ResponseCache(str(tmp_path / "responses")).put(key, "Answer")
+
+    assert ResponseCache(str(tmp_path / "responses")).get(key) == "Answer"
+
+
+def test_saving_a_changed_configuration_invalidates_its_entries(cache, make_config):
+    config = make_config()
+    other = make_config(name="other_assistant", model="gpt-4o-mini")
+    cache.watch(config)
+    stale_key = cache.key(config, "Question")
+    other_key = cache.key(other, "Question")
+    cache.put(stale_key, "Old answer")
+    cache.put(other_key, "Other answer")
+
+    config.instructions = "New instructions"
+    config.save()
+
+    assert cache.get(stale_key) is None
+    assert cache.get(cache.key(config, "Question")) is None
+    assert cache.get(other_key) == "Other answer"
+
+
+def test_saving_an_unchanged_configuration_keeps_its_entries(cache, make_config):
+    config = make_config()
+    cache.watch(config)
+    key = cache.key(config, "Question")
+    cache.put(key, "Answer")
+
+    config.save()
+
+    assert cache.get(key) == "Answer"
+
+
+@pytest.mark.parametrize("stream_runs", [True, False])
+def test_hit_is_posted_to_its_remote_thread_with_the_next_run(
+    tmp_path, offline_client, make_config, stream_runs
+):
+    assistant = Assistant(
+        offline_client,
+        make_config(),
+        stream_runs=stream_runs,
+        response_cache=ResponseCache(str(tmp_path / "responses")),
+    )
+    first = assistant.create_thread("First")
+    second = assistant.create_thread("Second")
+    answer = assistant.send_message(first, "What is entropy?")
+
+    assert assistant.send_message(second, "What is entropy?") == answer
+    assert offline_client.backend.threads[second] == []
+
+    assistant.send_message(second, "And information?")
+
+    remote = [
+        (message.role, message.content[0].text.value)
+        for message in offline_client.backend.threads[second]
+    ]
+    assert remote[:3] == [
+        ("user", "What is entropy?"),
+        ("assistant", answer),
+        ("user", "And information?"),
+    ]
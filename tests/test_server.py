@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from src.lib.pioneer.gestarum.lib.crochet_thread import MemoryBudget
+from src.lib.pioneer.server import ChatServer
+
+
+async def request(app, method, path, body=None):
+    """Sends one request to the app in-process and returns its JSON response."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+    }
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    messages = [{"type": "http.request", "body": payload}]
+    response = {"status": 0, "body": b""}
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        else:
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], json.loads(response["body"])
+
+
+@pytest.fixture
+def make_server(tmp_path, monkeypatch, offline_client):
+    monkeypatch.chdir(tmp_path)  # Threads and files default to relative paths
+
+    def make(**kwargs):
+        return ChatServer(
+            "test_assistant",
+            config_directory=str(tmp_path / "config"),
+            client=offline_client,
+            **kwargs,
+        )
+
+    return make
+
+
+def session_graph(app, session_id):
+    client = app.sessions[session_id].client
+    return client.crochet_threads[client.thread_id]
+
+
+def test_session_turns_are_kept_in_its_history(make_server):
+    app = make_server()
+
+    async def scenario():
+        await app.startup()
+        try:
+            status, body = await request(
+                app, "POST", "/sessions/s1/messages", {"message": "What is entropy?"}
+            )
+            assert status == 200
+            assert body["responses"]
+            return await request(app, "GET", "/sessions/s1/history")
+        finally:
+            await app.shutdown()
+
+    status, body = asyncio.run(scenario())
+
+    assert status == 200
+    assert body["messages"][0]["content"] == "What is entropy?"
+
+
+def test_shared_budget_does_not_shrink_a_session_in_a_turn(make_server):
+    budget = MemoryBudget(10**9)
+    app = make_server(process_budget=budget)
+
+    async def chat(session_id, turns):
+        for turn in range(turns):
+            status, _ = await request(
+                app, "POST", f"/sessions/{session_id}/messages", {"message": f"Q{turn}"}
+            )
+            assert status == 200
+
+    async def scenario():
+        await app.startup()
+        try:
+            await chat("a", 20)
+            graph = session_graph(app, "a")
+            nodes = len(graph.nodes)
+            budget.max_bytes = 1  # Every later update is over budget
+
+            with app.sessions["a"].turn_lock:  # As if a's worker were mid-turn
+                await chat("b", 2)
+                assert len(graph.nodes) == nodes
+                assert not graph.summary_ids()
+
+            await chat("b", 1)
+            assert graph.summary_ids()
+        finally:
+            await app.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,134 @@
+import os
+
+import pytest
+
+from src.lib.pioneer.gestarum.lib.atomic_file import VersionConflict
+from src.lib.pioneer.gestarum.lib.crochet_thread import CrochetThread
+from src.lib.pioneer.gestarum.lib.thread import Thread
+from src.lib.pioneer.gestarum.lib.thread_storage import (
+    GraphStorage,
+    JSONThreadStorage,
+    SQLiteThreadStorage,
+)
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        store = JSONThreadStorage(str(tmp_path))
+    else:
+        store = SQLiteThreadStorage(os.path.join(tmp_path, "threads.db"))
+    yield store
+    store.close()
+
+
+def test_thread_save_rebases_onto_messages_saved_elsewhere(storage):
+    first = Thread("t1", "Shared", storage=storage)
+    first.add_message("user", "Hello")
+    first.save()
+    second = Thread("t1", "Shared", storage=storage).load()
+
+    first.add_message("user", "From the first writer")
+    first.save()
+    second.add_message("user", "From the second writer")
+    second.save()
+
+    contents = [
+        message["content"]
+        for message in Thread("t1", "", storage=storage).load().messages
+    ]
+    assert contents == ["Hello", "From the first writer", "From the second writer"]
+    assert [message["content"] for message in second.messages] == contents
+
+
+def test_store_rejects_a_save_from_a_stale_position(storage):
+    storage.save_messages("t1", "Shared", [{"role": "user", "content": "Hello"}])
+
+    with pytest.raises(VersionConflict):
+        storage.save_messages(
+            "t1", "Shared", [{"role": "user", "content": "Stale"}], start=0
+        )
+
+
+def test_crochet_thread_rebases_journal_onto_other_writer(tmp_path):
+    first = CrochetThread(
+        "t1", "Shared", storage_dir=str(tmp_path), journal=True
+    ).load()
+    root = first.add_message("user", "Root")
+    first.save()
+    second = CrochetThread(
+        "t1", "Shared", storage_dir=str(tmp_path), journal=True
+    ).load()
+
+    a = first.add_character_response("alice", "From the first writer", [root])
+    first.save()
+    b = second.add_character_response("bob", "From the second writer", [root])
+    second.save()
+
+    loaded = CrochetThread(
+        "t1", "Shared", storage_dir=str(tmp_path), journal=True
+    ).load()
+    assert list(loaded.nodes) == [root, a, b]
+    assert set(loaded.get_descendants(root)) == {a, b}
+    assert set(second.nodes) == {root, a, b}
+
+
+def test_crochet_thread_without_journal_raises_on_conflict(tmp_path):
+    first = CrochetThread("t1", "Shared", storage_dir=str(tmp_path)).load()
+    first.add_message("user", "Root")
+    first.save()
+    second = CrochetThread("t1", "Shared", storage_dir=str(tmp_path)).load()
+    first.add_message("user", "First")
+    first.save()
+    second.add_message("user", "Second")
+
+    with pytest.raises(VersionConflict):
+        second.save()
+
+
+def test_crochet_thread_rebases_onto_sqlite_store(tmp_path):
+    storage = SQLiteThreadStorage(os.path.join(tmp_path, "threads.db"))
+    try:
+        first = CrochetThread(
+            "t1", "Shared", storage_dir=str(tmp_path), storage=storage
+        ).load()
+        root = first.add_message("user", "Root")
+        first.save()
+        second = CrochetThread(
+            "t1", "Shared", storage_dir=str(tmp_path), storage=storage
+        ).load()
+
+        a = first.add_character_response("alice", "A", [root])
+        first.save()
+        b = second.add_character_response("bob", "B", [root])
+        second.save()
+
+        loaded = CrochetThread(
+            "t1", "", storage_dir=str(tmp_path), storage=storage
+        ).load()
+        assert set(loaded.nodes) == {root, a, b}
+        assert len(loaded.edges) == 2
+    finally:
+        storage.close()
+
+
+def test_crochet_thread_needs_a_graph_store(tmp_path):
+    storage = JSONThreadStorage(str(tmp_path))
+
+    assert not isinstance(storage, GraphStorage)
+    with pytest.raises(ValueError):
+        CrochetThread("t1", "Test", storage_dir=str(tmp_path), storage=storage)
+
+
+def test_configuration_saved_elsewhere_raises(make_config):
+    config = make_config()
+    config.save()
+    other = make_config()
+    other.load(config.name)
+
+    config.instructions = "First"
+    config.save()
+    other.instructions = "Second"
+
+    with pytest.raises(VersionConflict):
+        other.save()